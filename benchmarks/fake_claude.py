@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+A stand-in for the `claude` executable used by the dispatch benchmark.
+
+Accepts the arguments CliBackend passes (`code -p PROMPT [--session-id ID |
+--resume ID]`), optionally sleeps FAKE_CLAUDE_DELAY seconds to mimic model
+latency and streams FAKE_CLAUDE_BYTES bytes of response to stdout.
+"""
+import os
+import sys
+import time
+
+def main():
+    delay = float(os.environ.get("FAKE_CLAUDE_DELAY", "0"))
+    size = int(os.environ.get("FAKE_CLAUDE_BYTES", "2048"))
+    if sys.argv[1:3] != ["code", "-p"] or len(sys.argv) < 4:
+        print("usage: fake_claude.py code -p PROMPT", file=sys.stderr)
+        return 2
+    if delay:
+        time.sleep(delay)
+    line = (sys.argv[3] + " ").encode() * 8
+    written = 0
+    while written < size:
+        chunk = line[:size - written] + b"\n"
+        sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+        written += len(chunk)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Benchmarks of the prompt store, scheduler, TUI and dispatch hot paths.
+
+Every benchmark runs against a synthetic prompts corpus of each requested
+size in a scratch directory, so the real prompts, history and log are never
+touched. Results are appended to benchmarks/results.jsonl together with the
+commit they were measured on, and compared with the most recent results of
+an earlier commit:
+
+    python benchmarks/run.py                      # 1k, 10k and 100k prompts
+    python benchmarks/run.py --sizes 1000 --only load_prompts add_prompt
+    python benchmarks/run.py --store sqlite --fail-on-regression
+
+Timings are the median of --rounds runs. Dispatch throughput goes through
+the real DispatchPool and CliBackend with benchmarks/fake_claude.py as the
+`claude` executable.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ccc import main as ccc_main
+from ccc.backends import CliBackend
+from ccc.pool import DispatchPool
+
+RESULTS_FILE = Path(__file__).resolve().parent / "results.jsonl"
+FAKE_CLAUDE = Path(__file__).resolve().parent / "fake_claude.py"
+SIZES = (1000, 10000, 100000)
+# A result this much slower than the previous commit's is a regression.
+THRESHOLD = 1.2
+
+SCHEDULES = ["* * * * *", "*/5 * * * *", "0 * * * *", "15 13 * * *", "0 9 * * 1-5", "30 2 1 * *", ""]
+
+def make_corpus(size, seed=0):
+    """
+    Returns `size` synthetic prompts: mostly standalone prompts with a mix of
+    schedules, plus conversations of three chained prompts.
+    """
+    rng = random.Random(seed)
+    prompts = []
+    while len(prompts) < size:
+        index = len(prompts)
+        text = f"Benchmark prompt {index}: " + " ".join(rng.choice(("summarise", "review", "list", "explain", "the", "open", "issues", "changes")) for _ in range(12))
+        if rng.random() < 0.2 and size - index >= 3:
+            conversation_id = f"conversation-{index}"
+            ids = [f"prompt-{index + turn}" for turn in range(3)]
+            for turn, prompt_id in enumerate(ids):
+                prompts.append({
+                    "id": prompt_id, "prompt": f"{text} (turn {turn})",
+                    "schedule": rng.choice(SCHEDULES[:-1]) if turn == 0 else "",
+                    "conversation_id": conversation_id, "is_first": turn == 0,
+                    "next_prompt_id": ids[turn + 1] if turn < 2 else None,
+                })
+        else:
+            prompts.append({"id": f"prompt-{index}", "prompt": text, "schedule": rng.choice(SCHEDULES),
+                            "conversation_id": None, "next_prompt_id": None})
+    return prompts
+
+@contextlib.contextmanager
+def scratch_environment(store_backend):
+    """
+    Points ccc.main at a scratch directory for the duration of a benchmark.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        settings = {
+            "PROMPTS_FILE": directory / "prompts.jsonl",
+            "PROMPTS_DB": directory / "prompts.db",
+            "STORE_BACKEND": store_backend,
+            "RUNS_DIR": directory / "runs",
+            "HISTORY_DIR": directory / "history",
+            "SEARCH_DB": directory / "search.db",
+            "WATERMARKS_DB": directory / "watermarks.db",
+        }
+        saved = {name: getattr(ccc_main, name) for name in settings}
+        for name, value in settings.items():
+            setattr(ccc_main, name, value)
+        try:
+            yield directory
+        finally:
+            for history in ccc_main._histories.values():
+                history.close()
+            ccc_main._histories.clear()
+            for index in ccc_main._search_indexes.values():
+                index.close()
+            ccc_main._search_indexes.clear()
+            ccc_main._search_synced.clear()
+            for watermarks in ccc_main._watermarks.values():
+                watermarks.close()
+            ccc_main._watermarks.clear()
+            reset_stores()
+            ccc_main.scheduler.clear()
+            for name, value in saved.items():
+                setattr(ccc_main, name, value)
+
+def reset_stores():
+    for store in ccc_main._stores.values():
+        if hasattr(store, "close"):
+            store.close()
+    ccc_main._stores.clear()
+
+def seed(prompts):
+    reset_stores()
+    ccc_main.save_prompts(prompts)
+
+def measure(func, rounds, setup=None):
+    """
+    Calls `setup` (untimed) and `func` `rounds` times and returns the
+    durations of `func` in seconds.
+    """
+    durations = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+def bench_load_prompts(prompts, rounds):
+    """Loads the whole store from disk, with nothing cached."""
+    seed(prompts)
+    return measure(ccc_main.load_prompts, rounds, setup=reset_stores)
+
+def bench_add_prompt(prompts, rounds):
+    """Adds 100 prompts to a store of the given size; seconds per add."""
+    seed(prompts)
+    ccc_main.load_prompts()
+    added = 100
+
+    def add():
+        for _ in range(added):
+            ccc_main.add_prompt("Benchmark addition", "0 9 * * *")
+
+    return [duration / added for duration in measure(add, rounds, setup=lambda: seed(prompts))]
+
+def bench_open_archive(prompts, rounds):
+    """Opens the store as a lazily parsed archive with its index saved, then
+    reads the first page and 100 prompts by id."""
+    if ccc_main.STORE_BACKEND != "jsonl":
+        return bench_load_prompts(prompts, rounds)
+    saved, ccc_main.STORE_LAZY_BYTES = ccc_main.STORE_LAZY_BYTES, 0
+    try:
+        seed(prompts)
+        ids = [prompt["id"] for prompt in prompts[::max(len(prompts) // 100, 1)]]
+
+        def open_archive():
+            store = ccc_main.get_store()
+            store.page(0, 50)
+            for prompt_id in ids:
+                store.get(prompt_id)
+
+        return measure(open_archive, rounds, setup=reset_stores)
+    finally:
+        ccc_main.STORE_LAZY_BYTES = saved
+
+def bench_schedule_prompts(prompts, rounds):
+    """Schedules every prompt from scratch, as at startup."""
+    seed(prompts)
+    ccc_main.load_prompts()
+    return measure(ccc_main.schedule_prompts, rounds)
+
+def bench_tui_refresh(prompts, rounds):
+    """Rebuilds every TUI view (prompts table, queue, Kanban board)."""
+    from ccc import tui
+
+    seed(prompts)
+    ccc_main.schedule_prompts()
+
+    async def no_scheduler(app=None):
+        pass
+
+    async def run():
+        app = tui.CCC_TUI()
+        saved_main, tui.main = tui.main, no_scheduler
+        try:
+            async with app.run_test(size=(160, 50)) as pilot:
+                await pilot.pause()
+                durations = []
+                for _ in range(rounds):
+                    started = time.perf_counter()
+                    app.update_tables()
+                    await pilot.pause()
+                    durations.append(time.perf_counter() - started)
+                return durations
+        finally:
+            tui.main = saved_main
+
+    return asyncio.run(run())
+
+def bench_search(prompts, rounds):
+    """Searches the prompts by words and a tag, with the index up to date."""
+    seed(prompts)
+    ccc_main.synced_search_index()
+    queries = ["review", "open iss", '"the changes"', "explain tag:daily"]
+    return [duration / len(queries) for duration in
+            measure(lambda: [ccc_main.search_prompts(query) for query in queries], rounds)]
+
+def bench_dispatch(prompts, rounds, count=200, max_workers=ccc_main.MAX_CONCURRENCY):
+    """Dispatches `count` prompts through a fake claude; seconds per prompt."""
+    seed(prompts)
+    ccc_main.load_prompts()
+    ids = [prompt["id"] for prompt in prompts if not prompt.get("next_prompt_id")][:count]
+    backends = dict(ccc_main._backends)
+    ccc_main._backends[ccc_main.BACKEND] = CliBackend(str(FAKE_CLAUDE))
+
+    async def run():
+        pool = DispatchPool(ccc_main.dispatch_prompt, max_workers=max_workers)
+        for prompt_id in ids:
+            pool.submit(prompt_id)
+        await pool.join()
+
+    try:
+        return [duration / len(ids) for duration in measure(lambda: asyncio.run(run()), rounds)]
+    finally:
+        ccc_main._backends.clear()
+        ccc_main._backends.update(backends)
+
+BENCHMARKS = {
+    "load_prompts": bench_load_prompts,
+    "add_prompt": bench_add_prompt,
+    "open_archive": bench_open_archive,
+    "schedule_prompts": bench_schedule_prompts,
+    "tui_refresh": bench_tui_refresh,
+    "search": bench_search,
+    "dispatch": bench_dispatch,
+}
+
+def current_commit():
+    """
+    Returns (commit hash, whether the working tree has changes), or
+    (None, None) outside a git checkout.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+def load_results(path=RESULTS_FILE):
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def baseline(results, result):
+    """
+    Returns the latest earlier result of the same benchmark, size and store
+    measured on another commit, or None.
+    """
+    for previous in reversed(results):
+        if ((previous["benchmark"], previous["size"], previous["store"]) ==
+                (result["benchmark"], result["size"], result["store"])
+                and previous["commit"] != result["commit"]):
+            return previous
+    return None
+
+def run(names, sizes, store, rounds, results_file=RESULTS_FILE, threshold=THRESHOLD, log=print):
+    """
+    Runs the benchmarks, appends their results to `results_file` and
+    returns (results, regressions) where regressions are (result, baseline)
+    pairs that got more than `threshold` times slower.
+    """
+    history = load_results(results_file)
+    commit, dirty = current_commit()
+    results = []
+    regressions = []
+    with scratch_environment(store):
+        for size in sizes:
+            prompts = make_corpus(size)
+            for name in names:
+                durations = BENCHMARKS[name](prompts, rounds)
+                result = {
+                    "benchmark": name, "size": size, "store": store,
+                    "seconds": statistics.median(durations), "min": min(durations), "rounds": len(durations),
+                    "commit": commit, "dirty": dirty, "python": platform.python_version(),
+                    "at": datetime.datetime.now().isoformat(timespec="seconds"),
+                }
+                previous = baseline(history, result)
+                line = f"{name:<18} {size:>7} {result['seconds'] * 1000:>10.3f} ms"
+                if previous:
+                    ratio = result["seconds"] / previous["seconds"]
+                    line += f"  {ratio:5.2f}x vs {previous['commit']}"
+                    if ratio > threshold:
+                        line += "  REGRESSION"
+                        regressions.append((result, previous))
+                log(line)
+                results.append(result)
+    with open(results_file, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+    return results, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ccc hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="corpus sizes (prompts)")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="benchmarks to run")
+    parser.add_argument("--store", choices=("jsonl", "sqlite"), default="jsonl")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--results", type=Path, default=RESULTS_FILE, help="results file to append to")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="slowdown against the previous commit that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args(argv)
+    _, regressions = run(args.only, args.sizes, args.store, args.rounds, args.results, args.threshold)
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
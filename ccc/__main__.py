@@ -0,0 +1,5 @@
+import sys
+
+from ccc.cli import main
+
+sys.exit(main())
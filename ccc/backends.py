@@ -0,0 +1,187 @@
+import asyncio
+import subprocess
+import uuid
+from collections import namedtuple
+from pathlib import Path
+
+from ccc.output import stream_output, read_tail
+
+# exit_code is 0 on success; error holds stderr or the API error message;
+# context is what a follow-up turn needs to continue the same conversation.
+RunResult = namedtuple("RunResult", ["exit_code", "error", "context"], defaults=[None])
+
+
+class DispatchBackend:
+    """
+    A way of sending a prompt to Claude.
+
+    `run` writes the response into `output_path` as it arrives, passing each
+    decoded piece of text to `on_text`, and returns a RunResult. It may be
+    cancelled (e.g. by a timeout) and must clean up after itself when it is.
+
+    Passing the `context` of a previous RunResult continues that turn's
+    conversation; `keep_context` asks a cold run to return a context. With
+    `fork` the run continues a copy of that conversation and returns the
+    copy's context, leaving `context` to other branches.
+    """
+
+    name = None
+    # Whether run_batch submits prompts in bulk rather than one by one.
+    supports_batch = False
+
+    async def run(self, prompt_text, output_path, on_text=None, context=None, keep_context=False, fork=False):
+        raise NotImplementedError
+
+    async def run_batch(self, items):
+        """
+        Runs a list of (prompt_text, output_path) pairs and returns their
+        RunResults in the same order. By default they are simply run
+        concurrently.
+        """
+        return await asyncio.gather(*(self.run(text, path) for text, path in items))
+
+    async def close(self):
+        """
+        Releases any resources held between runs.
+        """
+
+
+class CliBackend(DispatchBackend):
+    """
+    Runs every prompt through a fresh `claude code -p` process.
+
+    The context of a run is its CLI session id: a run that should keep its
+    context starts a session with --session-id, and follow-ups pass it to
+    --resume. A fork resumes it with --fork-session under a new session id.
+    """
+
+    name = "Claude Code CLI"
+
+    def __init__(self, command="claude"):
+        self.command = command
+
+    async def run(self, prompt_text, output_path, on_text=None, context=None, keep_context=False, fork=False):
+        args = [self.command, 'code', '-p', prompt_text]
+        if context:
+            args += ['--resume', context]
+            if fork:
+                context = str(uuid.uuid4())
+                args += ['--fork-session', '--session-id', context]
+        elif keep_context:
+            context = str(uuid.uuid4())
+            args += ['--session-id', context]
+        process = await asyncio.create_subprocess_exec(
+            *args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            _, stderr, returncode = await asyncio.gather(
+                stream_output(process.stdout, output_path, on_text),
+                read_tail(process.stderr),
+                process.wait(),
+            )
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+        return RunResult(returncode, stderr, context)
+
+
+class ApiBackend(DispatchBackend):
+    """
+    Sends prompts straight to the Anthropic Messages API.
+
+    A single client is shared by every run, so its HTTP connection pool
+    (and the TLS sessions in it) is reused instead of paying a process start
+    and handshake per prompt. The `anthropic` package is only imported when
+    this backend is used.
+    """
+
+    name = "Anthropic API"
+    supports_batch = True
+
+    def __init__(self, api_key, model, max_tokens=4096, base_url=None, max_retries=2,
+                 batch_poll_interval=30):
+        import anthropic
+
+        self.anthropic = anthropic
+        self.model = model
+        self.max_tokens = max_tokens
+        self.batch_poll_interval = batch_poll_interval
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key, base_url=base_url or None, max_retries=max_retries)
+
+    async def run(self, prompt_text, output_path, on_text=None, context=None, keep_context=False, fork=False):
+        """
+        Streams one reply. The context is the message history, so a
+        follow-up sends the earlier turns along with its own prompt. Every
+        turn extends a copy of it, so a fork needs nothing more.
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        messages = list(context or []) + [{"role": "user", "content": prompt_text}]
+        reply = []
+        try:
+            with open(output_path, "wb") as f:
+                async with self.client.messages.stream(
+                        model=self.model, max_tokens=self.max_tokens,
+                        messages=messages) as stream:
+                    async for text in stream.text_stream:
+                        f.write(text.encode())
+                        f.flush()
+                        if on_text:
+                            on_text(text)
+                        if context is not None or keep_context:
+                            reply.append(text)
+        except self.anthropic.APIError as e:
+            return RunResult(1, str(e))
+        if context is None and not keep_context:
+            return RunResult(0, "")
+        return RunResult(0, "", messages + [{"role": "assistant", "content": "".join(reply)}])
+
+    async def run_batch(self, items):
+        """
+        Submits all prompts as one Message Batch, waits for it to end and
+        writes each result to its output file.
+        """
+        requests = [{
+            "custom_id": str(i),
+            "params": {"model": self.model, "max_tokens": self.max_tokens,
+                       "messages": [{"role": "user", "content": text}]},
+        } for i, (text, _) in enumerate(items)]
+        results = [RunResult(1, "missing from batch results")] * len(items)
+        batch = None
+        try:
+            batch = await self.client.messages.batches.create(requests=requests)
+            while batch.processing_status != "ended":
+                await asyncio.sleep(self.batch_poll_interval)
+                batch = await self.client.messages.batches.retrieve(batch.id)
+            async for entry in await self.client.messages.batches.results(batch.id):
+                index = int(entry.custom_id)
+                results[index] = self._write_batch_result(entry.result, items[index][1])
+        except asyncio.CancelledError:
+            if batch is not None:
+                await asyncio.shield(self._cancel_batch(batch.id))
+            raise
+        except self.anthropic.AnthropicError as e:
+            return [RunResult(1, str(e))] * len(items)
+        return results
+
+    def _write_batch_result(self, result, output_path):
+        if result.type != "succeeded":
+            error = getattr(result, "error", None)
+            return RunResult(1, f"batch request {result.type}: {error}" if error else f"batch request {result.type}")
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            for block in result.message.content:
+                if block.type == "text":
+                    f.write(block.text)
+        return RunResult(0, "")
+
+    async def _cancel_batch(self, batch_id):
+        try:
+            await self.client.messages.batches.cancel(batch_id)
+        except self.anthropic.AnthropicError:
+            pass
+
+    async def close(self):
+        await self.client.close()
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import time
+from pathlib import Path
+
+# How long a working directory fingerprint is reused, in seconds. Prompts
+# firing together share one fingerprint instead of running git each.
+FINGERPRINT_MAX_AGE = 5
+
+_fingerprints = {}
+
+
+async def workdir_fingerprint(path=".", max_age=FINGERPRINT_MAX_AGE):
+    """
+    Returns a hash of the state of the working directory Claude runs in.
+
+    In a git checkout this covers HEAD, the status and the diff of
+    uncommitted changes, so a commit or an edit changes the fingerprint.
+    Elsewhere it covers the names, sizes and modification times of the
+    directory's entries. It is computed in a thread, as git can take a
+    while on a large checkout, and callers that ask while it is computed
+    share the result.
+    """
+    path = os.path.abspath(path)
+    now = time.monotonic()
+    cached = _fingerprints.get(path)
+    if cached and (now - cached[0] < max_age or not cached[1].done()):
+        if cached[1].done():
+            return cached[1].result()
+        return await asyncio.shield(cached[1])
+    future = asyncio.ensure_future(asyncio.to_thread(_fingerprint, path))
+    _fingerprints[path] = (now, future)
+    try:
+        return await asyncio.shield(future)
+    except BaseException:
+        if future.done() and (future.cancelled() or future.exception() is not None):
+            _fingerprints.pop(path, None)
+        raise
+
+
+def _fingerprint(path):
+    digest = hashlib.sha256()
+    try:
+        for args in (["rev-parse", "HEAD"], ["status", "--porcelain"], ["diff", "HEAD", "--no-ext-diff"]):
+            digest.update(subprocess.run(["git", *args], cwd=path, capture_output=True, check=True).stdout)
+    except (OSError, subprocess.CalledProcessError):
+        digest = hashlib.sha256()
+        for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+            stat = entry.stat(follow_symlinks=False)
+            digest.update(f"{entry.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def cache_key(prompt_text, fingerprint, backend=""):
+    """
+    Returns the content address of a prompt's result: a hash of the prompt
+    text, the working directory fingerprint and the backend that answers.
+    """
+    return hashlib.sha256("\0".join((backend, fingerprint, prompt_text)).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    A content-addressed cache of dispatch results on disk.
+
+    Each result is a file under `objects/`, named by its key. An SQLite
+    index next to them records sizes, expiry times and when each entry was
+    last used. Expired entries are dropped, and when the cache holds more
+    than `max_bytes` or `max_entries` the least recently used entries are
+    evicted.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            expires REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+        CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+    """
+
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024, max_entries=10000):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(self.directory / "index.db")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def path(self, key):
+        return self.objects / key[:2] / key
+
+    def contains(self, key, now=None):
+        """
+        Returns True if the cache holds an unexpired result for `key`.
+        """
+        row = self.connection.execute("SELECT expires FROM entries WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] > (now or time.time()) and self.path(key).exists()
+
+    def get(self, key, now=None):
+        """
+        Returns the path of the cached result for `key`, or None if there is
+        none or it expired. Marks the entry as recently used.
+        """
+        now = now or time.time()
+        if not self.contains(key, now):
+            self._delete(key)
+            return None
+        with self.connection:
+            self.connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        return self.path(key)
+
+    def put(self, key, source, ttl, now=None):
+        """
+        Stores a copy of the file `source` as the result for `key`, valid
+        for `ttl` seconds.
+        """
+        now = now or time.time()
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(source, "rb") as f_in, open(temporary, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+            size = f_out.tell()
+        os.replace(temporary, path)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, size, created, expires, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, size, now, now + ttl, now))
+        self.evict(now)
+
+    def evict(self, now=None):
+        """
+        Drops expired entries, then the least recently used ones until the
+        cache is within its bounds. Returns the number of dropped entries.
+        """
+        now = now or time.time()
+        victims = [key for key, in self.connection.execute("SELECT key FROM entries WHERE expires <= ?", (now,))]
+        count, size = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE expires > ?", (now,)).fetchone()
+        if count > self.max_entries or size > self.max_bytes:
+            rows = self.connection.execute(
+                "SELECT key, size FROM entries WHERE expires > ? ORDER BY last_used", (now,))
+            for key, entry_size in rows:
+                if count <= self.max_entries and size <= self.max_bytes:
+                    break
+                victims.append(key)
+                count -= 1
+                size -= entry_size
+        for key in victims:
+            self._delete(key)
+        return len(victims)
+
+    def stats(self):
+        """
+        Returns (entries, bytes) currently held.
+        """
+        return self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+    def _delete(self, key):
+        with self.connection:
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            self.path(key).unlink()
+        except FileNotFoundError:
+            pass
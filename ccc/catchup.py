@@ -0,0 +1,119 @@
+import datetime
+import logging
+import sqlite3
+import time
+from collections import deque, namedtuple
+from pathlib import Path
+
+from croniter import croniter
+
+logger = logging.getLogger(__name__)
+
+# What happens to the fires a prompt missed while no scheduler ran:
+# "skip" drops them, "coalesce" runs the prompt once for the latest of
+# them and "replay" runs it once per missed fire, oldest first.
+POLICIES = ("skip", "coalesce", "replay")
+
+# prompt_id, the policy applied, the fire times to run (oldest first) and
+# the number of fires missed in total.
+CatchUp = namedtuple("CatchUp", ["prompt_id", "policy", "fires", "missed"])
+
+
+class WatermarkStore:
+    """
+    The last fire time of every prompt, in an SQLite database that the
+    scheduler processes of a cluster share like the lease database.
+
+    Watermarks only move forward, so processes recording fires in any
+    order agree on the latest one.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS watermarks (
+            prompt_id TEXT PRIMARY KEY,
+            fired REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=timeout)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, prompt_id):
+        """
+        Returns the last fire time of a prompt as a timestamp, or None.
+        """
+        row = self.connection.execute("SELECT fired FROM watermarks WHERE prompt_id = ?", (prompt_id,)).fetchone()
+        return row[0] if row else None
+
+    def all(self):
+        """
+        Returns {prompt_id: last fire time} for every prompt.
+        """
+        return dict(self.connection.execute("SELECT prompt_id, fired FROM watermarks"))
+
+    def advance(self, fires):
+        """
+        Records (prompt_id, fire time) pairs, keeping the later time where a
+        prompt already has one.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO watermarks (prompt_id, fired) VALUES (?, ?) "
+                "ON CONFLICT (prompt_id) DO UPDATE SET fired = MAX(fired, excluded.fired)",
+                [(prompt_id, fired) for prompt_id, fired in fires])
+
+    def remove(self, prompt_id):
+        with self.connection:
+            self.connection.execute("DELETE FROM watermarks WHERE prompt_id = ?", (prompt_id,))
+
+
+def missed_fires(expression, since, until, limit):
+    """
+    Returns (the latest `limit` fire times of `expression` after `since`
+    and before `until`, oldest first; the number of such fire times).
+    """
+    iterator = croniter(expression, datetime.datetime.fromtimestamp(since))
+    fires = deque(maxlen=max(limit, 1))
+    missed = 0
+    while True:
+        fire = iterator.get_next(datetime.datetime).timestamp()
+        if fire >= until:
+            return list(fires), missed
+        fires.append(fire)
+        missed += 1
+
+
+def plan_catch_up(jobs, watermarks, policy_of, now=None, max_replays=10, max_age=24 * 60 * 60):
+    """
+    Works out what to run for the fires missed during downtime.
+
+    `jobs` are (prompt_id, expression, next fire time) of the scheduled
+    prompts; every fire after a prompt's watermark and before its next
+    scheduled fire was missed. Fires older than `max_age` seconds (if set)
+    are never caught up, and "replay" runs at most the latest
+    `max_replays`. `policy_of(prompt_id)` returns a prompt's policy.
+
+    Returns a CatchUp for every prompt that missed fires, in prompt id
+    order. Prompts without a watermark have never fired and missed nothing.
+    """
+    now = now or time.time()
+    plan = []
+    for prompt_id, expression, next_fire in sorted(jobs):
+        since = watermarks.get(prompt_id)
+        if since is None:
+            continue
+        if max_age:
+            since = max(since, now - max_age)
+        policy = policy_of(prompt_id)
+        fires, missed = missed_fires(expression, since, next_fire, max_replays if policy == "replay" else 1)
+        if not missed:
+            continue
+        plan.append(CatchUp(prompt_id, policy, fires if policy != "skip" else [], missed))
+    return plan
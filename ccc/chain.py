@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# order: prompt ids in a valid execution (topological) order.
+# successors / predecessors: prompt id -> list of prompt ids.
+Plan = namedtuple("Plan", ["order", "prompts", "successors", "predecessors"])
+
+
+class ChainCycleError(ValueError):
+    """Raised when the next_prompt_id links of a conversation form a cycle."""
+
+
+def next_prompt_ids(prompt):
+    """
+    Returns the successors of a prompt. next_prompt_id may be a single id or
+    a list of ids, in which case the successors run in parallel.
+    """
+    next_ids = prompt.get("next_prompt_id")
+    if not next_ids:
+        return []
+    if isinstance(next_ids, str):
+        return [next_ids]
+    return list(next_ids)
+
+
+def plan_chain(start_id, get_prompt):
+    """
+    Resolves every prompt reachable from `start_id` through next_prompt_id
+    into a Plan. `get_prompt` maps an id to its record (or None). Missing
+    successors are logged and left out; cycles raise ChainCycleError.
+    """
+    prompts = {}
+    successors = {}
+    predecessors = {start_id: []}
+    stack = [start_id]
+    while stack:
+        prompt_id = stack.pop()
+        if prompt_id in prompts:
+            continue
+        prompt = get_prompt(prompt_id)
+        if prompt is None:
+            raise KeyError(prompt_id)
+        prompts[prompt_id] = prompt
+        successors[prompt_id] = []
+        for next_id in next_prompt_ids(prompt):
+            if next_id not in prompts and get_prompt(next_id) is None:
+                logger.error(f"Prompt {prompt_id} links to missing prompt {next_id}.")
+                continue
+            successors[prompt_id].append(next_id)
+            predecessors.setdefault(next_id, []).append(prompt_id)
+            stack.append(next_id)
+
+    # Kahn's algorithm: anything left over once no prompt is free is a cycle.
+    remaining = {prompt_id: len(predecessors[prompt_id]) for prompt_id in prompts}
+    ready = [prompt_id for prompt_id, count in remaining.items() if count == 0]
+    order = []
+    while ready:
+        prompt_id = ready.pop()
+        order.append(prompt_id)
+        for next_id in successors[prompt_id]:
+            remaining[next_id] -= 1
+            if remaining[next_id] == 0:
+                ready.append(next_id)
+    if len(order) < len(prompts):
+        cycle = sorted(prompt_id for prompt_id in prompts if prompt_id not in order)
+        raise ChainCycleError(f"Conversation starting at {start_id} has a cycle through {cycle}")
+    return Plan(order, prompts, successors, predecessors)
+
+
+async def execute_plan(plan, run_step, context=None, pool=None):
+    """
+    Runs a Plan without recursion. `run_step(prompt, context, fork)` is a
+    coroutine returning (succeeded, context); the context a step returns is
+    handed to its successors so they continue the same session. A prompt
+    starts as soon as all of its predecessors succeeded, so independent
+    branches run in parallel. When a step has several successors, `fork`
+    is True for each of them: they must continue copies of the session
+    rather than all the same one. Returns {prompt_id: succeeded} for the
+    prompts that ran.
+
+    With a `pool` (a ccc.pool.DispatchPool) one step at a time runs in the
+    caller's task and every other step that is ready meanwhile is queued on
+    the pool, so parallel branches count against its max_workers, fair
+    queue and rate limit. Waiting for queued steps goes through pool.wait.
+    """
+    remaining = {prompt_id: len(plan.predecessors[prompt_id]) for prompt_id in plan.order}
+    results = {}
+    running = {}
+    local = []
+
+    async def run_queued(prompt_id, step_context, fork, future):
+        if future.cancelled():
+            return
+        try:
+            result = await run_step(plan.prompts[prompt_id], step_context, fork)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        if not future.done():
+            future.set_result(result)
+
+    def start(prompt_id, step_context, fork=False):
+        if pool is None or not local:
+            task = asyncio.ensure_future(run_step(plan.prompts[prompt_id], step_context, fork))
+            local.append(task)
+        else:
+            task = asyncio.get_running_loop().create_future()
+            pool.submit_call(run_queued, prompt_id, step_context, fork, task)
+        running[task] = prompt_id
+
+    for prompt_id in plan.order:
+        if remaining[prompt_id] == 0:
+            start(prompt_id, context)
+
+    try:
+        while running:
+            waiting = asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await (waiting if pool is None or local else pool.wait(waiting))
+            for task in done:
+                prompt_id = running.pop(task)
+                if task in local:
+                    local.remove(task)
+                succeeded, step_context = task.result()
+                results[prompt_id] = succeeded
+                if not succeeded:
+                    # Successors of a failed step never become ready.
+                    continue
+                fork = len(plan.successors[prompt_id]) > 1
+                for next_id in plan.successors[prompt_id]:
+                    remaining[next_id] -= 1
+                    if remaining[next_id] == 0:
+                        start(next_id, step_context, fork)
+    finally:
+        for task in running:
+            task.cancel()
+    return results
@@ -0,0 +1,147 @@
+import argparse
+import sys
+import time
+
+# Measured from this module's import to the moment a command is ready to
+# run, i.e. the cost of importing and configuring what it needs.
+_started = time.perf_counter()
+
+# Startup budget of the daemon and the one-shot commands, in seconds. The
+# daemon path must never import Textual; tests/test_cli.py checks both.
+STARTUP_TARGET = 0.5
+
+
+def report_startup(args):
+    elapsed = time.perf_counter() - _started
+    if args.timing:
+        print(f"startup: {elapsed * 1000:.0f} ms (target {STARTUP_TARGET * 1000:.0f} ms)", file=sys.stderr)
+    if elapsed > STARTUP_TARGET:
+        import logging
+        logging.getLogger("ccc.cli").warning(
+            f"Startup took {elapsed:.3f}s, over the {STARTUP_TARGET}s target")
+
+
+def cmd_daemon(args):
+    from ccc import main as ccc_main, worker
+
+    ccc_main.setup_logging()
+    report_startup(args)
+    if args.processes > 1:
+        worker.run_workers(args.processes, args.metrics_port)
+    else:
+        worker.serve(cluster=True if args.cluster else None, metrics_port=args.metrics_port)
+    return 0
+
+
+def cmd_tui(args):
+    from ccc import tui
+
+    report_startup(args)
+    tui.run()
+    return 0
+
+
+def cmd_add(args):
+    from ccc import main as ccc_main
+
+    ccc_main.setup_logging()
+    report_startup(args)
+    print(ccc_main.add_prompt(args.prompt, args.schedule, conversation_id=args.conversation,
+                              next_prompt_id=args.next, tags=args.tag))
+    return 0
+
+
+def cmd_list(args):
+    from ccc import main as ccc_main
+
+    report_startup(args)
+    for prompt in ccc_main.list_prompts():
+        print("\t".join(str(prompt.get(field) or "") for field in ("id", "schedule", "prompt")))
+    return 0
+
+
+def cmd_search(args):
+    from ccc import main as ccc_main
+
+    report_startup(args)
+    for prompt in ccc_main.search_prompts(args.query, args.limit):
+        print("\t".join(("prompt", prompt["id"], prompt.get("prompt") or "")))
+    for run in ccc_main.search_responses(args.query, args.limit):
+        print("\t".join(("response", run["prompt_id"], run["output"])))
+    return 0
+
+
+def cmd_reindex(args):
+    from ccc import main as ccc_main
+
+    ccc_main.setup_logging()
+    report_startup(args)
+    prompts, responses = ccc_main.reindex()
+    print(f"Indexed {prompts} prompts and {responses} responses")
+    return 0
+
+
+def cmd_run_now(args):
+    import asyncio
+    from ccc import main as ccc_main
+
+    ccc_main.setup_logging()
+    report_startup(args)
+
+    async def run():
+        try:
+            return await ccc_main.dispatch_prompt(args.prompt_id, timeout=args.timeout)
+        finally:
+            await ccc_main.get_backend().close()
+
+    succeeded = asyncio.run(run())
+    ccc_main.get_history().close()
+    return 0 if succeeded else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ccc", description="Claude Code Companion")
+    parser.add_argument("--timing", action="store_true", help="print the startup time to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    daemon = commands.add_parser("daemon", help="run the scheduler without the TUI")
+    daemon.add_argument("--cluster", action="store_true",
+                        help="share the schedule with other schedulers (see [Cluster])")
+    daemon.add_argument("-n", "--processes", type=int, default=1,
+                        help="run N local scheduler processes in cluster mode")
+    daemon.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics on this port, 0 to disable (see [Metrics])")
+    daemon.set_defaults(func=cmd_daemon)
+
+    tui = commands.add_parser("tui", help="run the TUI with its embedded scheduler")
+    tui.set_defaults(func=cmd_tui)
+
+    add = commands.add_parser("add", help="add a prompt and print its id")
+    add.add_argument("prompt")
+    add.add_argument("schedule", help="cron expression, or '' for none")
+    add.add_argument("--conversation", help="conversation id")
+    add.add_argument("--next", help="id of the prompt to send after this one")
+    add.add_argument("--tag", action="append", help="tag the prompt; may be repeated")
+    add.set_defaults(func=cmd_add)
+
+    list_ = commands.add_parser("list", help="list prompts as id, schedule and text")
+    list_.set_defaults(func=cmd_list)
+
+    search = commands.add_parser("search", help="search prompts and past responses")
+    search.add_argument("query", help='words, "quoted phrases" and tag:name terms')
+    search.add_argument("--limit", type=int, default=20, help="results per kind")
+    search.set_defaults(func=cmd_search)
+
+    reindex = commands.add_parser("reindex", help="rebuild the search index from the prompts and run history")
+    reindex.set_defaults(func=cmd_reindex)
+
+    run_now = commands.add_parser("run-now", help="dispatch a prompt (and its chain) once and exit")
+    run_now.add_argument("prompt_id")
+    run_now.add_argument("--timeout", type=float, help="seconds before a turn is killed")
+    run_now.set_defaults(func=cmd_run_now)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
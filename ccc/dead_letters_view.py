@@ -0,0 +1,42 @@
+import datetime
+
+from textual.widgets import DataTable
+
+# How often the table checks the dead letters file for changes, in seconds.
+# The daemon may add letters as well as this process.
+POLL_INTERVAL = 2
+
+class DeadLettersTable(DataTable):
+    """
+    Prompts that still failed after their last retry, newest first, keyed
+    by letter id. The Retry and Dismiss cells are handled by the app.
+    """
+
+    def __init__(self, get_dead_letters, **kwargs):
+        super().__init__(**kwargs)
+        self.get_dead_letters = get_dead_letters
+        self.version = None
+
+    def on_mount(self) -> None:
+        self.add_column("Prompt", key="prompt")
+        self.add_column("Failed", key="failed_at")
+        self.add_column("Attempts", key="attempts")
+        self.add_column("Reason", key="reason")
+        self.add_column("Retry", key="retry")
+        self.add_column("Dismiss", key="dismiss")
+        self.reload()
+        self.set_interval(POLL_INTERVAL, self.reload_if_changed)
+
+    def reload_if_changed(self):
+        if self.get_dead_letters().version() != self.version:
+            self.reload()
+
+    def reload(self):
+        """Shows the current dead letters."""
+        dead_letters = self.get_dead_letters()
+        self.version = dead_letters.version()
+        self.clear()
+        for letter in reversed(dead_letters.all()):
+            failed_at = datetime.datetime.fromtimestamp(letter["failed_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            self.add_row(letter.get("prompt", ""), failed_at, str(letter.get("attempts", "")),
+                         letter.get("reason") or letter.get("status", ""), "Retry", "Dismiss", key=letter["id"])
@@ -0,0 +1,153 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+
+# Names accepted in a prompt's priority field besides plain integers.
+# Higher priorities are dispatched first.
+PRIORITY_LEVELS = {"low": -1, "normal": 0, "high": 1, "critical": 2}
+
+
+def parse_priority(value):
+    """
+    Returns the integer priority of a prompt's priority field (a level name
+    or an integer), 0 if it is missing or invalid.
+    """
+    if isinstance(value, str) and value.strip().lower() in PRIORITY_LEVELS:
+        return PRIORITY_LEVELS[value.strip().lower()]
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class FairQueue:
+    """
+    An asyncio queue ordered by priority, then shared fairly among flows.
+
+    Items of a higher priority always leave first. Within a priority, each
+    flow (e.g. a conversation or tag) gets a share of the dequeues in
+    proportion to its weight, by stride scheduling: a flow's pass grows by
+    1/weight per item it gets, and the flow with the lowest pass goes next.
+    A flow that was idle rejoins at the current pass rather than with
+    credit saved up. Within a flow, items are FIFO.
+
+    Like asyncio.Queue, `join` waits until every item was taken and
+    marked with `task_done`.
+    """
+
+    def __init__(self, weights=None):
+        self.weights = weights or {}
+        # priority -> flow -> deque of items
+        self._levels = {}
+        self._passes = {}
+        self._pass = 0.0
+        self._size = 0
+        self._order = itertools.count()
+        self._arrivals = {}
+        self._items = asyncio.Semaphore(0)
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    def qsize(self):
+        return self._size
+
+    def empty(self):
+        return not self._size
+
+    def put_nowait(self, item, priority=0, flow=None):
+        flows = self._levels.setdefault(priority, {})
+        if flow not in flows:
+            flows[flow] = deque()
+            self._passes[flow] = max(self._passes.get(flow, 0.0), self._pass)
+            self._arrivals[flow] = next(self._order)
+        flows[flow].append(item)
+        self._size += 1
+        self._unfinished += 1
+        self._finished.clear()
+        self._items.release()
+
+    async def get(self):
+        """
+        Waits for an item and removes the next one in order.
+        """
+        await self.reserve()
+        return self.take()
+
+    async def reserve(self):
+        """
+        Waits until an item is available and reserves it for `take`, which
+        then picks whatever item is first at that moment. Waiting for a rate
+        limit between the two lets a later, more urgent item go first.
+        """
+        await self._items.acquire()
+
+    def unreserve(self):
+        """
+        Gives back a reservation that won't be followed by `take`.
+        """
+        self._items.release()
+
+    def take(self):
+        priority = max(self._levels)
+        flows = self._levels[priority]
+        flow = min(flows, key=lambda flow: (self._passes[flow], self._arrivals[flow]))
+        items = flows[flow]
+        item = items.popleft()
+        self._pass = self._passes[flow]
+        self._passes[flow] += 1 / max(self.weights.get(flow, 1), 1e-9)
+        if not items:
+            del flows[flow]
+            if not flows:
+                del self._levels[priority]
+        self._size -= 1
+        return item
+
+    def task_done(self):
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._finished.set()
+
+    async def join(self):
+        await self._finished.wait()
+
+
+class TokenBucket:
+    """
+    A token-bucket rate limiter: `rate` tokens per minute, at most `burst`
+    banked. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def try_acquire(self):
+        """
+        Takes a token if one is available. Returns 0 on success, otherwise
+        the seconds until the next token.
+        """
+        if not self.rate:
+            return 0
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate / 60)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) * 60 / self.rate
+
+    async def acquire(self):
+        """
+        Waits for a token.
+        """
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
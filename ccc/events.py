@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import namedtuple
+
+# state is one of "scheduled", "queued", "running", "retrying", "done",
+# "failed", "timed out" or "removed". at is when it happened; next_run is
+# the prompt's next fire time and started the start of its current or last
+# run, if known. All three are timestamps.
+JobEvent = namedtuple("JobEvent", ["prompt_id", "state", "at", "next_run", "started"],
+                      defaults=[None, None])
+
+# States of a prompt that has fired and whose run hasn't finished yet.
+ACTIVE_STATES = ("queued", "running", "retrying")
+# States about the prompt's schedule rather than one of its runs.
+SCHEDULE_STATES = ("scheduled", "removed")
+
+
+class EventChannel:
+    """
+    A thread-safe channel of job state events, coalesced per prompt.
+
+    `publish` may be called from any thread. Until the consumer drains the
+    channel, a newer event replaces the older one of the same prompt and
+    kind (schedule changes or run progress), so a burst of events costs the
+    consumer at most two updates per prompt. Fields the newer event doesn't
+    know (next_run, started) are carried over. The callback given to
+    `subscribe` is called once for every batch of pending events, from the
+    publishing thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._wakeup = None
+        self._notified = False
+
+    def subscribe(self, wakeup):
+        """
+        Registers the consumer's wakeup callback, replacing any previous one.
+        Pass None to unsubscribe.
+        """
+        with self._lock:
+            self._wakeup = wakeup
+            self._notified = wakeup is not None and bool(self._pending)
+        if self._notified:
+            wakeup()
+
+    def publish(self, prompt_id, state, next_run=None, started=None, at=None):
+        event = JobEvent(prompt_id, state, at or time.time(), next_run, started)
+        key = (prompt_id, state in SCHEDULE_STATES)
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is not None and state != "removed":
+                event = event._replace(next_run=next_run or previous.next_run,
+                                       started=started or previous.started)
+            self._pending[key] = event
+            wakeup = None
+            if self._wakeup is not None and not self._notified:
+                self._notified = True
+                wakeup = self._wakeup
+        if wakeup:
+            wakeup()
+
+    def drain(self):
+        """
+        Returns the pending events, oldest first, and clears them.
+        """
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending = {}
+            self._notified = False
+        return events
@@ -0,0 +1,225 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows; one process per history there.
+    fcntl = None
+
+FIELDS = ("run_id", "prompt_id", "started", "ended", "duration", "exit_code",
+          "status", "output", "output_bytes", "attempt", "cache")
+
+# Columns added after the first release, with their types. Indexes created
+# before that get them on open; older records leave them NULL.
+ADDED_COLUMNS = {"attempt": "INTEGER", "cache": "TEXT"}
+
+logger = logging.getLogger(__name__)
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class _SegmentHandler(RotatingFileHandler):
+    # Appends and rotates under an exclusive lock on `<file>.lock`, so that
+    # several processes (daemon -n N) can share one history: a process that
+    # finds the file rotated by another reopens it before appending. Hands
+    # the oldest segment to `expire` before a rollover deletes it.
+    expire = None
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.lock_path = f"{self.baseFilename}.lock"
+        self._lock_file = None
+
+    def emit(self, record):
+        if fcntl is None:
+            super().emit(record)
+            return
+        if self._lock_file is None:
+            self._lock_file = open(self.lock_path, "a")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            if self.stream is not None and self._rotated():
+                self.stream.close()
+                self.stream = None
+            super().emit(record)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        super().close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _rotated(self):
+        try:
+            return os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def doRollover(self):
+        if self.backupCount > 0 and self.expire is not None:
+            oldest = Path(self.rotation_filename(f"{self.baseFilename}.{self.backupCount}"))
+            if oldest.exists():
+                self.expire(oldest)
+        super().doRollover()
+
+
+class RunHistory:
+    """
+    An append-only history of dispatches with an index for fast queries.
+
+    Every run is appended as one JSON line to `runs.jsonl`, which is rotated
+    by size into gzip-compressed segments (`runs.jsonl.1.gz`, ...). The same
+    record is inserted into an SQLite index keyed by prompt id and start
+    time, so queries never scan the segments. The index can be rebuilt from
+    the segments with `rebuild_index`. Several processes may share one
+    history: appends and rotation take turns through `runs.jsonl.lock`.
+
+    When the oldest of `backup_count` segments is rotated out, its runs
+    leave the index and their output files are deleted, so neither grows
+    without bound. `on_expire` is first called with those runs, e.g. to
+    drop them from a search index.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            prompt_id TEXT NOT NULL,
+            started REAL NOT NULL,
+            ended REAL,
+            duration REAL,
+            exit_code INTEGER,
+            status TEXT,
+            output TEXT,
+            output_bytes INTEGER,
+            attempt INTEGER,
+            cache TEXT
+        );
+        CREATE INDEX IF NOT EXISTS runs_prompt_started ON runs (prompt_id, started);
+        CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+    """
+
+    def __init__(self, directory, max_bytes=10 * 1024 * 1024, backup_count=20, on_expire=None, timeout=30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.directory / "runs.jsonl"
+        self.on_expire = on_expire
+        self.handler = _SegmentHandler(self.log_path, maxBytes=max_bytes, backupCount=backup_count)
+        self.handler.namer = lambda name: name + ".gz"
+        self.handler.rotator = _gzip_rotator
+        self.handler.expire = self._expire
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        # Workers of a daemon -n N share the index.
+        self.connection = sqlite3.connect(self.directory / "index.db", timeout=timeout)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(runs)")}
+        with self.connection:
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE runs ADD COLUMN {column} {column_type}")
+
+    def close(self):
+        self.handler.close()
+        self.connection.close()
+
+    def record(self, run):
+        """
+        Appends a run (a dict with the keys in FIELDS) and indexes it.
+        """
+        run = {field: run.get(field) for field in FIELDS}
+        self.handler.handle(logging.makeLogRecord({"msg": json.dumps(run)}))
+        with self.connection:
+            self._index(run)
+
+    def last_runs(self, prompt_id, limit=20):
+        """
+        Returns the most recent runs of a prompt, newest first.
+        """
+        return self._query(
+            "SELECT * FROM runs WHERE prompt_id = ? ORDER BY started DESC LIMIT ?",
+            (prompt_id, limit))
+
+    def runs_between(self, start, end, prompt_id=None):
+        """
+        Returns the runs that started in [start, end) (timestamps), oldest
+        first, optionally only for one prompt.
+        """
+        if prompt_id is None:
+            return self._query(
+                "SELECT * FROM runs WHERE started >= ? AND started < ? ORDER BY started",
+                (start, end))
+        return self._query(
+            "SELECT * FROM runs WHERE prompt_id = ? AND started >= ? AND started < ? ORDER BY started",
+            (prompt_id, start, end))
+
+    def segments(self):
+        """
+        Returns the history segments, oldest first.
+        """
+        rotated = sorted(self.directory.glob("runs.jsonl.*.gz"),
+                         key=lambda path: int(path.name.split(".")[2]), reverse=True)
+        return rotated + ([self.log_path] if self.log_path.exists() else [])
+
+    def rebuild_index(self):
+        """
+        Recreates the index from the history segments. Returns the number of
+        indexed runs.
+        """
+        count = 0
+        self.handler.flush()
+        with self.connection:
+            self.connection.execute("DELETE FROM runs")
+            for segment in self.segments():
+                for run in self._read(segment):
+                    self._index(run)
+                    count += 1
+        return count
+
+    def _read(self, segment):
+        opener = gzip.open if segment.suffix == ".gz" else open
+        with opener(segment, "rt") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _expire(self, segment):
+        # Forgets the runs of a segment that is about to be deleted.
+        try:
+            runs = self._read(segment)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read expiring history segment {segment}: {e}")
+            return
+        if self.on_expire is not None:
+            self.on_expire(runs)
+        with self.connection:
+            self.connection.executemany("DELETE FROM runs WHERE run_id = ?", [(run.get("run_id"),) for run in runs])
+        for run in runs:
+            if run.get("output"):
+                output = Path(run["output"])
+                output.unlink(missing_ok=True)
+                try:
+                    output.parent.rmdir()
+                except OSError:
+                    # Other runs of the prompt are still there.
+                    pass
+
+    def _index(self, run):
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO runs ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+            [run.get(field) for field in FIELDS])
+
+    def _query(self, sql, params):
+        cursor = self.connection.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
@@ -1,23 +1,93 @@
 from textual.app import ComposeResult
+from textual.message import Message
 from textual.widgets import Static
-from textual.containers import Horizontal
+from textual.containers import Horizontal, Vertical
 from textual.events import MouseDown, MouseUp, MouseMove
 
+# Columns mounted at a time; the other conversations are paged with [ and ].
+COLUMNS_PER_PAGE = 8
+
 class KanbanBoard(Static):
-    """A Kanban board widget."""
+    """
+    A Kanban board with a column per conversation and a card per prompt.
+
+    The board keeps an index of conversations and a keyed map of the
+    columns it has mounted. Changes are applied as deltas: only columns
+    that scroll into or out of the current page are mounted or removed,
+    and only the cards of a changed conversation are touched. Dropping a
+    card on another column posts CardMoved; the app persists the move and
+    feeds the changed prompt back through upsert_card.
+    """
+
+    BINDINGS = [("[", "previous_page", "Previous conversations"), ("]", "next_page", "Next conversations")]
+    can_focus = True
+
+    class CardMoved(Message):
+        """Posted when a card is dropped on another conversation's column."""
+
+        def __init__(self, prompt_id, conversation_id):
+            super().__init__()
+            self.prompt_id = prompt_id
+            self.conversation_id = conversation_id
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.dragging = None
         self.drag_offset = (0, 0)
+        # conversation id -> {prompt id: prompt}, in conversation order.
+        self.conversations = {}
+        # prompt id -> conversation id, to find a card's old column.
+        self.card_conversations = {}
+        # conversation id -> mounted KanbanColumn, for the current page only.
+        self.columns = {}
+        self.page = 0
 
     def compose(self) -> ComposeResult:
+        yield Static(id="kanban_pager")
         yield Horizontal()
 
+    def set_conversations(self, conversations):
+        """Shows {conversation id: prompts}, reusing the mounted widgets."""
+        self.conversations = {
+            conversation_id: {prompt["id"]: prompt for prompt in prompts}
+            for conversation_id, prompts in conversations.items()
+        }
+        self.card_conversations = {
+            prompt_id: conversation_id
+            for conversation_id, prompts in self.conversations.items()
+            for prompt_id in prompts
+        }
+        self._sync()
+
+    def upsert_card(self, prompt):
+        """Shows a new or changed prompt, moving its card if needed."""
+        prompt_id = prompt["id"]
+        conversation_id = prompt.get("conversation_id")
+        old_conversation_id = self._forget(prompt_id)
+        if conversation_id:
+            self.conversations.setdefault(conversation_id, {})[prompt_id] = prompt
+            self.card_conversations[prompt_id] = conversation_id
+        self._sync({old_conversation_id, conversation_id})
+
+    def remove_card(self, prompt_id):
+        """Drops the card of a deleted prompt."""
+        self._sync({self._forget(prompt_id)})
+
+    def action_previous_page(self) -> None:
+        if self.page > 0:
+            self.page -= 1
+            self._sync()
+
+    def action_next_page(self) -> None:
+        if (self.page + 1) * COLUMNS_PER_PAGE < len(self.conversations):
+            self.page += 1
+            self._sync()
+
     def on_mouse_down(self, event: MouseDown) -> None:
         if isinstance(event.widget, KanbanCard):
             self.dragging = event.widget
             self.drag_offset = event.x - self.dragging.region.x, event.y - self.dragging.region.y
+            self.capture_mouse()
 
     def on_mouse_move(self, event: MouseMove) -> None:
         if self.dragging:
@@ -25,27 +95,107 @@ class KanbanBoard(Static):
 
     def on_mouse_up(self, event: MouseUp) -> None:
         if self.dragging:
-            # This is where the logic to update the data would go
-            self.dragging.styles.offset = (0, 0)
-            self.dragging = None
+            card, self.dragging = self.dragging, None
+            card.styles.offset = (0, 0)
+            self.release_mouse()
+            target = self.column_at(event.screen_x, event.screen_y)
+            if target is not None and target.conversation_id != self.card_conversations.get(card.prompt_id):
+                self.post_message(self.CardMoved(card.prompt_id, target.conversation_id))
+
+    def column_at(self, x, y):
+        """Returns the mounted column at a screen position, or None."""
+        for column in self.columns.values():
+            if column.region.contains(x, y):
+                return column
+        return None
+
+    def _forget(self, prompt_id):
+        # Removes a prompt from the index and returns its old conversation.
+        conversation_id = self.card_conversations.pop(prompt_id, None)
+        if conversation_id is not None:
+            prompts = self.conversations[conversation_id]
+            prompts.pop(prompt_id, None)
+            if not prompts:
+                del self.conversations[conversation_id]
+        return conversation_id
+
+    def _sync(self, changed=None):
+        # Reconciles the mounted columns with the current page of the index.
+        # `changed` limits card updates to those conversations.
+        pages = max(1, -(-len(self.conversations) // COLUMNS_PER_PAGE))
+        self.page = min(self.page, pages - 1)
+        start = self.page * COLUMNS_PER_PAGE
+        visible = list(self.conversations)[start:start + COLUMNS_PER_PAGE]
+
+        for conversation_id in [c for c in self.columns if c not in self.conversations or c not in visible]:
+            self.columns.pop(conversation_id).remove()
+
+        container = self.query_one(Horizontal)
+        for index, conversation_id in enumerate(visible):
+            prompts = self.conversations[conversation_id]
+            column = self.columns.get(conversation_id)
+            if column is None:
+                column = KanbanColumn(f"Conversation {conversation_id[:8]}", conversation_id, prompts.values())
+                following = next((self.columns[c] for c in visible[index + 1:] if c in self.columns), None)
+                self.columns[conversation_id] = column
+                if following is not None:
+                    container.mount(column, before=following)
+                else:
+                    container.mount(column)
+            elif changed is None or conversation_id in changed:
+                column.sync_cards(prompts.values())
+
+        pager = self.query_one("#kanban_pager", Static)
+        if pages > 1:
+            pager.update(f"Conversations {start + 1}-{start + len(visible)} of {len(self.conversations)} ([ and ] to page)")
+        else:
+            pager.update("")
 
 class KanbanColumn(Static):
-    """A column on the Kanban board."""
+    """A column on the Kanban board, with its cards keyed by prompt id."""
 
-    def __init__(self, title: str):
+    DEFAULT_CSS = """
+    KanbanColumn {
+        width: 1fr;
+        min-width: 20;
+    }
+    """
+
+    def __init__(self, title: str, conversation_id=None, prompts=()):
         super().__init__()
         self.title = title
+        self.conversation_id = conversation_id
+        self.cards = {prompt["id"]: KanbanCard(prompt["prompt"], prompt_id=prompt["id"]) for prompt in prompts}
 
     def compose(self) -> ComposeResult:
         yield Static(self.title, classes="column_title")
-        yield Static(classes="column_content")
+        with Vertical(classes="column_content"):
+            yield from self.cards.values()
+
+    def sync_cards(self, prompts):
+        """Adds, updates and removes cards so they match `prompts`."""
+        prompts = {prompt["id"]: prompt for prompt in prompts}
+        for prompt_id in [p for p in self.cards if p not in prompts]:
+            self.cards.pop(prompt_id).remove()
+        # Cards added before the column was composed are yielded by compose.
+        content = self.query(".column_content")
+        for prompt_id, prompt in prompts.items():
+            card = self.cards.get(prompt_id)
+            if card is None:
+                self.cards[prompt_id] = KanbanCard(prompt["prompt"], prompt_id=prompt_id)
+                if content:
+                    content.first().mount(self.cards[prompt_id])
+            elif card.text != prompt["prompt"]:
+                card.set_text(prompt["prompt"])
 
 class KanbanCard(Static):
     """A card on the Kanban board."""
 
-    def __init__(self, text: str, **kwargs):
-        super().__init__(**kwargs)
+    def __init__(self, text: str, prompt_id=None, **kwargs):
+        super().__init__(text, markup=False, **kwargs)
         self.text = text
+        self.prompt_id = prompt_id
 
-    def compose(self) -> ComposeResult:
-        yield Static(self.text)
+    def set_text(self, text):
+        self.text = text
+        self.update(text)
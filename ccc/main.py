@@ -1,10 +1,25 @@
+import asyncio
+import atexit
 import configparser
-import schedule
+import datetime
 import time
-import subprocess
-import json
 import logging
+import sqlite3
+from collections import namedtuple
 from pathlib import Path
+from ccc.backends import ApiBackend, CliBackend
+from ccc.cache import ResultCache, cache_key, workdir_fingerprint
+from ccc.catchup import POLICIES, WatermarkStore, plan_catch_up
+from ccc.chain import ChainCycleError, execute_plan, next_prompt_ids, plan_chain
+from ccc.dispatch_queue import TokenBucket, parse_priority
+from ccc.events import EventChannel
+from ccc.history import RunHistory
+from ccc.metrics import DispatchMetrics
+from ccc.output import copy_output, run_output_path
+from ccc.retry import CircuitBreaker, RetryPolicy
+from ccc.search import SearchIndex, parse_tags
+from ccc.shard import LeaseStore, ShardCoordinator
+from ccc.store import JsonlPromptStore, SqlitePromptStore, import_jsonl
 
 def load_config():
     """
@@ -14,94 +29,668 @@ def load_config():
     config.read('config.ini')
     return config
 
+# Read at import: the constants below and the module singletons (pool,
+# scheduler, retry policy) are built from it. Parsing config.ini takes well
+# under a millisecond; what kept startup slow was Textual and the log file,
+# which the entry points set up only when they need them.
 config = load_config()
 
-# Setup logging
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# Create a file handler
-handler = logging.FileHandler(config['DEFAULT']['log_file'])
-handler.setLevel(logging.INFO)
+logger = logging.getLogger("ccc.main")
 
-# Create a logging format
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
+_log_handlers = []
 
-# Add the handlers to the logger
-logger.addHandler(handler)
+def setup_logging():
+    """
+    Sends log records to [DEFAULT] log_file. Entry points call this once;
+    importing the module doesn't open the log file.
+    """
+    if _log_handlers:
+        return
+    # The handler sits on the package logger so that records from helper
+    # modules such as ccc.pool end up in the same log file.
+    package_logger = logging.getLogger("ccc")
+    package_logger.setLevel(logging.INFO)
+    handler = logging.FileHandler(config['DEFAULT']['log_file'])
+    handler.setLevel(logging.INFO)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    package_logger.addHandler(handler)
+    _log_handlers.append(handler)
 
 PROMPTS_FILE = Path(config['DEFAULT']['prompts_file'])
+STORE_BACKEND = config.get('Store', 'backend', fallback='jsonl')
+PROMPTS_DB = Path(config.get('Store', 'database', fallback='ccc/prompts.db'))
+STORE_FSYNC_INTERVAL = config.getfloat('Store', 'fsync_interval', fallback=1)
+STORE_COMPACT_OPS = config.getint('Store', 'compact_ops', fallback=1000)
+STORE_LAZY_BYTES = config.getint('Store', 'lazy_bytes', fallback=64 * 1024 * 1024)
+MAX_CONCURRENCY = config.getint('Scheduler', 'max_concurrency', fallback=4)
+DISPATCH_TIMEOUT = config.getfloat('Scheduler', 'dispatch_timeout', fallback=600)
+BATCH_DISPATCH = config.getboolean('Scheduler', 'batch_dispatch', fallback=False)
+BATCH_MIN_SIZE = config.getint('Scheduler', 'batch_min_size', fallback=2)
+BATCH_TIMEOUT = config.getfloat('Scheduler', 'batch_timeout', fallback=24 * 60 * 60)
+LOOKAHEAD = config.getint('Scheduler', 'lookahead', fallback=5)
+BACKEND = config.get('Claude', 'backend', fallback='cli')
+RUNS_DIR = Path(config['DEFAULT'].get('runs_dir', 'ccc/runs'))
+HISTORY_DIR = Path(config.get('History', 'directory', fallback='ccc/history'))
+HISTORY_MAX_BYTES = config.getint('History', 'max_bytes', fallback=10 * 1024 * 1024)
+HISTORY_BACKUP_COUNT = config.getint('History', 'backup_count', fallback=20)
+CLUSTER_ENABLED = config.getboolean('Cluster', 'enabled', fallback=False)
+LEASES_DB = Path(config.get('Cluster', 'leases', fallback='ccc/leases.db'))
+LEASE_TTL = config.getfloat('Cluster', 'lease_ttl', fallback=300)
+HEARTBEAT_INTERVAL = config.getfloat('Cluster', 'heartbeat_interval', fallback=10)
+TAKEOVER_DELAY = config.getfloat('Cluster', 'takeover_delay', fallback=30)
+RESYNC_INTERVAL = config.getfloat('Scheduler', 'resync_interval',
+                                  fallback=config.getfloat('Cluster', 'resync_interval', fallback=30))
+MAX_ATTEMPTS = config.getint('Retry', 'max_attempts', fallback=3)
+RETRY_BASE_DELAY = config.getfloat('Retry', 'base_delay', fallback=5)
+RETRY_MAX_DELAY = config.getfloat('Retry', 'max_delay', fallback=300)
+DEAD_LETTERS_FILE = Path(config.get('Retry', 'dead_letters', fallback='ccc/dead_letters.jsonl'))
+MAX_DEAD_LETTERS = config.getint('Retry', 'max_dead_letters', fallback=1000)
+BREAKER_FAILURE_RATE = config.getfloat('Retry', 'breaker_failure_rate', fallback=0.5)
+BREAKER_WINDOW = config.getint('Retry', 'breaker_window', fallback=20)
+BREAKER_MIN_CALLS = config.getint('Retry', 'breaker_min_calls', fallback=5)
+BREAKER_COOLDOWN = config.getfloat('Retry', 'breaker_cooldown', fallback=60)
+CACHE_ENABLED = config.getboolean('Cache', 'enabled', fallback=False)
+CACHE_DEFAULT_TTL = config.getfloat('Cache', 'default_ttl', fallback=3600)
+CACHE_DIR = Path(config.get('Cache', 'directory', fallback='ccc/cache'))
+CACHE_MAX_BYTES = config.getint('Cache', 'max_bytes', fallback=100 * 1024 * 1024)
+CACHE_MAX_ENTRIES = config.getint('Cache', 'max_entries', fallback=10000)
+RATE_LIMIT = config.getfloat('RateLimit', 'requests_per_minute', fallback=0)
+RATE_BURST = config.getint('RateLimit', 'burst', fallback=1)
+FLOW_WEIGHTS = {flow: config.getfloat('Weights', flow) for flow in config.options('Weights')
+                if flow not in config.defaults()} if config.has_section('Weights') else {}
+WATERMARKS_DB = Path(config.get('Catchup', 'watermarks', fallback='ccc/watermarks.db'))
+CATCHUP_POLICY = config.get('Catchup', 'policy', fallback='coalesce')
+CATCHUP_MAX_REPLAYS = config.getint('Catchup', 'max_replays', fallback=10)
+CATCHUP_MAX_AGE = config.getfloat('Catchup', 'max_age_hours', fallback=24) * 60 * 60
+CATCHUP_CONCURRENCY = config.getint('Catchup', 'max_concurrency', fallback=2)
+SEARCH_DB = Path(config.get('Search', 'index', fallback='ccc/search.db'))
+SEARCH_MAX_RESPONSE_BYTES = config.getint('Search', 'max_response_bytes', fallback=64 * 1024)
+METRICS_HOST = config.get('Metrics', 'host', fallback='127.0.0.1')
+METRICS_PORT = config.getint('Metrics', 'port', fallback=9464)
+QUEUE_HORIZON = datetime.timedelta(hours=config.getfloat('Scheduler', 'queue_horizon_hours', fallback=24))
 
-def dispatch_prompt(prompt_id, app):
+async def dispatch_prompt(prompt_id, app=None, timeout=None):
     """
-    Dispatches a prompt to the Claude Code CLI.
+    Dispatches a prompt through the configured backend (the Claude Code CLI
+    by default, see get_backend).
+
+    A prompt with follow-ups (next_prompt_id) is resolved into a plan of its
+    whole chain up front and executed by ccc.chain.execute_plan, each turn
+    continuing the previous turn's session. Parallel branches fork it and
+    are queued on the dispatch pool.
+
+    Returns True if the prompt and all of its follow-ups succeeded.
     """
-    prompts = load_prompts()
-    prompt = next((p for p in prompts if p["id"] == prompt_id), None)
+    prompt = get_store().get(prompt_id)
     if not prompt:
         logger.error(f"Prompt with id {prompt_id} not found.")
-        return
+        metrics.observe_error(prompt_id, "prompt_missing")
+        return False
+
+    if not next_prompt_ids(prompt):
+        succeeded, _ = await run_prompt(prompt, app, timeout)
+        return succeeded
+
+    try:
+        plan = plan_chain(prompt_id, conversation_lookup(prompt))
+    except ChainCycleError as e:
+        logger.error(str(e))
+        metrics.observe_error(prompt_id, "chain_cycle")
+        return False
+    logger.info(f"Running conversation of {len(plan.order)} prompts starting at {prompt_id}")
+    results = await execute_plan(
+        plan, lambda step, context, fork: run_prompt(step, app, timeout, context, keep_context=True, fork=fork),
+        pool=dispatch_pool)
+    return len(results) == len(plan.order) and all(results.values())
+
+def conversation_lookup(prompt):
+    """
+    Returns a prompt lookup for plan_chain that loads the prompt's whole
+    conversation in one store query.
+    """
+    store = get_store()
+    conversation = {}
+    if prompt.get("conversation_id"):
+        conversation = {p.get("id"): p for p in store.by_conversation(prompt["conversation_id"])}
+    return lambda prompt_id: conversation.get(prompt_id) or store.get(prompt_id)
+
+# Failures worth another attempt; a missing CLI won't fix itself.
+RETRY_REASONS = ("exit_status", "timeout")
+
+# cache is "hit" or "miss" when the result cache was consulted.
+Attempt = namedtuple("Attempt", ["succeeded", "context", "status", "reason", "error", "cache"], defaults=[None])
+
+# Cache key -> future of the run currently producing that result.
+_in_flight = {}
+
+def cache_ttl(prompt):
+    """
+    Returns how long a prompt's result may be reused, in seconds: its own
+    cache_ttl field, or [Cache] default_ttl when the cache is enabled.
+    Zero means it isn't cached.
+    """
+    ttl = prompt.get("cache_ttl")
+    if ttl is None:
+        return CACHE_DEFAULT_TTL if CACHE_ENABLED else 0
+    try:
+        return max(float(ttl), 0)
+    except (TypeError, ValueError):
+        return 0
+
+async def result_cache_key(prompt, context=None, keep_context=False):
+    """
+    Returns the result cache key of a run, or None if it mustn't be cached.
+    Turns of a conversation depend on their session, so they never are.
+    """
+    if context is not None or keep_context or not cache_ttl(prompt):
+        return None
+    model = config.get('Claude', 'model', fallback='') if BACKEND == "api" else ''
+    return cache_key(prompt["prompt"], await workdir_fingerprint(), f"{BACKEND}:{model}")
 
-    app.query_one("#loading_indicator").styles.display = "block"
+async def run_prompt(prompt, app=None, timeout=None, context=None, keep_context=False, first_attempt=1,
+                     fork=False):
+    """
+    Runs a single prompt and returns (succeeded, context).
+
+    A failed attempt is retried after an exponential backoff with jitter
+    (see retry_policy), up to the prompt's max_attempts or [Retry]
+    max_attempts. Every attempt first waits for the circuit breaker, which
+    pauses all dispatches while the upstream keeps failing. A prompt that
+    still fails is added to the dead letters. `first_attempt` counts the
+    attempts a caller already made. With `fork` the run continues a copy of
+    the session in `context` (see DispatchBackend.run).
+
+    Prompts with a cache_ttl (see cache_ttl) reuse the result of an earlier
+    identical run from the result cache. Identical runs that start while
+    one is in flight wait for it and reuse its result.
+    """
+    prompt_id = prompt["id"]
+    attempts = retry_policy.attempts(prompt)
+    key = await result_cache_key(prompt, context, keep_context)
+    if key is not None:
+        while key in _in_flight:
+            await asyncio.shield(_in_flight[key])
+        _in_flight[key] = asyncio.get_running_loop().create_future()
+    try:
+        for attempt in range(first_attempt, attempts + 1):
+            if key is None or not get_cache().contains(key):
+                await breaker.acquire()
+            result = await run_attempt(prompt, app, timeout, context, keep_context, attempt, key, fork)
+            if result.cache != "hit":
+                breaker.record(result.succeeded)
+            if result.succeeded:
+                return True, result.context
+            if result.reason not in RETRY_REASONS or attempt == attempts:
+                break
+            delay = retry_policy.delay(attempt)
+            logger.warning(f"Retrying prompt {prompt_id} in {delay:.1f} seconds (attempt {attempt + 1} of {attempts}).")
+            metrics.observe_retry(prompt_id)
+            job_events.publish(prompt_id, "retrying")
+            await asyncio.sleep(delay)
+    finally:
+        if key is not None:
+            _in_flight.pop(key).set_result(None)
+    add_dead_letter(prompt, attempt, result)
+    return False, None
+
+async def run_attempt(prompt, app=None, timeout=None, context=None, keep_context=False, attempt=1,
+                      cache_key=None, fork=False):
+    """
+    Runs a prompt once and returns an Attempt. With a `cache_key`, a cached
+    result is copied instead of calling the backend, and a fresh result is
+    added to the cache.
+
+    The run is cancelled after `timeout` seconds (DISPATCH_TIMEOUT by
+    default) so a hung invocation cannot hold a worker forever. The response
+    is streamed into a per-run file under RUNS_DIR and into the Output tab
+    of `app`, or of the TUI running the scheduler (see ui_app). Every run
+    is recorded in the run history.
+    """
+    if timeout is None:
+        timeout = DISPATCH_TIMEOUT
+    app = app or ui_app()
+    prompt_id = prompt["id"]
+    output_path = run_output_path(RUNS_DIR, prompt_id)
+    on_text = None
+    if app:
+        app.query_one("#loading_indicator").styles.display = "block"
+        output_view = app.query_one("#output_view")
+        output_view.start_run(prompt_id, output_path)
+        on_text = lambda text: output_view.write(output_path, text)
+    status = "failed"
+    reason = None
+    returncode = None
+    cache = None
+    started = time.time()
+    job_events.publish(prompt_id, "running", started=started)
     logger.info(f"Dispatching prompt: {prompt['prompt']}")
+    backend = get_backend()
     try:
-        # Assuming 'claude' is in the system's PATH
-        result = subprocess.run(['claude', 'code', '-p', prompt['prompt']],
-                                capture_output=True, text=True, check=True)
-        response = result.stdout
-        logger.info(f"Received response: {response}")
+        cached = get_cache().get(cache_key) if cache_key else None
+        if cached is not None:
+            cache, status, returncode = "hit", "done", 0
+            copy_output(cached, output_path, on_text)
+            logger.info(f"Cache hit for prompt {prompt_id}: {output_path.stat().st_size} bytes copied to {output_path}")
+            return Attempt(True, None, status, None, None, cache)
+        if cache_key:
+            cache = "miss"
+        try:
+            returncode, error, context = await asyncio.wait_for(
+                backend.run(prompt['prompt'], output_path, on_text, context, keep_context, fork), timeout)
+        except asyncio.TimeoutError:
+            status, reason = "timed out", "timeout"
+            logger.error(f"Prompt {prompt_id} timed out after {timeout} seconds.")
+            return Attempt(False, None, status, reason, f"timed out after {timeout} seconds", cache)
+
+        if returncode != 0:
+            reason = "exit_status"
+            logger.error(f"Error calling {backend.name}: exit status {returncode}")
+            logger.error(f"Stderr: {error}")
+            return Attempt(False, None, status, reason, f"exit status {returncode}: {error}", cache)
 
-        if prompt.get("next_prompt_id"):
-            dispatch_prompt(prompt["next_prompt_id"], app)
+        status = "done"
+        logger.info(f"Received response: {output_path.stat().st_size} bytes written to {output_path}")
+        if cache_key:
+            get_cache().put(cache_key, output_path, cache_ttl(prompt))
+        return Attempt(True, context, status, None, None, cache)
 
     except FileNotFoundError:
+        reason = "cli_missing"
         logger.error("The 'claude' command was not found.")
         logger.error("Please ensure the Claude Code CLI is installed and in your PATH.")
         logger.error("You can install it by following the instructions here: https://docs.anthropic.com/claude/docs/claude-code-cli")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error calling Claude Code CLI: {e}")
-        logger.error(f"Stderr: {e.stderr}")
+        return Attempt(False, None, status, reason, "claude command not found", cache)
     finally:
-        app.query_one("#loading_indicator").styles.display = "none"
+        record_run(prompt_id, started, returncode, status, output_path, attempt, cache)
+        metrics.observe_run(prompt_id, status, time.time() - started, reason)
+        if cache:
+            metrics.observe_cache(cache)
+        job_events.publish(prompt_id, status, started=started)
+        if app:
+            output_view.end_run(output_path, status)
+            if dispatch_pool.active <= 1:
+                app.query_one("#loading_indicator").styles.display = "none"
 
+# Batches being waited on in the background, so they aren't garbage-collected.
+_batches = set()
 
-def load_prompts():
+async def dispatch_batch(prompt_ids, app=None):
+    """
+    Dispatches prompts that fired at the same instant as one bulk submission
+    through the backend's run_batch. A batch can take hours to end, so only
+    starting it holds a pool worker: it is waited on in the background (see
+    await_batch) and the task is returned.
+    """
+    prompts = []
+    for prompt_id in prompt_ids:
+        prompt = get_store().get(prompt_id)
+        if prompt:
+            prompts.append(prompt)
+        else:
+            logger.error(f"Prompt with id {prompt_id} not found.")
+    if not prompts:
+        return None
+
+    await breaker.acquire()
+    started = time.time()
+    for prompt in prompts:
+        job_events.publish(prompt["id"], "running", started=started)
+    logger.info(f"Dispatching batch of {len(prompts)} prompts: {[prompt['id'] for prompt in prompts]}")
+    task = asyncio.create_task(await_batch(prompts, started, app))
+    _batches.add(task)
+    task.add_done_callback(_batches.discard)
+    return task
+
+async def await_batch(prompts, started, app=None):
+    """
+    Waits up to BATCH_TIMEOUT for a batch to end, then fans the results back
+    out: every prompt gets its own output file, log lines and history
+    record, and its follow-up prompts are queued on the dispatch pool.
+    Prompts that failed in the batch are queued for their remaining
+    attempts one by one (see retry_batch_prompt).
+    """
+    output_paths = [run_output_path(RUNS_DIR, prompt["id"]) for prompt in prompts]
+    backend = get_backend()
+    try:
+        results = await asyncio.wait_for(backend.run_batch(
+            [(prompt["prompt"], path) for prompt, path in zip(prompts, output_paths)]), BATCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error(f"Batch of {len(prompts)} prompts timed out after {BATCH_TIMEOUT} seconds.")
+        breaker.record(False)
+        for prompt, path in zip(prompts, output_paths):
+            record_run(prompt["id"], started, None, "timed out", path)
+            metrics.observe_run(prompt["id"], "timed out", time.time() - started, "timeout")
+            job_events.publish(prompt["id"], "timed out", started=started)
+            dispatch_pool.submit_call(retry_batch_prompt, prompt, Attempt(
+                False, None, "timed out", "timeout", f"batch timed out after {BATCH_TIMEOUT} seconds"), app)
+        return
+
+    breaker.record(any(returncode == 0 for returncode, _, _ in results))
+    for prompt, path, (returncode, error, _) in zip(prompts, output_paths, results):
+        if returncode != 0:
+            logger.error(f"Error calling {backend.name} for prompt {prompt['id']}: exit status {returncode}")
+            logger.error(f"Stderr: {error}")
+            record_run(prompt["id"], started, returncode, "failed", path)
+            metrics.observe_run(prompt["id"], "failed", time.time() - started, "exit_status")
+            job_events.publish(prompt["id"], "failed", started=started)
+            dispatch_pool.submit_call(retry_batch_prompt, prompt, Attempt(
+                False, None, "failed", "exit_status", f"exit status {returncode}: {error}"), app)
+            continue
+        logger.info(f"Received response: {path.stat().st_size} bytes written to {path}")
+        record_run(prompt["id"], started, returncode, "done", path)
+        metrics.observe_run(prompt["id"], "done", time.time() - started)
+        job_events.publish(prompt["id"], "done", started=started)
+        for next_id in next_prompt_ids(prompt):
+            dispatch_pool.submit(next_id, app)
+
+async def retry_batch_prompt(prompt, result, app=None):
+    """
+    Gives a prompt whose first attempt failed in a batch its remaining
+    attempts individually, or adds it to the dead letters if it has none.
+    """
+    attempts = retry_policy.attempts(prompt)
+    if attempts == 1:
+        add_dead_letter(prompt, 1, result)
+        return
+    delay = retry_policy.delay(1)
+    logger.warning(f"Retrying prompt {prompt['id']} in {delay:.1f} seconds (attempt 2 of {attempts}).")
+    metrics.observe_retry(prompt["id"])
+    job_events.publish(prompt["id"], "retrying")
+    await asyncio.sleep(delay)
+    succeeded, _ = await run_prompt(prompt, app, first_attempt=2)
+    if succeeded:
+        for next_id in next_prompt_ids(prompt):
+            dispatch_pool.submit(next_id, app)
+
+def submit_batch(prompt_ids):
+    """
+    Queues prompts that share a fire time, as one batch when batch_dispatch
+    is on, the backend supports bulk submission and there are at least
+    BATCH_MIN_SIZE of them, and one by one otherwise.
+    """
+    if BATCH_DISPATCH and len(prompt_ids) >= BATCH_MIN_SIZE and get_backend().supports_batch:
+        dispatch_pool.submit_call(dispatch_batch, prompt_ids)
+    else:
+        for prompt_id in prompt_ids:
+            dispatch_pool.submit(prompt_id)
+
+def record_run(prompt_id, started, returncode, status, output_path, attempt=1, cache=None):
+    """
+    Records a finished dispatch in the run history and adds its response
+    to the search index.
+    """
+    ended = time.time()
+    run_id = uuid.uuid4().hex
+    get_history().record({
+        "run_id": run_id,
+        "prompt_id": prompt_id,
+        "started": started,
+        "ended": ended,
+        "duration": ended - started,
+        "exit_code": returncode,
+        "status": status,
+        "output": str(output_path),
+        "output_bytes": output_path.stat().st_size if output_path.exists() else 0,
+        "attempt": attempt,
+        "cache": cache,
+    })
+    if status == "done":
+        try:
+            get_search_index().index_response(run_id, prompt_id, started, output_path)
+        except sqlite3.Error:
+            logger.exception(f"Could not index the response of prompt {prompt_id}")
+
+def add_dead_letter(prompt, attempts, result):
     """
-    Loads prompts from the prompts.jsonl file.
+    Records a prompt that failed for good, keeping the newest
+    MAX_DEAD_LETTERS.
     """
-    if not PROMPTS_FILE.exists():
-        return []
+    dead_letters = get_dead_letters()
+    dead_letters.add({
+        "id": uuid.uuid4().hex,
+        "prompt_id": prompt["id"],
+        "prompt": prompt.get("prompt", ""),
+        "failed_at": time.time(),
+        "attempts": attempts,
+        "status": result.status,
+        "reason": result.reason,
+        "error": (result.error or "")[-2000:],
+    })
+    metrics.observe_dead_letter(prompt["id"])
+    logger.error(f"Prompt {prompt['id']} failed after {attempts} attempt(s); added to the dead letters.")
+    while dead_letters.count() > MAX_DEAD_LETTERS:
+        dead_letters.delete_at(0)
+
+def retry_dead_letter(letter_id):
+    """
+    Dispatches a dead letter's prompt again and drops the letter. Returns
+    the letter, or None if it doesn't exist.
+    """
+    letter = get_dead_letters().get(letter_id)
+    if letter is None or not get_dead_letters().delete(letter_id):
+        return None
+    dispatch_pool.submit(letter["prompt_id"])
+    return letter
+
+def dismiss_dead_letter(letter_id):
+    """
+    Drops a dead letter. Returns the letter, or None if it doesn't exist.
+    """
+    letter = get_dead_letters().get(letter_id)
+    if letter is None or not get_dead_letters().delete(letter_id):
+        return None
+    return letter
+
+_backends = {}
 
-    with open(PROMPTS_FILE, "r") as f:
-        prompts = [json.loads(line) for line in f if line.strip()]
-    return prompts
+def get_backend():
+    """
+    Returns the dispatch backend selected by [Claude] backend in config.ini.
+
+    Backends are created once and reused, which lets the API backend keep
+    its HTTP connections open between dispatches.
+    """
+    if BACKEND not in _backends:
+        if BACKEND == "api":
+            claude = config['Claude'] if config.has_section('Claude') else {}
+            _backends[BACKEND] = ApiBackend(
+                api_key=claude.get('api_key'),
+                model=claude.get('model', 'claude-sonnet-4-20250514'),
+                max_tokens=int(claude.get('max_tokens', 4096)),
+                base_url=claude.get('base_url'),
+                batch_poll_interval=float(claude.get('batch_poll_interval', 30)),
+            )
+        else:
+            _backends[BACKEND] = CliBackend(config.get('Claude', 'cli_command', fallback='claude'))
+    return _backends[BACKEND]
+
+_histories = {}
+
+def get_history():
+    """
+    Returns the run history for the configured directory. Responses of runs
+    it expires are dropped from the search index too.
+    """
+    if HISTORY_DIR not in _histories:
+        _histories[HISTORY_DIR] = RunHistory(
+            HISTORY_DIR, HISTORY_MAX_BYTES, HISTORY_BACKUP_COUNT,
+            on_expire=lambda runs: get_search_index().remove_responses(run["run_id"] for run in runs))
+    return _histories[HISTORY_DIR]
+
+_dead_letters = {}
+
+def get_dead_letters():
+    """
+    Returns the dead letters: prompts that still failed after their last
+    retry, one JSON record per line in [Retry] dead_letters.
+    """
+    if DEAD_LETTERS_FILE not in _dead_letters:
+        _dead_letters[DEAD_LETTERS_FILE] = open_jsonl_store(DEAD_LETTERS_FILE)
+    return _dead_letters[DEAD_LETTERS_FILE]
+
+_caches = {}
+
+def get_cache():
+    """
+    Returns the result cache in [Cache] directory.
+    """
+    if CACHE_DIR not in _caches:
+        _caches[CACHE_DIR] = ResultCache(CACHE_DIR, CACHE_MAX_BYTES, CACHE_MAX_ENTRIES)
+    return _caches[CACHE_DIR]
+
+_watermarks = {}
+
+def get_watermarks():
+    """
+    Returns the store of last fire times in [Catchup] watermarks.
+    """
+    if WATERMARKS_DB not in _watermarks:
+        _watermarks[WATERMARKS_DB] = WatermarkStore(WATERMARKS_DB)
+    return _watermarks[WATERMARKS_DB]
+
+_search_indexes = {}
+# Search index path -> store version the index's prompts were last synced at.
+_search_synced = {}
+
+def get_search_index():
+    """
+    Returns the search index in [Search] index.
+    """
+    if SEARCH_DB not in _search_indexes:
+        _search_indexes[SEARCH_DB] = SearchIndex(SEARCH_DB, SEARCH_MAX_RESPONSE_BYTES)
+    return _search_indexes[SEARCH_DB]
+
+def synced_search_index():
+    """
+    Returns the search index after catching up with prompt changes it
+    missed, e.g. edits of prompts.jsonl by hand or by an older version.
+    Mutations through this module update the index as they go, so this is
+    a version check unless something else wrote to the store.
+    """
+    index = get_search_index()
+    version = get_store().version()
+    if _search_synced.get(SEARCH_DB) != version:
+        changed = index.sync_prompts(get_store().all())
+        if changed:
+            logger.info(f"Updated {changed} prompts in the search index")
+        _search_synced[SEARCH_DB] = get_store().version()
+    return index
+
+def update_search_index(prompt, version, deleted=False):
+    """
+    Applies one prompt change to the search index. `version` is the
+    store's version before the change.
+    """
+    index = get_search_index()
+    if deleted:
+        index.remove_prompt(prompt["id"])
+    else:
+        index.index_prompt(prompt)
+    if _search_synced.get(SEARCH_DB) == version:
+        _search_synced[SEARCH_DB] = get_store().version()
+
+def search_prompts(query, limit=100):
+    """
+    Returns the prompts whose text or tags match `query` (words, "quoted
+    phrases" and tag:name terms, see ccc.search.fts_query) in the order
+    they were indexed. Matches are not ranked, so a query stops at `limit`.
+    """
+    store = get_store()
+    prompts = (store.get(prompt_id) for prompt_id in synced_search_index().search_prompts(query, limit))
+    return [prompt for prompt in prompts if prompt]
+
+def search_responses(query, limit=20):
+    """
+    Returns the newest runs whose response matches `query`, as dicts with
+    run_id, prompt_id, started and output. Matches are not ranked.
+    """
+    return get_search_index().search_responses(query, limit)
+
+def reindex():
+    """
+    Rebuilds the search index from the prompt store and the run history,
+    e.g. to include responses from before the index existed. Returns
+    (prompts, responses) indexed.
+    """
+    index = get_search_index()
+    index.sync_prompts(get_store().all())
+    _search_synced[SEARCH_DB] = get_store().version()
+    index.clear_responses()
+    responses = 0
+    for run in get_history().runs_between(0, time.time() + 1):
+        if run["status"] == "done" and run["output"]:
+            responses += index.index_response(run["run_id"], run["prompt_id"], run["started"], run["output"])
+    return get_store().count(), responses
+
+_stores = {}
+
+def get_store():
+    """
+    Returns the prompt store for the configured backend.
+
+    With the sqlite backend, a database that doesn't exist yet is seeded once
+    from the prompts.jsonl file.
+    """
+    if STORE_BACKEND == "sqlite":
+        key = ("sqlite", PROMPTS_DB)
+        if key not in _stores:
+            is_new = not PROMPTS_DB.exists()
+            _stores[key] = SqlitePromptStore(PROMPTS_DB)
+            if is_new and PROMPTS_FILE.exists():
+                count = import_jsonl(PROMPTS_FILE, _stores[key])
+                logger.info(f"Imported {count} prompts from {PROMPTS_FILE} into {PROMPTS_DB}")
+    else:
+        key = ("jsonl", PROMPTS_FILE)
+        if key not in _stores:
+            _stores[key] = open_jsonl_store(PROMPTS_FILE)
+    return _stores[key]
+
+def open_jsonl_store(path):
+    """
+    Returns a JSONL store with the [Store] journal settings, whose batched
+    journal writes are fsynced when the process exits.
+    """
+    store = JsonlPromptStore(path, fsync_interval=STORE_FSYNC_INTERVAL, compact_ops=STORE_COMPACT_OPS,
+                             lazy_bytes=STORE_LAZY_BYTES)
+    atexit.register(store.sync)
+    return store
+
+def load_prompts():
+    """
+    Loads all prompts from the prompt store.
+    """
+    return get_store().all()
 
 def save_prompts(prompts):
     """
-    Saves prompts to the prompts.jsonl file.
+    Replaces all prompts in the prompt store.
     """
-    with open(PROMPTS_FILE, "w") as f:
-        for prompt in prompts:
-            f.write(json.dumps(prompt) + "\n")
+    get_store().replace_all(prompts)
 
 import uuid
 
-def add_prompt(prompt_text, schedule_text, conversation_id=None, next_prompt_id=None):
+def add_prompt(prompt_text, schedule_text, conversation_id=None, next_prompt_id=None, prompt_id=None,
+               tags=None):
     """
-    Adds a new prompt to the prompts file.
+    Adds a new prompt to the prompt store and returns its id. The id is
+    generated unless given, e.g. to link prompts of a new conversation.
     """
-    prompts = load_prompts()
-    prompt_id = str(uuid.uuid4())
-    prompts.append({
+    prompt_id = prompt_id or str(uuid.uuid4())
+    prompt = {
         "id": prompt_id,
         "prompt": prompt_text,
         "schedule": schedule_text,
         "conversation_id": conversation_id,
         "next_prompt_id": next_prompt_id,
-    })
-    save_prompts(prompts)
-    schedule_prompts()
+    }
+    if tags:
+        prompt["tags"] = parse_tags(" ".join(tags))
+    version = get_store().version()
+    get_store().add(prompt)
+    update_search_index(prompt, version)
+    reschedule_prompt(prompt)
+    update_schedule_synced(version)
+    return prompt_id
 
 def list_prompts():
     """
@@ -113,327 +702,338 @@ def delete_prompt(prompt_index):
     """
     Deletes a prompt by its index.
     """
-    prompts = load_prompts()
-    if 0 <= prompt_index < len(prompts):
-        prompts.pop(prompt_index)
-        save_prompts(prompts)
-        schedule_prompts(app=None) # This is a hack for the tests
+    version = get_store().version()
+    prompt = get_store().delete_at(prompt_index)
+    if prompt and prompt.get("id"):
+        update_search_index(prompt, version, deleted=True)
+        get_watermarks().remove(prompt["id"])
+        scheduler.remove(prompt["id"])
+    update_schedule_synced(version)
 
 def edit_prompt(prompt_index, new_prompt_text, new_schedule_text):
     """
     Edits a prompt by its index.
     """
-    prompts = load_prompts()
-    if 0 <= prompt_index < len(prompts):
-        prompts[prompt_index]["prompt"] = new_prompt_text
-        prompts[prompt_index]["schedule"] = new_schedule_text
-        save_prompts(prompts)
-        schedule_prompts()
+    version = get_store().version()
+    prompt = get_store().update_at(prompt_index, {"prompt": new_prompt_text, "schedule": new_schedule_text})
+    if prompt:
+        if prompt.get("id"):
+            update_search_index(prompt, version)
+        reschedule_prompt(prompt)
+        update_schedule_synced(version)
 
-from croniter import croniter
-import datetime
+def edit_prompt_by_id(prompt_id, new_prompt_text, new_schedule_text, tags=None):
+    """
+    Edits a prompt by its id and returns the updated prompt, or None if it
+    doesn't exist. Its tags are replaced unless `tags` is None.
+    """
+    store = get_store()
+    fields = {"prompt": new_prompt_text, "schedule": new_schedule_text}
+    if tags is not None:
+        fields["tags"] = parse_tags(" ".join(tags))
+    version = store.version()
+    if not store.update(prompt_id, fields):
+        return None
+    prompt = store.get(prompt_id)
+    update_search_index(prompt, version)
+    reschedule_prompt(prompt)
+    update_schedule_synced(version)
+    return prompt
 
-def run_and_reschedule(prompt_id, schedule_text, app):
+def delete_prompt_by_id(prompt_id):
     """
-    Runs a prompt and reschedules it.
+    Deletes a prompt by its id and returns it, or None if it doesn't exist.
     """
-    dispatch_prompt(prompt_id, app)
-    base = datetime.datetime.now()
-    iter = croniter(schedule_text, base)
-    next_run = iter.get_next(datetime.datetime)
-    schedule.every().day.at(next_run.strftime("%H:%M")).do(run_and_reschedule, prompt_id, schedule_text, app)
+    store = get_store()
+    prompt = store.get(prompt_id)
+    version = store.version()
+    if prompt is None or not store.delete(prompt_id):
+        return None
+    update_search_index(prompt, version, deleted=True)
+    get_watermarks().remove(prompt_id)
+    scheduler.remove(prompt_id)
+    update_schedule_synced(version)
+    return prompt
 
-def schedule_prompts(app):
+def move_prompt(prompt_id, conversation_id):
     """
-    Schedules all prompts from the prompts file.
+    Moves a prompt into another conversation and returns the updated prompt,
+    or None if it doesn't exist.
     """
-    schedule.clear()
-    prompts = load_prompts()
-    for prompt in prompts:
-        # Only schedule prompts that are not part of a conversation,
-        # or are the first prompt in a conversation.
-        if not prompt.get("conversation_id") or prompt.get("is_first"):
-            schedule_text = prompt.get("schedule")
-            if schedule_text:
-                if croniter.is_valid(schedule_text):
-                    base = datetime.datetime.now()
-                    iter = croniter(schedule_text, base)
-                    next_run = iter.get_next(datetime.datetime)
-                    schedule.every().day.at(next_run.strftime("%H:%M")).do(run_and_reschedule, prompt["id"], schedule_text, app)
-                else:
-                    # Fallback to simple schedule parsing for now
-                    if "every" in schedule_text and "minute" in schedule_text:
-                         schedule.every().minute.do(dispatch_prompt, prompt_id=prompt["id"], app=app)
-
-def main(app):
-    """
-    Main function to run the scheduler.
-    """
-    schedule_prompts(app)
+    store = get_store()
+    version = store.version()
+    if not store.update(prompt_id, {"conversation_id": conversation_id}):
+        return None
+    prompt = store.get(prompt_id)
+    update_search_index(prompt, version)
+    reschedule_prompt(prompt)
+    update_schedule_synced(version)
+    return prompt
 
+from ccc.pool import DispatchPool
+
+def prompt_flow(prompt):
+    """
+    Returns the flow a prompt's dispatches share the queue in: its
+    conversation, else its first tag, else "default".
+    """
+    if prompt.get("conversation_id"):
+        return prompt["conversation_id"]
+    tags = prompt.get("tags") or []
+    return str(tags[0]).lower() if tags else "default"
+
+def dispatch_class(prompt_ids, *args):
+    """
+    Returns the (priority, flow) the dispatch pool queues a prompt, or a
+    batch of prompts, under. A batch takes its most urgent prompt's
+    priority.
+    """
+    if isinstance(prompt_ids, str):
+        prompt_ids = [prompt_ids]
+    store = get_store()
+    prompts = [prompt for prompt in map(store.get, prompt_ids) if prompt]
+    if not prompts:
+        return 0, "default"
+    return max(parse_priority(prompt.get("priority")) for prompt in prompts), prompt_flow(prompts[0])
+from ccc.scheduler import AsyncScheduler, cron_expression
+
+# Due prompts are handed to this pool so that the scheduler never waits on a
+# Claude invocation. Both report job state changes to the Queue tab through
+# job_events, and timings to the stats panel and /metrics through metrics.
+job_events = EventChannel()
+metrics = DispatchMetrics()
+retry_policy = RetryPolicy(MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+breaker = CircuitBreaker(BREAKER_FAILURE_RATE, BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_COOLDOWN)
+metrics.track_breaker(breaker)
+dispatch_pool = DispatchPool(dispatch_prompt, max_workers=MAX_CONCURRENCY, metrics=metrics,
+                             classify=dispatch_class, weights=FLOW_WEIGHTS,
+                             rate_limiter=TokenBucket(RATE_LIMIT, RATE_BURST))
+metrics.track_pool(dispatch_pool)
+scheduler = AsyncScheduler(dispatch_pool.submit, lookahead=LOOKAHEAD, submit_batch=submit_batch,
+                           events=job_events, metrics=metrics, fired=lambda fires: get_watermarks().advance(fires))
+
+def prompt_text(prompt_id):
+    """
+    Returns the text of a prompt, or None if it doesn't exist.
+    """
+    prompt = get_store().get(prompt_id)
+    return prompt["prompt"] if prompt else None
+
+def scheduled_expression(prompt):
+    """
+    Returns the cron expression a prompt should be scheduled by, or None if
+    it shouldn't be scheduled.
+    """
+    # Records without an id can't be looked up at dispatch time.
+    if not prompt.get("id"):
+        return None
+    # Only schedule prompts that are not part of a conversation,
+    # or are the first prompt in a conversation.
+    if not prompt.get("conversation_id") or prompt.get("is_first"):
+        return cron_expression(prompt.get("schedule"))
+    return None
+
+def reschedule_prompt(prompt):
+    """
+    Adds, replaces or removes the scheduler job of a single prompt.
+    """
+    if not prompt.get("id"):
+        return
+    expression = scheduled_expression(prompt)
+    if expression:
+        scheduler.add(prompt["id"], expression)
+    else:
+        scheduler.remove(prompt["id"])
+
+# Prompt store -> store version the scheduler's jobs were last synced at.
+_schedule_synced = {}
+
+def schedule_prompts(app=None):
+    """
+    Schedules all prompts from the prompt store from scratch.
+
+    This is only needed at startup; mutations reschedule the touched prompt
+    through reschedule_prompt, and changes by other processes are picked up
+    by resync_prompts.
+    """
+    store = get_store()
+    version = store.version()
+    scheduler.clear()
+    for prompt in load_prompts():
+        reschedule_prompt(prompt)
+    _schedule_synced[store] = version
+
+def update_schedule_synced(version):
+    """
+    Notes that a mutation through this module rescheduled what it changed.
+    `version` is the store's version before the change.
+    """
+    store = get_store()
+    if _schedule_synced.get(store) == version:
+        _schedule_synced[store] = store.version()
+
+def sync_schedule():
+    """
+    Reschedules the prompts whose schedule differs from their job, and
+    unschedules jobs of prompts that are gone. Returns how many changed.
+    """
+    store = get_store()
+    version = store.version()
+    expressions = {}
+    for prompt in store.all():
+        expression = scheduled_expression(prompt)
+        if expression:
+            expressions[prompt["id"]] = expression
+    changed = 0
+    for prompt_id in scheduler:
+        if prompt_id not in expressions:
+            scheduler.remove(prompt_id)
+            changed += 1
+    for prompt_id, expression in expressions.items():
+        if scheduler.expression(prompt_id) != expression:
+            scheduler.add(prompt_id, expression)
+            changed += 1
+    _schedule_synced[store] = version
+    return changed
+
+_coordinators = {}
+
+def get_coordinator():
+    """
+    Returns the shard coordinator for the configured lease database.
+    """
+    if LEASES_DB not in _coordinators:
+        _coordinators[LEASES_DB] = ShardCoordinator(
+            LeaseStore(LEASES_DB), dispatch_pool.submit, lease_ttl=LEASE_TTL,
+            heartbeat_interval=HEARTBEAT_INTERVAL, takeover_delay=TAKEOVER_DELAY)
+    return _coordinators[LEASES_DB]
+
+async def resync_prompts():
+    """
+    Checks every RESYNC_INTERVAL seconds whether another process changed
+    the prompt store, such as `python -m ccc add` or another scheduler of a
+    cluster, and reschedules the prompts it changed (see sync_schedule).
+    Changes made through this module are already scheduled and skipped.
+    """
     while True:
-        schedule.run_pending()
-        time.sleep(1)
-
-from textual.app import App, ComposeResult
-from textual.widgets import Header, Footer, DataTable, Button, Input, Label, TabbedContent, TabPane, LoadingIndicator
-from textual.containers import Container
-from textual.screen import ModalScreen
-from textual.command import Hit, Hits, Provider
-from ccc.kanban import KanbanBoard
-from ccc.queue_view import QueueView
-
-class ConversationScreen(ModalScreen):
-    """A modal screen for managing conversations."""
-
-    def __init__(self, conversation_id=None):
-        super().__init__()
-        self.conversation_id = conversation_id if conversation_id else str(uuid.uuid4())
-        self.prompts = []
-
-    def compose(self) -> ComposeResult:
-        yield Container(
-            DataTable(id="conversation_table"),
-            Input(placeholder="Enter new prompt..."),
-            Button("Add Prompt to Conversation", id="add_prompt_to_conversation"),
-            Button("Save Conversation", id="save_conversation"),
-            Button("Cancel", id="cancel_conversation"),
-            id="conversation_dialog",
-        )
-
-    def on_button_pressed(self, event: Button.Pressed) -> None:
-        if event.button.id == "add_prompt_to_conversation":
-            prompt_input = self.query_one(Input)
-            prompt_text = prompt_input.value
-            if prompt_text:
-                self.prompts.append({"prompt": prompt_text, "schedule": ""})
-                self.update_conversation_table()
-                prompt_input.value = ""
-        elif event.button.id == "save_conversation":
-            self.save_conversation()
-            self.dismiss()
-        elif event.button.id == "cancel_conversation":
-            self.dismiss()
-
-    def update_conversation_table(self):
-        table = self.query_one("#conversation_table")
-        table.clear()
-        for prompt in self.prompts:
-            table.add_row(prompt["prompt"])
-
-    def save_conversation(self):
-        # This is a simplified save function. A more robust implementation
-        # would handle editing existing conversations.
-        for i, prompt_data in enumerate(self.prompts):
-            is_first = i == 0
-            next_prompt_id = self.prompts[i + 1]["id"] if i + 1 < len(self.prompts) else None
-            add_prompt(
-                prompt_data["prompt"],
-                "", # No schedule for prompts in a conversation for now
-                conversation_id=self.conversation_id,
-                next_prompt_id=next_prompt_id,
-            )
+        await asyncio.sleep(RESYNC_INTERVAL)
+        store = get_store()
+        if _schedule_synced.get(store) != store.version():
+            changed = sync_schedule()
+            if changed:
+                logger.info(f"Prompt store changed, rescheduled {changed} prompts.")
 
-class EditScreen(ModalScreen):
-    """A modal screen for editing a prompt."""
-
-    def __init__(self, prompt_index, prompt_text, schedule_text) -> None:
-        super().__init__()
-        self.prompt_index = prompt_index
-        self.prompt_text = prompt_text
-        self.schedule_text = schedule_text
-
-    def compose(self) -> ComposeResult:
-        yield Container(
-            Input(self.prompt_text, id="prompt_text"),
-            Input(self.schedule_text, id="schedule_text"),
-            Button("Save", id="save"),
-            Button("Cancel", id="cancel"),
-            id="dialog",
-        )
-
-    def on_button_pressed(self, event: Button.Pressed) -> None:
-        if event.button.id == "save":
-            prompt_text = self.query_one("#prompt_text").value
-            schedule_text = self.query_one("#schedule_text").value
-            self.dismiss((self.prompt_index, prompt_text, schedule_text))
-        else:
-            self.dismiss()
-
-class CommandProvider(Provider):
-    async def get_hits(self, query: str) -> Hits:
-        if query == "new_conversation":
-            yield Hit(1, "New Conversation", self.app.action_new_conversation)
-        elif query == "quit":
-            yield Hit(1, "Quit", self.app.action_quit)
-
-class CCC_TUI(App):
-    """A Textual app to manage Claude Code Companion prompts."""
-
-    BINDINGS = [("d", "toggle_dark", "Toggle dark mode"), ("ctrl+c", "quit", "Quit")]
-    COMMANDS = App.COMMANDS | {CommandProvider}
-
-    def compose(self) -> ComposeResult:
-        """Create child widgets for the app."""
-        yield Header()
-        with TabbedContent():
-            with TabPane("Prompts", id="prompts_tab"):
-                yield DataTable(id="prompts_table")
-            with TabPane("Queue", id="queue_tab"):
-                yield QueueView()
-            with TabPane("Kanban", id="kanban_tab"):
-                yield KanbanBoard()
-        yield VerticalScroll(
-            Input(placeholder="Enter new prompt..."),
-            Input(placeholder="Enter schedule (e.g., 'every_minute')"),
-            Button("Add Prompt", id="add_prompt"),
-            Button("Manage Conversations", id="manage_conversations"),
-        )
-        yield Footer()
-        yield LoadingIndicator(id="loading_indicator", style="display: none;")
-        yield Label("Status: Ready", id="status")
-
-    def on_mount(self) -> None:
-        """Called when the app is mounted."""
-        prompts_table = self.query_one("#prompts_table")
-        prompts_table.add_columns("Prompt", "Schedule", "Actions")
-        queue_table = self.query_one("#queue_table")
-        queue_table.add_columns("Next Run", "Prompt")
-        self.update_tables()
-
-    def update_tables(self):
-        """Update both tables with the latest prompts and queue."""
-        self.update_prompts_table()
-        self.update_queue_table()
-        self.update_kanban_board()
-
-    def update_prompts_table(self):
-        """Update the prompts table with the latest prompts."""
-        table = self.query_one("#prompts_table")
-        table.clear()
-        prompts = list_prompts()
-        for i, prompt in enumerate(prompts):
-            table.add_row(
-                prompt["prompt"],
-                prompt["schedule"],
-                f"[link=edit:{i}]Edit[/link] | [link=delete:{i}]Delete[/link]",
-            )
+def catch_up_policy(prompt_id):
+    """
+    Returns a prompt's catch-up policy: its catch_up field, else [Catchup]
+    policy.
+    """
+    prompt = get_store().get(prompt_id) or {}
+    policy = prompt.get("catch_up") or CATCHUP_POLICY
+    if policy not in POLICIES:
+        logger.warning(f"Unknown catch_up policy {policy!r} of prompt {prompt_id}, using {CATCHUP_POLICY}")
+        return CATCHUP_POLICY
+    return policy
 
-    def update_queue_table(self):
-        """Update the queue table with upcoming prompts."""
-        queue_view = self.query_one(QueueView)
-        queue_view.update_queue(schedule.jobs)
-
-    def update_kanban_board(self):
-        """Update the Kanban board with conversations."""
-        kanban_board = self.query_one(KanbanBoard)
-        # This is a simplified implementation. A more robust implementation
-        # would involve a more complex data structure.
-        prompts = load_prompts()
-        conversations = {}
-        for prompt in prompts:
-            if prompt.get("conversation_id"):
-                if prompt["conversation_id"] not in conversations:
-                    conversations[prompt["conversation_id"]] = []
-                conversations[prompt["conversation_id"]].append(prompt)
-
-        # Clear the board
-        for child in kanban_board.query("*"):
-            child.remove()
-
-        for conversation_id, prompts in conversations.items():
-            column = KanbanColumn(title=f"Conversation {conversation_id[:8]}")
-            for prompt in prompts:
-                column.query_one(".column_content").mount(KanbanCard(text=prompt["prompt"]))
-            kanban_board.query_one(Horizontal).mount(column)
-
-    def on_data_table_cell_selected(self, event: DataTable.CellSelected) -> None:
-        """Event handler for cell selection."""
-        if event.cell_key.column_key == "Actions":
-            action, index_str = event.value.split(":")
-            index = int(index_str)
-            if action == "delete":
-                delete_prompt(index)
-                self.update_tables()
-                self.notify("Prompt deleted successfully.")
-            elif action == "edit":
-                prompts = list_prompts()
-                prompt_to_edit = prompts[index]
-                self.push_screen(
-                    EditScreen(index, prompt_to_edit["prompt"], prompt_to_edit["schedule"]),
-                    self.on_edit_screen_dismiss,
-                )
-
-    def on_edit_screen_dismiss(self, result) -> None:
-        """Called when the EditScreen is dismissed."""
-        if result:
-            index, prompt_text, schedule_text = result
-            edit_prompt(index, prompt_text, schedule_text)
-            self.update_tables()
-            self.notify("Prompt updated successfully.")
-
-    def notify(self, message: str):
-        """Display a notification in the footer."""
-        self.query_one(Footer).query_one(Label).update(message)
-
-    def on_button_pressed(self, event: Button.Pressed) -> None:
-        """Event handler called when a button is pressed."""
-        if event.button.id == "add_prompt":
-            prompt_input = self.query(Input)[0]
-            schedule_input = self.query(Input)[1]
-            prompt_text = prompt_input.value
-            schedule_text = schedule_input.value
-            if prompt_text and schedule_text:
-                add_prompt(prompt_text, schedule_text)
-                self.update_tables()
-                prompt_input.value = ""
-                schedule_input.value = ""
-                self.notify("Prompt added successfully.")
-        elif event.button.id == "manage_conversations":
-            self.push_screen(ConversationScreen())
-
-    def action_toggle_dark(self) -> None:
-        """An action to toggle dark mode."""
-        self.dark = not self.dark
-
-    def action_new_conversation(self) -> None:
-        """An action to create a new conversation."""
-        self.push_screen(ConversationScreen())
-
-    def action_quit(self) -> None:
-        """An action to quit the application."""
-        self.exit()
-
-import threading
-
-def run_scheduler(app):
-    """
-    Target function for the scheduler thread.
-    """
-    main(app)
-
-def show_welcome_message():
-    """
-    Shows a welcome message to new users.
-    """
-    if not Path(".onboarding_complete").exists():
-        # This is a simplified welcome message. A more robust implementation
-        # could use a dedicated screen.
-        print("Welcome to the Claude Code Companion!")
-        print("This application allows you to schedule prompts to be sent to Claude Code.")
-        print("You can add, edit, and delete prompts using the TUI.")
-        print("You can also create conversational workflows by chaining prompts together.")
-        print("Enjoy!")
-        Path(".onboarding_complete").touch()
-
-if __name__ == "__main__":
-    show_welcome_message()
-
-    app = CCC_TUI()
-
-    # Run the scheduler in a background thread
-    scheduler_thread = threading.Thread(target=run_scheduler, args=(app,), daemon=True)
-    scheduler_thread.start()
-
-    # Run the TUI
-    app.run()
+async def catch_up(claim=None):
+    """
+    Dispatches the fires that scheduled prompts missed while no scheduler
+    ran, according to each prompt's catch-up policy (see ccc.catchup).
+
+    Must run after schedule_prompts: a prompt missed every fire between its
+    watermark and its next scheduled fire. The catch-up runs go through the
+    dispatch pool, at most [Catchup] max_concurrency at a time, in prompt id
+    order and oldest fire first, so a restart after a long outage doesn't
+    flood the pool. In cluster mode `claim` makes sure only one scheduler
+    runs each missed fire. Prompts that have never fired get a watermark
+    now, so the next outage is noticed.
+    """
+    try:
+        watermarks = get_watermarks()
+        jobs = [(job.prompt_id, job.expression, job.next_run.timestamp()) for job in scheduler.jobs]
+        marks = watermarks.all()
+        plan = plan_catch_up(jobs, marks, catch_up_policy, max_replays=CATCHUP_MAX_REPLAYS,
+                             max_age=CATCHUP_MAX_AGE)
+        now = time.time()
+        watermarks.advance([(prompt_id, now) for prompt_id, _, _ in jobs if prompt_id not in marks])
+        for item in plan:
+            logger.info(f"Prompt {item.prompt_id} missed {item.missed} fire(s); {item.policy}: "
+                        f"running {len(item.fires)}")
+            metrics.observe_missed(item.policy, len(item.fires), item.missed - len(item.fires))
+        watermarks.advance([(item.prompt_id, now) for item in plan if not item.fires])
+        semaphore = asyncio.Semaphore(CATCHUP_CONCURRENCY)
+        await asyncio.gather(*(replay_missed(item, semaphore, claim) for item in plan if item.fires))
+    except Exception:
+        logger.exception("Catching up on missed fires failed")
+
+async def replay_missed(item, semaphore, claim=None):
+    """
+    Runs the missed fires of one prompt one after another, each once a
+    catch-up slot in `semaphore` is free.
+    """
+    for fire_time in item.fires:
+        if claim is not None and not claim(item.prompt_id, fire_time):
+            continue
+        async with semaphore:
+            get_watermarks().advance([(item.prompt_id, fire_time)])
+            job_events.publish(item.prompt_id, "queued")
+            done = asyncio.get_running_loop().create_future()
+            dispatch_pool.submit_call(dispatch_missed, item.prompt_id, done=done)
+            await done
+
+async def dispatch_missed(prompt_id, done):
+    """
+    Dispatches a missed fire and resolves the future `done` once it ended.
+    """
+    try:
+        await dispatch_prompt(prompt_id)
+    finally:
+        done.set_result(None)
+
+# The TUI the scheduler runs in, if any. Dispatches started by the scheduler,
+# catch-up or retries don't carry an app, but stream into its Output tab too.
+_ui_apps = {}
+
+def ui_app():
+    """
+    Returns the TUI running the scheduler, or None when headless.
+    """
+    return _ui_apps.get("scheduler")
+
+async def main(app=None, cluster=None):
+    """
+    Main coroutine that runs the scheduler on the current event loop.
+
+    In cluster mode ([Cluster] enabled, or `cluster=True`) this process is
+    one of several schedulers sharing the prompt store and the lease
+    database, and only dispatches the fires it wins (see ccc.shard).
+
+    Fires missed while no scheduler ran are caught up at startup (see
+    catch_up), and prompts changed by other processes are rescheduled
+    while it runs (see resync_prompts).
+    """
+    if cluster is None:
+        cluster = CLUSTER_ENABLED
+    if app is not None:
+        _ui_apps["scheduler"] = app
+    # Changes by other processes are picked up for as long as the scheduler runs.
+    resync = None
+    try:
+        schedule_prompts(app)
+        resync = asyncio.ensure_future(resync_prompts())
+        if not cluster:
+            await asyncio.gather(scheduler.run(), catch_up())
+            return
+        coordinator = get_coordinator()
+        coordinator.heartbeat()
+        scheduler.claim = coordinator.claim
+        logger.info(f"Scheduler {coordinator.worker_id} joined {coordinator.workers}")
+        try:
+            await asyncio.gather(scheduler.run(), coordinator.run(), catch_up(coordinator.claim))
+        finally:
+            scheduler.claim = None
+    finally:
+        if resync is not None:
+            resync.cancel()
+        if _ui_apps.get("scheduler") is app:
+            _ui_apps.pop("scheduler", None)
@@ -0,0 +1,259 @@
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import os
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the layout of saved indexes changes.
+INDEX_VERSION = 1
+# Bytes before the end of the indexed part of a file that must be unchanged
+# for a saved index to be extended rather than rebuilt.
+TAIL_BYTES = 64
+
+
+def id_hash(prompt_id):
+    """
+    Returns the signed 64-bit hash under which a prompt id is indexed.
+    """
+    key = prompt_id.encode() if isinstance(prompt_id, str) else json.dumps(prompt_id).encode() + b"\0"
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class MappedJsonl:
+    """
+    A read-only view of a JSONL file that parses records on access.
+
+    The file is memory-mapped and indexed in three arrays of 8-byte
+    integers: the offset of every record, the hash of its id and the record
+    numbers sorted by that hash, which `find` binary-searches. Parsed
+    records are kept in an LRU cache of `cache_size` records, so memory
+    grows with the records read rather than with the file. With a
+    `cache_size` of None every record is parsed up front and kept, and ids
+    are looked up in a dict instead of by hash.
+
+    Building the index parses every record once. With an `index_path` the
+    index is saved there and reused while the file is unchanged; if the
+    file only grew, just the new records are indexed. `index` passes in
+    (offsets, hashes, indexed bytes) for a file the caller just wrote, and
+    `parsed` {record number: record} for the records it has at hand; with
+    a `cache_size` of None the others are parsed. A `path` of None gives
+    an empty view.
+    """
+
+    def __init__(self, path, index_path=None, cache_size=None, index=None, parsed=None):
+        self.path = Path(path) if path else None
+        self.index_path = Path(index_path) if index_path else None
+        self.cache_size = cache_size
+        self._cache = {} if cache_size is None else OrderedDict()
+        self._ids = {} if cache_size is None else None
+        self._file = None
+        self._map = b""
+        self.signature = None
+        try:
+            self._file = open(self.path, "rb") if self.path else None
+        except FileNotFoundError:
+            pass
+        if self._file is not None:
+            stat = os.fstat(self._file.fileno())
+            self.signature = [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+            if stat.st_size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = array("q")
+        self.hashes = array("q")
+        self.order = array("q")
+        self._indexed = 0
+        if index is not None:
+            self.offsets, hashes, self._indexed = index
+            if self._ids is None:
+                self.hashes = hashes
+                self.order = array("q", sorted(range(len(hashes)), key=hashes.__getitem__))
+            parsed = parsed or {}
+            numbers = range(len(self.offsets)) if self._ids is not None else sorted(parsed)
+            for number in numbers:
+                self.prime(number, parsed[number] if number in parsed else self.record(number))
+            self._save_index()
+        elif not self._load_index():
+            self._extend()
+            self._save_index()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._map = b""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def raw(self, number):
+        """
+        Returns the bytes of a record's line, without the newline.
+        """
+        start = self.offsets[number]
+        end = self._map.find(b"\n", start, self._indexed)
+        return self._map[start:end if end >= 0 else self._indexed]
+
+    def cached(self, number):
+        """
+        Returns a record if it is parsed already, else None.
+        """
+        return self._cache.get(number)
+
+    def record(self, number, cache=True):
+        """
+        Returns a record, parsing it if it isn't cached. With `cache` False
+        a record that had to be parsed isn't kept (unless every record is).
+        """
+        record = self._cache.get(number)
+        if record is not None:
+            if self.cache_size is not None:
+                self._cache.move_to_end(number)
+            return record
+        record = json.loads(self.raw(number).decode())
+        if cache or self.cache_size is None:
+            self.prime(number, record)
+        return record
+
+    def records(self, start, stop, cache=True):
+        """
+        Returns the records numbered from `start` up to `stop`, like record.
+        """
+        if self._ids is None:
+            return [self.record(number, cache) for number in range(start, stop)]
+        parsed = self._cache
+        return [parsed[number] if number in parsed else self.record(number) for number in range(start, stop)]
+
+    def prime(self, number, record):
+        """
+        Caches the parsed form of a record.
+        """
+        self._cache[number] = record
+        if self._ids is not None:
+            if isinstance(record, dict) and record.get("id") is not None:
+                self._ids[record["id"]] = max(number, self._ids.get(record["id"], number))
+        else:
+            self._cache.move_to_end(number)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def id_hash(self, number):
+        """
+        Returns the id_hash of a record's id.
+        """
+        if self._ids is None:
+            return self.hashes[number]
+        record = self.record(number)
+        return id_hash(record.get("id") if isinstance(record, dict) else None)
+
+    def find(self, prompt_id):
+        """
+        Returns the numbers of the records with the given id, ascending.
+        """
+        if prompt_id is None:
+            return []
+        if self._ids is not None:
+            return [self._ids[prompt_id]] if prompt_id in self._ids else []
+        key = id_hash(prompt_id)
+        position = bisect.bisect_left(self.order, key, key=self.hashes.__getitem__)
+        numbers = []
+        while position < len(self.order) and self.hashes[self.order[position]] == key:
+            number = self.order[position]
+            record = self.record(number)
+            if isinstance(record, dict) and record.get("id") == prompt_id:
+                numbers.append(number)
+            position += 1
+        return sorted(numbers)
+
+    def _extend(self):
+        # Indexes the records after the indexed part of the file. A last
+        # line that is cut short is left for when the file grows again.
+        start = len(self.offsets)
+        position = self._indexed
+        size = len(self._map)
+        offsets, hashes, cache, ids = self.offsets, self.hashes, self._cache, self._ids
+        if self._file is not None:
+            self._file.seek(position)
+            for line in self._file:
+                if position + len(line) > size:
+                    # Written after the file was mapped.
+                    break
+                if not line.isspace():
+                    try:
+                        record = json.loads(line.decode())
+                    except ValueError:
+                        if line.endswith(b"\n"):
+                            raise
+                        break
+                    prompt_id = record.get("id") if isinstance(record, dict) else None
+                    if ids is None:
+                        hashes.append(id_hash(prompt_id))
+                    else:
+                        cache[len(offsets)] = record
+                        if prompt_id is not None:
+                            ids[prompt_id] = len(offsets)
+                    offsets.append(position)
+                position += len(line)
+        self._indexed = position
+        if self._ids is not None:
+            return
+        added = sorted(range(start, len(self.offsets)), key=self.hashes.__getitem__)
+        if not start:
+            self.order = array("q", added)
+        elif added:
+            self.order = array("q", heapq.merge(self.order, added, key=self.hashes.__getitem__))
+
+    def _tail(self):
+        return hashlib.blake2b(self._map[max(self._indexed - TAIL_BYTES, 0):self._indexed]).hexdigest()
+
+    def _load_index(self):
+        # Reads a saved index, extending it if the file grew since. Returns
+        # False if there is none that fits the file.
+        if self.index_path is None or self.signature is None:
+            return False
+        try:
+            with open(self.index_path, "rb") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != INDEX_VERSION:
+                    return False
+                count = header["count"]
+                for name in ("offsets", "hashes", "order"):
+                    getattr(self, name).fromfile(f, count)
+        except (OSError, ValueError, KeyError, EOFError, AttributeError):
+            self.offsets, self.hashes, self.order = array("q"), array("q"), array("q")
+            return False
+        self._indexed = header["indexed"]
+        if header["signature"] == self.signature:
+            return True
+        if (header["signature"][0] != self.signature[0] or len(self._map) < self._indexed
+                or header["tail"] != self._tail()):
+            self.offsets, self.hashes, self.order = array("q"), array("q"), array("q")
+            self._indexed = 0
+            return False
+        self._extend()
+        self._save_index()
+        return True
+
+    def _save_index(self):
+        if self.index_path is None or self.signature is None:
+            return
+        header = {"version": INDEX_VERSION, "signature": self.signature, "indexed": self._indexed,
+                  "count": len(self.offsets), "tail": self._tail()}
+        temporary = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temporary, "wb") as f:
+                f.write((json.dumps(header) + "\n").encode())
+                for values in (self.offsets, self.hashes, self.order):
+                    values.tofile(f)
+            os.replace(temporary, self.index_path)
+        except OSError as e:
+            logger.warning(f"Could not save the index of {self.path}: {e}")
@@ -0,0 +1,333 @@
+import asyncio
+import bisect
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds, in seconds. Claude turns take seconds to minutes;
+# scheduling lag and queue waits should stay well under a second.
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, math.inf)
+LAG_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300, math.inf)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    A metric family: one value (or histogram) per combination of label
+    values. Label values are passed positionally in the order of `labels`.
+    """
+
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self.values.get(label_values, 0)
+
+
+class Gauge(Metric):
+    """
+    A gauge that is either set, or read from `callback` when it is rendered.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, help, labels=(), callback=None):
+        super().__init__(name, help, labels)
+        self.callback = callback
+
+    def set(self, value, *label_values):
+        with self.lock:
+            self.values[label_values] = value
+
+    def value(self, *label_values):
+        if self.callback is not None:
+            return self.callback()
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        if self.callback is not None:
+            self.set(self.callback())
+        return super().render()
+
+
+class Histogram(Metric):
+    """
+    A cumulative histogram with fixed bucket bounds, as Prometheus expects.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        if self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            counts, total = self.values.get(label_values, ([0] * len(self.buckets), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[label_values] = (counts, total + value)
+
+    def count(self, *label_values):
+        counts, _ = self._merged(label_values)
+        return sum(counts)
+
+    def quantile(self, q, *label_values):
+        """
+        Estimates the q-quantile by interpolating within its bucket, like
+        PromQL's histogram_quantile. Label values that are left out are
+        aggregated over. Returns None without observations.
+        """
+        counts, _ = self._merged(label_values)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                upper = self.buckets[index]
+                lower = self.buckets[index - 1] if index else 0
+                if upper == math.inf:
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-2]
+
+    def _merged(self, label_values):
+        counts = [0] * len(self.buckets)
+        total = 0.0
+        with self.lock:
+            for key, (key_counts, key_total) in self.values.items():
+                if key[:len(label_values)] == label_values:
+                    counts = [a + b for a, b in zip(counts, key_counts)]
+                    total += key_total
+        return counts, total
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            for label_values, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _format_labels(self.labels, label_values, [("le", _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class DispatchMetrics:
+    """
+    Instrumentation of the scheduler and the dispatch pool.
+
+    The scheduler reports how late it noticed each fire (observe_lag), the
+    pool how long jobs waited for a worker (observe_queue_wait) and every
+    finished run its status, duration and, if it failed, why (observe_run).
+    `render` returns the Prometheus text exposition format; the TUI's stats
+    panel reads the same instruments through `snapshot`.
+    """
+
+    def __init__(self):
+        self.dispatch_seconds = Histogram(
+            "ccc_dispatch_duration_seconds", "Time from the start of a dispatch to its end.", ["status"])
+        self.schedule_lag = Histogram(
+            "ccc_schedule_lag_seconds", "Time from a prompt's cron fire time to it being queued.",
+            buckets=LAG_BUCKETS)
+        self.queue_wait = Histogram(
+            "ccc_queue_wait_seconds", "Time a queued dispatch waited for a free worker.", buckets=LAG_BUCKETS)
+        self.prompt_dispatches = Counter(
+            "ccc_prompt_dispatches_total", "Finished dispatches per prompt and status.", ["prompt_id", "status"])
+        self.prompt_seconds = Counter(
+            "ccc_prompt_dispatch_seconds_total", "Total dispatch time per prompt.", ["prompt_id"])
+        self.errors = Counter(
+            "ccc_dispatch_errors_total", "Failed dispatches per prompt and reason.", ["prompt_id", "reason"])
+        self.retries = Counter("ccc_dispatch_retries_total", "Retries of failed dispatches per prompt.", ["prompt_id"])
+        self.dead_letters = Counter(
+            "ccc_dead_letters_total", "Prompts that failed after their last attempt.", ["prompt_id"])
+        self.cache_lookups = Counter(
+            "ccc_cache_lookups_total", "Result cache lookups by result (hit or miss).", ["result"])
+        self.missed_fires = Counter(
+            "ccc_missed_fires_total", "Fires missed during downtime by catch-up policy and outcome "
+            "(dispatched or dropped).", ["policy", "outcome"])
+        self.breaker_open = Gauge("ccc_circuit_breaker_open", "1 while the circuit breaker pauses dispatch.")
+        self.queue_depth = Gauge("ccc_dispatch_queue_depth", "Dispatches queued and not started yet.")
+        self.active = Gauge("ccc_dispatch_active", "Dispatches running now.")
+        self.workers = Gauge("ccc_dispatch_workers", "Size of the dispatch pool.")
+        self.metrics = [self.dispatch_seconds, self.schedule_lag, self.queue_wait, self.prompt_dispatches,
+                        self.prompt_seconds, self.errors, self.retries, self.dead_letters, self.cache_lookups,
+                        self.missed_fires, self.breaker_open, self.queue_depth, self.active, self.workers]
+        self.breaker = None
+
+    def track_pool(self, pool):
+        """
+        Reads the queue depth and concurrency gauges from a DispatchPool.
+        """
+        self.queue_depth.callback = pool.backlog
+        self.active.callback = lambda: pool.active
+        self.workers.callback = lambda: pool.max_workers
+
+    def track_breaker(self, breaker):
+        """
+        Reads the circuit breaker gauge from a ccc.retry.CircuitBreaker.
+        """
+        self.breaker = breaker
+        self.breaker_open.callback = lambda: int(breaker.state != "closed")
+
+    def observe_lag(self, seconds):
+        self.schedule_lag.observe(max(seconds, 0))
+
+    def observe_queue_wait(self, seconds):
+        self.queue_wait.observe(max(seconds, 0))
+
+    def observe_run(self, prompt_id, status, seconds, reason=None):
+        """
+        Records a finished run. `reason` names the failure, e.g.
+        "exit_status", "timeout" or "cli_missing".
+        """
+        self.dispatch_seconds.observe(seconds, status)
+        self.prompt_dispatches.inc(prompt_id, status)
+        self.prompt_seconds.inc(prompt_id, amount=seconds)
+        if reason:
+            self.errors.inc(prompt_id, reason)
+
+    def observe_error(self, prompt_id, reason):
+        """
+        Records a dispatch that failed without finishing a run.
+        """
+        self.errors.inc(prompt_id, reason)
+
+    def observe_retry(self, prompt_id):
+        self.retries.inc(prompt_id)
+
+    def observe_dead_letter(self, prompt_id):
+        self.dead_letters.inc(prompt_id)
+
+    def observe_cache(self, result):
+        self.cache_lookups.inc(result)
+
+    def observe_missed(self, policy, dispatched, dropped):
+        """
+        Records the fires a prompt missed during downtime: how many the
+        catch-up dispatches and how many it drops.
+        """
+        if dispatched:
+            self.missed_fires.inc(policy, "dispatched", amount=dispatched)
+        if dropped:
+            self.missed_fires.inc(policy, "dropped", amount=dropped)
+
+    def slowest_prompts(self, limit=10):
+        """
+        Returns (prompt_id, runs, mean seconds) of the prompts with the
+        highest mean dispatch time.
+        """
+        with self.prompt_dispatches.lock:
+            runs = {}
+            for (prompt_id, _), count in self.prompt_dispatches.values.items():
+                runs[prompt_id] = runs.get(prompt_id, 0) + count
+        with self.prompt_seconds.lock:
+            means = [(prompt_id, count, self.prompt_seconds.values.get((prompt_id,), 0) / count)
+                     for prompt_id, count in runs.items()]
+        return sorted(means, key=lambda row: row[2], reverse=True)[:limit]
+
+    def snapshot(self):
+        """
+        Returns a summary of the instruments for display.
+        """
+        statuses = {}
+        for (_, status), count in list(self.prompt_dispatches.values.items()):
+            statuses[status] = statuses.get(status, 0) + count
+        reasons = {}
+        for (_, reason), count in list(self.errors.values.items()):
+            reasons[reason] = reasons.get(reason, 0) + count
+        return {
+            "dispatches": statuses,
+            "errors": reasons,
+            "duration_p50": self.dispatch_seconds.quantile(0.5),
+            "duration_p95": self.dispatch_seconds.quantile(0.95),
+            "lag_p95": self.schedule_lag.quantile(0.95),
+            "queue_wait_p95": self.queue_wait.quantile(0.95),
+            "queue_depth": self.queue_depth.value(),
+            "active": self.active.value(),
+            "workers": self.workers.value(),
+            "retries": sum(list(self.retries.values.values())),
+            "dead_letters": sum(list(self.dead_letters.values.values())),
+            "cache_hits": self.cache_lookups.value("hit"),
+            "cache_misses": self.cache_lookups.value("miss"),
+            "breaker": self.breaker.state if self.breaker is not None else "closed",
+        }
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(metrics, host="127.0.0.1", port=9464):
+    """
+    Starts a minimal HTTP server answering GET /metrics with
+    `metrics.render()`. Returns the asyncio server.
+    """
+
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 10)
+            # Skip the headers; the request has no body we care about.
+            while (await asyncio.wait_for(reader.readline(), 10)) not in (b"\r\n", b"\n", b""):
+                pass
+            method, path, *_ = request.decode("latin-1").split() or ["", ""]
+            if method == "GET" and path.split("?")[0] == "/metrics":
+                status, body = "200 OK", metrics.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,87 @@
+import codecs
+import datetime
+import uuid
+from collections import deque
+from pathlib import Path
+
+# Size of the reads from a dispatch's stdout. Output is written to disk as it
+# arrives, so memory use stays at one chunk regardless of response size.
+CHUNK_SIZE = 64 * 1024
+
+# How much of stderr is kept for the error log.
+STDERR_TAIL_BYTES = 8 * 1024
+
+
+def run_output_path(runs_dir, prompt_id, started=None):
+    """
+    Returns a fresh output file path for one run of a prompt.
+    """
+    started = started or datetime.datetime.now()
+    name = f"{started:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.out"
+    return Path(runs_dir) / str(prompt_id) / name
+
+
+async def stream_output(stream, path, on_text=None, chunk_size=CHUNK_SIZE):
+    """
+    Copies a subprocess stream into `path` chunk by chunk and returns the
+    number of bytes written. Every decoded chunk is also passed to `on_text`,
+    which is how the TUI tails a running dispatch.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    written = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = await stream.read(chunk_size)
+            if not chunk:
+                break
+            f.write(chunk)
+            # Flush so `tail -f` on the file sees output as it arrives.
+            f.flush()
+            written += len(chunk)
+            if on_text:
+                on_text(decoder.decode(chunk))
+    if on_text:
+        on_text(decoder.decode(b"", final=True))
+    return written
+
+
+def copy_output(source, path, on_text=None, chunk_size=CHUNK_SIZE):
+    """
+    Copies a finished run's output file into `path` chunk by chunk, like
+    stream_output, and returns the number of bytes written.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    written = 0
+    with open(source, "rb") as f_in, open(path, "wb") as f_out:
+        while True:
+            chunk = f_in.read(chunk_size)
+            if not chunk:
+                break
+            f_out.write(chunk)
+            written += len(chunk)
+            if on_text:
+                on_text(decoder.decode(chunk))
+    if on_text:
+        on_text(decoder.decode(b"", final=True))
+    return written
+
+
+async def read_tail(stream, limit=STDERR_TAIL_BYTES, chunk_size=CHUNK_SIZE):
+    """
+    Drains a stream and returns only its last `limit` bytes, decoded.
+    """
+    chunks = deque()
+    size = 0
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+        while size - len(chunks[0]) >= limit:
+            size -= len(chunks.popleft())
+    return b"".join(chunks)[-limit:].decode(errors="replace")
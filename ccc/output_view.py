@@ -0,0 +1,62 @@
+from textual.app import ComposeResult
+from textual.widgets import Static, Log
+
+# Lines kept on screen; older output is only in the per-run files.
+MAX_LINES = 1000
+# Output without newlines is shown in lines of this many characters, so a
+# run's unfinished line never grows past it.
+MAX_LINE_LENGTH = 4096
+# How much of a past response show_response reads.
+MAX_RESPONSE_BYTES = 256 * 1024
+
+class OutputView(Static):
+    """A widget that tails the output of running dispatches."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Output path of a running dispatch -> [prompt id, text after its last newline].
+        self.runs = {}
+
+    def compose(self) -> ComposeResult:
+        yield Log(id="output_log", max_lines=MAX_LINES)
+
+    def start_run(self, prompt_id, path):
+        self.runs[str(path)] = [prompt_id, ""]
+        self.query_one(Log).write_line(f"--- {prompt_id} started, writing to {path}")
+
+    def write(self, path, text):
+        """
+        Show complete lines of a run's output, prefixed with its prompt id.
+        Text without a newline is shown in lines of MAX_LINE_LENGTH.
+        """
+        run = self.runs.get(str(path))
+        if run is None:
+            return
+        prompt_id, partial = run
+        lines = (partial + text).split("\n")
+        partial = lines.pop()
+        while len(partial) >= MAX_LINE_LENGTH:
+            lines.append(partial[:MAX_LINE_LENGTH])
+            partial = partial[MAX_LINE_LENGTH:]
+        run[1] = partial
+        if lines:
+            self.query_one(Log).write_lines(f"[{prompt_id[:8]}] {line}" for line in lines)
+
+    def end_run(self, path, status):
+        prompt_id, rest = self.runs.pop(str(path), ["?", ""])
+        if rest:
+            self.query_one(Log).write_line(f"[{prompt_id[:8]}] {rest}")
+        self.query_one(Log).write_line(f"--- {prompt_id} {status}")
+
+    def show_response(self, title, path):
+        """Show the response of a finished run, e.g. a search result."""
+        log = self.query_one(Log)
+        log.write_line(f"--- {title} ({path})")
+        try:
+            with open(path, "rb") as f:
+                text = f.read(MAX_RESPONSE_BYTES).decode(errors="replace")
+        except OSError as e:
+            log.write_line(f"--- could not read the response: {e}")
+            return
+        log.write_lines(text.splitlines())
+        log.write_line("---")
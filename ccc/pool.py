@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import logging
+import time
+
+from ccc.dispatch_queue import FairQueue
+
+logger = logging.getLogger(__name__)
+
+# The pool whose worker is running the current job, if any.
+_current_pool = contextvars.ContextVar("current_pool", default=None)
+
+
+class DispatchPool:
+    """
+    A bounded pool of asyncio workers that runs due prompts in parallel.
+
+    Jobs are queued with `submit` and picked up by at most `max_workers`
+    worker tasks, so one slow Claude invocation no longer holds up every
+    other due prompt. `dispatch` must be a coroutine function.
+
+    Queued jobs start in the order of a ccc.dispatch_queue.FairQueue:
+    `classify(*args)` returns a job's (priority, flow), and `weights` maps
+    flows to their share within a priority. If `rate_limiter` (e.g. a
+    ccc.dispatch_queue.TokenBucket) is given, each job waits for a token
+    before it starts; the job that starts is the first one once the token
+    is granted, so urgent jobs overtake a backlog.
+
+    If `metrics` (a ccc.metrics.DispatchMetrics) is given, the pool reports
+    how long each job waited for a worker and counts dispatches that raised.
+
+    A job that waits for jobs it queued itself does so through `wait`, which
+    lends its worker to the queue meanwhile.
+    """
+
+    def __init__(self, dispatch, max_workers=4, metrics=None, classify=None, weights=None, rate_limiter=None):
+        self.dispatch = dispatch
+        self.metrics = metrics
+        self.classify = classify
+        self.weights = weights or {}
+        self.rate_limiter = rate_limiter
+        self.max_workers = max(1, max_workers)
+        self.active = 0
+        self.queue = None
+        self._loop = None
+        self._workers = []
+        self._idle = set()
+
+    def start(self):
+        """
+        Starts the worker tasks on the running event loop if needed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # The previous loop (if any) is gone, and its workers with it.
+            self._loop = loop
+            self.queue = FairQueue(self.weights)
+            self.active = 0
+            self._idle = set()
+            self._workers = [loop.create_task(self._work()) for _ in range(self.max_workers)]
+
+    def submit(self, *args, **kwargs):
+        """
+        Queues a dispatch and returns the backlog depth after queuing it.
+        Must be called from the event loop thread.
+        """
+        return self.submit_call(self.dispatch, *args, **kwargs)
+
+    def submit_call(self, func, *args, **kwargs):
+        """
+        Like submit, but runs the coroutine function `func` instead of the
+        pool's dispatch function.
+        """
+        self.start()
+        priority, flow = self.classify(*args) if self.classify else (0, None)
+        self.queue.put_nowait((func, args, kwargs, time.monotonic()), priority, flow)
+        depth = self.backlog()
+        logger.info(f"Queued dispatch {args} (backlog: {depth}, running: {self.active})")
+        return depth
+
+    def backlog(self):
+        """
+        Returns the number of queued dispatches that have not started yet.
+        """
+        return self.queue.qsize() if self.queue else 0
+
+    async def join(self):
+        """
+        Waits until every queued dispatch has finished.
+        """
+        if self.queue:
+            await self.queue.join()
+
+    async def wait(self, awaitable):
+        """
+        Awaits `awaitable` from a job without holding the job's worker: a
+        stand-in worker runs queued jobs until it is done, so a job waiting
+        on jobs it queued can't deadlock a full pool. The job resumes once
+        the stand-in finished the job it was running, if any. Outside a job
+        of this pool it simply awaits.
+        """
+        if _current_pool.get() is not self:
+            return await awaitable
+        stop = asyncio.Event()
+        self.active -= 1
+        stand_in = asyncio.get_running_loop().create_task(self._work(stop))
+        try:
+            return await awaitable
+        finally:
+            stop.set()
+            if stand_in in self._idle:
+                stand_in.cancel()
+            await asyncio.wait({stand_in})
+            self.active += 1
+
+    async def _work(self, stop=None):
+        # A stand-in worker (see wait) exits once `stop` is set, before
+        # taking another job.
+        _current_pool.set(self)
+        task = asyncio.current_task()
+        while stop is None or not stop.is_set():
+            self._idle.add(task)
+            try:
+                await self.queue.reserve()
+                try:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire()
+                except asyncio.CancelledError:
+                    self.queue.unreserve()
+                    raise
+            finally:
+                self._idle.discard(task)
+            func, args, kwargs, queued = self.queue.take()
+            self.active += 1
+            if self.metrics is not None:
+                self.metrics.observe_queue_wait(time.monotonic() - queued)
+            try:
+                await func(*args, **kwargs)
+            except Exception:
+                logger.exception(f"Dispatch {args} failed")
+                if self.metrics is not None:
+                    self.metrics.observe_error(args[0] if args and isinstance(args[0], str) else "batch", "exception")
+            finally:
+                self.active -= 1
+                self.queue.task_done()
@@ -0,0 +1,108 @@
+from textual.widgets import DataTable
+
+# Rows fetched from the store at a time, and how close (in rows) to the
+# bottom of the loaded rows the view may scroll before the next page loads.
+PAGE_SIZE = 200
+PREFETCH_ROWS = 50
+
+class PromptsTable(DataTable):
+    """
+    The prompts table, keyed by prompt id.
+
+    Rows are fetched from the store a page at a time as the user scrolls,
+    so opening the TUI doesn't depend on how many prompts there are. Single
+    prompts are added, updated and removed with upsert_prompt and
+    remove_prompt instead of rebuilding the table. The loaded rows are
+    always the first `loaded` prompts of the store, unless a filter shows
+    the results of a search instead (see show_only).
+    """
+
+    def __init__(self, get_store, **kwargs):
+        super().__init__(**kwargs)
+        self.get_store = get_store
+        self.loaded = 0
+        self.exhausted = False
+        self.filtered = False
+        self._loading = False
+
+    def on_mount(self) -> None:
+        self.add_column("Prompt", key="prompt")
+        self.add_column("Schedule", key="schedule")
+        self.add_column("Tags", key="tags")
+        self.add_column("Edit", key="edit")
+        self.add_column("Delete", key="delete")
+        self.reload()
+
+    def reload(self):
+        """Drops every row and loads the first page again."""
+        # Clearing moves the cursor too; don't let it load the old next page.
+        self._loading = True
+        try:
+            self.clear()
+        finally:
+            self._loading = False
+        self.loaded = 0
+        self.exhausted = False
+        self.filtered = False
+        self.load_more()
+
+    def show_only(self, prompts):
+        """Shows just the given prompts, e.g. search results, until reload."""
+        self._loading = True
+        try:
+            self.clear()
+            self.loaded = 0
+            for prompt in prompts:
+                self._add(prompt)
+        finally:
+            self._loading = False
+        self.exhausted = True
+        self.filtered = True
+
+    def load_more(self):
+        """Loads the next page of prompts. Returns the number of new rows."""
+        # Adding rows moves the cursor, which calls back into load_more.
+        if self.exhausted or self._loading:
+            return 0
+        self._loading = True
+        try:
+            page = self.get_store().page(self.loaded, PAGE_SIZE)
+            for prompt in page:
+                self._add(prompt)
+        finally:
+            self._loading = False
+        self.exhausted = len(page) < PAGE_SIZE
+        return len(page)
+
+    def upsert_prompt(self, prompt):
+        """Shows a new or changed prompt."""
+        if prompt["id"] in self.rows:
+            for column, value in zip(("prompt", "schedule", "tags"), self._cells(prompt)):
+                self.update_cell(prompt["id"], column, value)
+        elif self.exhausted and not self.filtered:
+            # New prompts are appended to the store, so they only belong in
+            # the table once every earlier prompt has been loaded.
+            self._add(prompt)
+
+    def remove_prompt(self, prompt_id):
+        """Drops the row of a deleted prompt, if it was loaded."""
+        if prompt_id in self.rows:
+            self.loaded -= 1
+            self.remove_row(prompt_id)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        if not self.exhausted and new_value >= self.max_scroll_y - PREFETCH_ROWS:
+            self.load_more()
+
+    def watch_cursor_coordinate(self, old_coordinate, new_coordinate) -> None:
+        super().watch_cursor_coordinate(old_coordinate, new_coordinate)
+        if not self.exhausted and new_coordinate.row >= self.loaded - PREFETCH_ROWS:
+            self.load_more()
+
+    def _add(self, prompt):
+        self.add_row(*self._cells(prompt), "Edit", "Delete", key=prompt.get("id"))
+        self.loaded += 1
+
+    def _cells(self, prompt):
+        return prompt.get("prompt", ""), prompt.get("schedule", ""), " ".join(prompt.get("tags") or [])
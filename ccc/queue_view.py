@@ -1,18 +1,139 @@
+import datetime
+import time
+
 from textual.app import ComposeResult
-from textual.widgets import Static, DataTable
+from textual.message import Message
+from textual.widgets import Static, DataTable, Label
+
+from ccc.events import ACTIVE_STATES, JobEvent
+
+# Pending events are applied at most this often (seconds), so a burst of
+# events turns into one table update.
+FLUSH_INTERVAL = 0.2
 
 class QueueView(Static):
-    """A widget to display the prompt queue."""
+    """
+    A live view of scheduled, queued and running prompts.
+
+    Rows are keyed by prompt id and patched from job events (see
+    ccc.events.EventChannel) rather than rebuilt. Scheduled prompts are only
+    listed when their next run is within `horizon` seconds. `describe` maps
+    a prompt id to the text shown for it and `backlog` returns the number
+    of (queued, running) dispatches.
+    """
+
+    def __init__(self, events=None, describe=None, backlog=None, horizon=24 * 60 * 60, **kwargs):
+        super().__init__(**kwargs)
+        self.events = events
+        self.describe = describe or (lambda prompt_id: prompt_id)
+        self.backlog = backlog
+        self.horizon = horizon
+        # prompt id -> the last JobEvent applied to its row.
+        self.states = {}
+        self._flush_pending = False
 
     def compose(self) -> ComposeResult:
+        yield Label(id="queue_backlog")
         yield DataTable(id="queue_table")
 
     def on_mount(self) -> None:
         table = self.query_one(DataTable)
-        table.add_columns("Next Run", "Prompt")
+        table.add_column("Prompt", key="prompt")
+        table.add_column("State", key="state")
+        table.add_column("Duration", key="duration")
+        table.add_column("Next Run", key="next_run")
+        self.set_interval(1, self.tick)
+        if self.events is not None:
+            self.events.subscribe(self._wake)
+
+    def on_unmount(self) -> None:
+        if self.events is not None:
+            self.events.subscribe(None)
+
+    def update_queue(self, upcoming):
+        """Adds rows for (next_run, prompt_id) pairs, e.g. from AsyncScheduler.peek."""
+        events = {}
+        for next_run, prompt_id in upcoming:
+            if prompt_id not in self.states and prompt_id not in events:
+                events[prompt_id] = ("scheduled", next_run.timestamp())
+        self.apply(JobEvent(prompt_id, state, time.time(), next_run)
+                   for prompt_id, (state, next_run) in events.items())
+
+    def apply(self, events):
+        """Patches the rows of the prompts the events are about."""
+        table = self.query_one(DataTable)
+        now = time.time()
+        for event in events:
+            current = self.states.get(event.prompt_id)
+            active = current is not None and current.state in ACTIVE_STATES
+            if event.state in ("scheduled", "removed") and active:
+                # A queued or running prompt keeps its row however far away
+                # its next run is; only that next run changed.
+                event = current._replace(next_run=event.next_run)
+            elif event.state == "removed" or (
+                    event.state == "scheduled" and not self._within_horizon(event.next_run, now)):
+                self.states.pop(event.prompt_id, None)
+                if event.prompt_id in table.rows:
+                    table.remove_row(event.prompt_id)
+                continue
+            elif current is not None:
+                event = event._replace(next_run=event.next_run or current.next_run,
+                                       started=event.started or current.started)
+            self.states[event.prompt_id] = event
+            cells = (self._describe(event.prompt_id), event.state,
+                     self._duration(event, now), self._next_run(event))
+            if event.prompt_id in table.rows:
+                for column, value in zip(("prompt", "state", "duration", "next_run"), cells):
+                    table.update_cell(event.prompt_id, column, value)
+            else:
+                table.add_row(*cells, key=event.prompt_id)
+        self._update_backlog()
 
-    def update_queue(self, jobs):
+    def flush(self):
+        """Applies every pending event."""
+        self._flush_pending = False
+        self.apply(self.events.drain())
+
+    def tick(self):
+        """Advances the duration of running prompts."""
         table = self.query_one(DataTable)
-        table.clear()
-        for job in jobs:
-            table.add_row(str(job.next_run), str(job.job_func))
+        now = time.time()
+        for prompt_id, event in self.states.items():
+            if event.state == "running":
+                table.update_cell(prompt_id, "duration", self._duration(event, now))
+        self._update_backlog()
+
+    class EventsPending(Message):
+        """Posted when the event channel has events to drain."""
+
+    def _wake(self):
+        # Called from the publishing thread; post_message is thread-safe.
+        self.post_message(self.EventsPending())
+
+    def on_queue_view_events_pending(self, message: EventsPending) -> None:
+        if not self._flush_pending:
+            self._flush_pending = True
+            self.set_timer(FLUSH_INTERVAL, self.flush)
+
+    def _update_backlog(self):
+        if self.backlog is not None:
+            queued, running = self.backlog()
+            self.query_one("#queue_backlog", Label).update(f"Backlog: {queued} queued, {running} running")
+
+    def _within_horizon(self, next_run, now):
+        return next_run is not None and next_run <= now + self.horizon
+
+    def _describe(self, prompt_id):
+        text = self.describe(prompt_id) or prompt_id
+        return text if len(text) <= 60 else text[:59] + "…"
+
+    def _duration(self, event, now):
+        if event.started is None or event.state in ("scheduled", "queued"):
+            return ""
+        end = now if event.state == "running" else event.at
+        return str(datetime.timedelta(seconds=int(end - event.started)))
+
+    def _next_run(self, event):
+        if event.next_run is None:
+            return ""
+        return datetime.datetime.fromtimestamp(event.next_run).strftime("%Y-%m-%d %H:%M")
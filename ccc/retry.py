@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """
+    How often a failed dispatch is attempted and how long to wait in between.
+
+    Delays grow exponentially from `base_delay` up to `max_delay` and use
+    "full jitter" (a uniform draw between zero and the exponential delay) so
+    prompts that failed together don't retry in lockstep.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=5, max_delay=300, rng=None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def attempts(self, prompt):
+        """
+        Returns the number of attempts for a prompt; its own max_attempts
+        field overrides the policy's.
+        """
+        try:
+            return max(1, int(prompt.get("max_attempts") or self.max_attempts))
+        except (TypeError, ValueError):
+            return self.max_attempts
+
+    def delay(self, attempt):
+        """
+        Returns the seconds to wait after failed attempt number `attempt`
+        (counting from 1).
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return self.rng.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Pauses every dispatch while the upstream keeps failing.
+
+    The breaker tracks the outcome of the last `window` attempts. Once at
+    least `min_calls` of them are known and `failure_rate` of them failed,
+    it opens: `acquire` waits for `cooldown` seconds, after which a single
+    probe attempt is let through (half-open). A successful probe closes
+    the breaker, a failed one opens it for another cooldown. A probe that
+    never reports back is replaced after a cooldown.
+    """
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=5, cooldown=60, clock=time.monotonic):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.clock = clock
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self._probe_started = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self):
+        """
+        Returns True if an attempt may start now. In the half-open state
+        this starts the probe.
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = self.clock()
+        if self._probe_started is None or now - self._probe_started >= self.cooldown:
+            self._probe_started = now
+            return True
+        return False
+
+    def retry_after(self):
+        """
+        Returns how long to wait before asking `allow` again.
+        """
+        if self.state == "open":
+            return max(self.cooldown - (self.clock() - self.opened_at), 0)
+        return min(1, self.cooldown)
+
+    async def acquire(self):
+        """
+        Waits until an attempt may start.
+        """
+        while not self.allow():
+            await asyncio.sleep(self.retry_after())
+
+    def record(self, succeeded):
+        """
+        Records the outcome of an attempt.
+        """
+        if self.opened_at is not None:
+            # Only the probe's outcome counts while the breaker isn't closed.
+            if self.state != "half-open" or self._probe_started is None:
+                return
+            self._probe_started = None
+            if succeeded:
+                logger.info("Circuit breaker closed, resuming dispatch")
+                self.opened_at = None
+                self.outcomes.clear()
+            else:
+                self.opened_at = self.clock()
+            return
+        self.outcomes.append(succeeded)
+        failures = self.outcomes.count(False)
+        if len(self.outcomes) >= self.min_calls and failures >= self.failure_rate * len(self.outcomes):
+            logger.warning(f"Circuit breaker opened after {failures} failures in {len(self.outcomes)} "
+                           f"dispatches; pausing dispatch for {self.cooldown} seconds")
+            self.opened_at = self.clock()
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from collections import namedtuple
+
+from croniter import croniter
+
+from ccc.timeline import LOOKAHEAD, CronTimeline
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on a single sleep. asyncio timers run on the monotonic clock
+# while cron deadlines are wall-clock times, so we re-check every few minutes
+# in case the machine was suspended or the clock was adjusted.
+MAX_SLEEP = 300
+
+Job = namedtuple("Job", ["next_run", "prompt_id", "expression"])
+
+
+def cron_expression(schedule_text):
+    """
+    Returns the cron expression for a schedule, or None if it can't be parsed.
+
+    Besides plain cron expressions, the legacy "every minute" style schedules
+    are accepted and mapped to their cron equivalent.
+    """
+    if not schedule_text:
+        return None
+    if croniter.is_valid(schedule_text):
+        return schedule_text
+    if "every" in schedule_text and "minute" in schedule_text:
+        return "* * * * *"
+    return None
+
+
+class AsyncScheduler:
+    """
+    An asyncio scheduler driven by a CronTimeline.
+
+    `run` sleeps until the earliest deadline instead of polling and hands
+    every due prompt to `submit`. It is meant to run on the same event loop
+    as the TUI. Jobs are keyed by prompt id so a single prompt can be
+    rescheduled or removed without touching the others.
+
+    If `submit_batch` is given, prompts that share a fire time are handed
+    to it together as a list of ids instead of one by one. If `events` (an
+    EventChannel) is given, the scheduler publishes "scheduled", "queued"
+    and "removed" events with each prompt's next fire time.
+
+    If `claim` is given, a due prompt is only submitted when
+    `claim(prompt_id, fire_time)` returns True, which lets several scheduler
+    processes share one schedule (see ccc.shard.ShardCoordinator).
+
+    If `metrics` (a ccc.metrics.DispatchMetrics) is given, the scheduler
+    reports how long after its fire time each prompt was queued.
+
+    If `fired` is given, it is called with the (prompt_id, fire time) pairs
+    submitted by each run_pending, e.g. to persist them for catching up
+    after downtime (see ccc.catchup).
+    """
+
+    def __init__(self, submit, lookahead=LOOKAHEAD, submit_batch=None, events=None, claim=None,
+                 metrics=None, fired=None):
+        self.submit = submit
+        self.submit_batch = submit_batch
+        self.events = events
+        self.claim = claim
+        self.metrics = metrics
+        self.fired = fired
+        self.timeline = CronTimeline(lookahead)
+        self._wakeup = None
+
+    def __contains__(self, prompt_id):
+        return prompt_id in self.timeline
+
+    def __len__(self):
+        return len(self.timeline)
+
+    def __iter__(self):
+        return iter(list(self.timeline))
+
+    @property
+    def jobs(self):
+        """
+        Returns the scheduled jobs ordered by their next run.
+        """
+        return [Job(*head) for head in self.timeline.heads()]
+
+    def peek(self, horizon, now=None):
+        """
+        Returns (datetime, prompt_id) for the fire times within `horizon`.
+        """
+        return self.timeline.peek(horizon, now)
+
+    def add(self, prompt_id, expression, base=None):
+        """
+        Schedules a prompt by cron expression, replacing any job the prompt
+        already had.
+        """
+        self.timeline.add(prompt_id, expression, base)
+        self._publish(prompt_id, "scheduled")
+        self._wake()
+
+    def expression(self, prompt_id):
+        """
+        Returns the cron expression a prompt is scheduled by, or None.
+        """
+        return self.timeline.expression(prompt_id)
+
+    def remove(self, prompt_id):
+        """
+        Unschedules a prompt. Returns False if it wasn't scheduled.
+        """
+        removed = self.timeline.remove(prompt_id)
+        if removed:
+            self._publish(prompt_id, "removed")
+        self._wake()
+        return removed
+
+    def clear(self):
+        """
+        Removes every scheduled job.
+        """
+        if self.events is not None:
+            for prompt_id in list(self.timeline):
+                self.events.publish(prompt_id, "removed")
+        self.timeline.clear()
+        self._wake()
+
+    def run_pending(self, now=None):
+        """
+        Submits every job that is due. Returns the number of jobs that were
+        submitted.
+        """
+        now = now or time.time()
+        due = self.timeline.pop_due(now)
+        if self.claim is not None:
+            due = [(when, prompt_id) for when, prompt_id in due if self.claim(prompt_id, when)]
+        groups = {}
+        for when, prompt_id in due:
+            groups.setdefault(when, []).append(prompt_id)
+            self._publish(prompt_id, "queued")
+            if self.metrics is not None:
+                self.metrics.observe_lag(now - when)
+        for prompt_ids in groups.values():
+            if self.submit_batch and len(prompt_ids) > 1:
+                self.submit_batch(prompt_ids)
+            else:
+                for prompt_id in prompt_ids:
+                    self.submit(prompt_id)
+        if self.fired is not None and due:
+            self.fired([(prompt_id, when) for when, prompt_id in due])
+        return len(due)
+
+    def idle_seconds(self, now=None):
+        """
+        Returns how long the scheduler may sleep before the next deadline.
+        """
+        deadline = self.timeline.next_deadline()
+        if deadline is None:
+            return MAX_SLEEP
+        now = now or time.time()
+        return min(max(deadline - now, 0), MAX_SLEEP)
+
+    async def run(self):
+        """
+        Fires due jobs forever, sleeping until the next deadline in between.
+        """
+        self._wakeup = asyncio.Event()
+        while True:
+            self.run_pending()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.idle_seconds())
+            except asyncio.TimeoutError:
+                pass
+
+    def _publish(self, prompt_id, state):
+        if self.events is not None:
+            self.events.publish(prompt_id, state, self.timeline.next_fire(prompt_id))
+
+    def _wake(self):
+        # Re-evaluate the sleep deadline after the timeline changed.
+        if self._wakeup is not None:
+            self._wakeup.set()
@@ -0,0 +1,244 @@
+import re
+import sqlite3
+from pathlib import Path
+
+# How much of a response is indexed. Answers are rarely longer, and the
+# index stays a fraction of the size of the run outputs.
+MAX_RESPONSE_BYTES = 64 * 1024
+
+# A query term: tag:name, a "quoted phrase" or a bare word.
+_TERM = re.compile(r'(tag:)?(?:"([^"]*)"|(\S+))')
+
+
+def parse_tags(text):
+    """
+    Returns the tags in a comma or space separated string, lower-cased and
+    without duplicates.
+    """
+    tags = []
+    for tag in re.split(r"[,\s]+", text or ""):
+        tag = tag.strip().lstrip("#").lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def _phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def fts_query(query, tags_column=None):
+    """
+    Turns what a user typed into an FTS5 query that matches every term.
+
+    Bare words match as prefixes, so results show up while typing, and
+    "quoted phrases" match as phrases. `tag:name` terms only match the
+    `tags_column`; without one (the responses have no tags) they are
+    dropped. Returns None if nothing is left to search for.
+    """
+    terms = []
+    for tag, phrase, word in _TERM.findall(query or ""):
+        text = phrase if phrase else word
+        if not text.strip('"'):
+            continue
+        if tag:
+            if tags_column:
+                terms.append(f"{tags_column} : {_phrase(text.lower())}")
+        elif phrase:
+            terms.append(_phrase(text))
+        else:
+            terms.append(_phrase(text) + "*")
+    return " AND ".join(terms) or None
+
+
+class SearchIndex:
+    """
+    A full-text index over prompts (text and tags) and dispatch responses.
+
+    Prompts live in an SQLite table with an FTS5 index kept current by
+    triggers, so `index_prompt` and `remove_prompt` are single-row
+    updates. Results are not ranked, which lets a query stop at its limit
+    instead of scoring every match. Responses are indexed once per run in
+    a contentless FTS5 table (the run's output file holds the text) next
+    to a table of run metadata; at most `max_response_bytes` of each
+    response are indexed.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS prompts (
+            prompt_id TEXT PRIMARY KEY,
+            prompt TEXT NOT NULL,
+            tags TEXT NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts USING fts5(
+            prompt, tags, content='prompts', prefix='2 3');
+        CREATE TRIGGER IF NOT EXISTS prompts_insert AFTER INSERT ON prompts BEGIN
+            INSERT INTO prompts_fts (rowid, prompt, tags) VALUES (new.rowid, new.prompt, new.tags);
+        END;
+        CREATE TRIGGER IF NOT EXISTS prompts_delete AFTER DELETE ON prompts BEGIN
+            INSERT INTO prompts_fts (prompts_fts, rowid, prompt, tags)
+                VALUES ('delete', old.rowid, old.prompt, old.tags);
+        END;
+        CREATE TRIGGER IF NOT EXISTS prompts_update AFTER UPDATE ON prompts BEGIN
+            INSERT INTO prompts_fts (prompts_fts, rowid, prompt, tags)
+                VALUES ('delete', old.rowid, old.prompt, old.tags);
+            INSERT INTO prompts_fts (rowid, prompt, tags) VALUES (new.rowid, new.prompt, new.tags);
+        END;
+        CREATE TABLE IF NOT EXISTS responses (
+            id INTEGER PRIMARY KEY,
+            run_id TEXT UNIQUE NOT NULL,
+            prompt_id TEXT NOT NULL,
+            started REAL NOT NULL,
+            output TEXT NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS responses_fts USING fts5(
+            response, content='', prefix='2 3');
+    """
+
+    UPSERT = ("INSERT INTO prompts (prompt_id, prompt, tags) VALUES (?, ?, ?) "
+              "ON CONFLICT (prompt_id) DO UPDATE SET prompt = excluded.prompt, tags = excluded.tags")
+
+    def __init__(self, path, max_response_bytes=MAX_RESPONSE_BYTES, timeout=30):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_response_bytes = max_response_bytes
+        # The TUI searches while the daemon indexes its responses.
+        self.connection = sqlite3.connect(self.path, timeout=timeout)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def index_prompt(self, prompt):
+        """
+        Adds or updates a prompt.
+        """
+        with self.connection:
+            self._upsert(prompt)
+
+    def remove_prompt(self, prompt_id):
+        """
+        Drops a deleted prompt.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM prompts WHERE prompt_id = ?", (prompt_id,))
+
+    def sync_prompts(self, prompts):
+        """
+        Brings the prompts in line with `prompts` (the whole store), only
+        touching those that changed. Returns the number of changed rows.
+        """
+        indexed = {prompt_id: (text, tags) for prompt_id, text, tags
+                   in self.connection.execute("SELECT prompt_id, prompt, tags FROM prompts")}
+        changed = []
+        for prompt in prompts:
+            if prompt.get("id"):
+                row = self._row(prompt)
+                if indexed.pop(row[0], None) != row[1:]:
+                    changed.append(row)
+        with self.connection:
+            self.connection.executemany(self.UPSERT, changed)
+            self.connection.executemany("DELETE FROM prompts WHERE prompt_id = ?", [(key,) for key in indexed])
+        return len(changed) + len(indexed)
+
+    def index_response(self, run_id, prompt_id, started, output):
+        """
+        Indexes the response a run wrote to the file `output`. Returns False
+        if it was indexed before or the file is gone.
+        """
+        try:
+            with open(output, "rb") as f:
+                text = f.read(self.max_response_bytes).decode(errors="replace")
+        except OSError:
+            return False
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO responses (run_id, prompt_id, started, output) VALUES (?, ?, ?, ?)",
+                (run_id, prompt_id, started, str(output)))
+            if not cursor.rowcount:
+                return False
+            self.connection.execute(
+                "INSERT INTO responses_fts (rowid, response) VALUES (?, ?)", (cursor.lastrowid, text))
+        return True
+
+    def remove_responses(self, run_ids):
+        """
+        Drops the responses of runs, e.g. when the history expires them.
+        Must be called while their output files still exist: a contentless
+        index needs the indexed text to delete it.
+        """
+        with self.connection:
+            for run_id in run_ids:
+                row = self.connection.execute(
+                    "SELECT id, output FROM responses WHERE run_id = ?", (run_id,)).fetchone()
+                if row is None:
+                    continue
+                try:
+                    with open(row[1], "rb") as f:
+                        text = f.read(self.max_response_bytes).decode(errors="replace")
+                    self.connection.execute(
+                        "INSERT INTO responses_fts (responses_fts, rowid, response) VALUES ('delete', ?, ?)",
+                        (row[0], text))
+                except OSError:
+                    # Its terms stay in the index but no longer match a run.
+                    pass
+                self.connection.execute("DELETE FROM responses WHERE id = ?", (row[0],))
+
+    def clear_responses(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.execute("INSERT INTO responses_fts (responses_fts) VALUES ('delete-all')")
+
+    def search_prompts(self, query, limit=100):
+        """
+        Returns the ids of the first `limit` prompts matching `query` (see
+        fts_query), in the order they were indexed.
+        """
+        match = fts_query(query, "tags")
+        if match is None:
+            return []
+        return [prompt_id for prompt_id, in self.connection.execute(
+            "SELECT prompts.prompt_id FROM prompts_fts JOIN prompts ON prompts.rowid = prompts_fts.rowid "
+            "WHERE prompts_fts MATCH ? ORDER BY prompts_fts.rowid LIMIT ?", (match, limit))]
+
+    def search_responses(self, query, limit=20):
+        """
+        Returns the newest `limit` runs whose response matches `query`, as
+        dicts with run_id, prompt_id, started and output.
+        """
+        match = fts_query(query)
+        if match is None:
+            return []
+        cursor = self.connection.execute(
+            "SELECT responses.run_id, responses.prompt_id, responses.started, responses.output "
+            "FROM responses_fts JOIN responses ON responses.id = responses_fts.rowid "
+            "WHERE responses_fts MATCH ? ORDER BY responses_fts.rowid DESC LIMIT ?", (match, limit))
+        return [dict(zip(("run_id", "prompt_id", "started", "output"), row)) for row in cursor]
+
+    def _row(self, prompt):
+        return prompt["id"], prompt.get("prompt") or "", " ".join(prompt.get("tags") or [])
+
+    def _upsert(self, prompt):
+        self.connection.execute(self.UPSERT, self._row(prompt))
+
+
+def snippet(path, query, width=80):
+    """
+    Returns the line of a response file around the first term of `query`,
+    shortened to about `width` characters, or its first line.
+    """
+    try:
+        with open(path, "rb") as f:
+            text = f.read(MAX_RESPONSE_BYTES).decode(errors="replace")
+    except OSError:
+        return ""
+    words = [phrase or word for tag, phrase, word in _TERM.findall(query or "") if not tag]
+    position = -1
+    for word in words:
+        position = text.lower().find(word.lower())
+        if position >= 0:
+            break
+    start = max(position - width // 3, 0) if position >= 0 else 0
+    line = " ".join(text[start:start + width * 2].split())
+    return ("…" if start else "") + line[:width]
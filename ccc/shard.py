@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseStore:
+    """
+    Worker heartbeats and per-fire leases in an SQLite database shared by
+    every scheduler process (on one host, or on several hosts through a
+    shared filesystem).
+
+    A lease is keyed by prompt id and fire time, so every process that
+    evaluates the same cron slot competes for the same row. Leases expire
+    after their ttl and are only handed to another owner once expired.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS workers (
+            worker_id TEXT PRIMARY KEY,
+            expires REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS leases (
+            prompt_id TEXT NOT NULL,
+            fire_time REAL NOT NULL,
+            owner TEXT NOT NULL,
+            expires REAL NOT NULL,
+            PRIMARY KEY (prompt_id, fire_time)
+        );
+        CREATE INDEX IF NOT EXISTS leases_expires ON leases (expires);
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=timeout)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def heartbeat(self, worker_id, ttl, now=None):
+        """
+        Marks a worker as alive for `ttl` seconds.
+        """
+        now = now or time.time()
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO workers (worker_id, expires) VALUES (?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE SET expires = excluded.expires",
+                (worker_id, now + ttl))
+
+    def leave(self, worker_id):
+        """
+        Removes a worker, e.g. on shutdown, so the others take over at once.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def live_workers(self, now=None):
+        """
+        Returns the ids of the workers whose heartbeat hasn't expired.
+        """
+        rows = self.connection.execute(
+            "SELECT worker_id FROM workers WHERE expires > ? ORDER BY worker_id", (now or time.time(),))
+        return [worker_id for worker_id, in rows]
+
+    def acquire(self, prompt_id, fire_time, owner, ttl, now=None):
+        """
+        Takes the lease of one fire unless another owner holds an unexpired
+        one. Returns True if `owner` holds the lease afterwards.
+        """
+        now = now or time.time()
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO leases (prompt_id, fire_time, owner, expires) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (prompt_id, fire_time) DO UPDATE "
+                "SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE leases.expires <= ? OR leases.owner = excluded.owner",
+                (prompt_id, fire_time, owner, now + ttl, now))
+        return cursor.rowcount == 1
+
+    def holder(self, prompt_id, fire_time, now=None):
+        """
+        Returns the owner of an unexpired lease, or None.
+        """
+        row = self.connection.execute(
+            "SELECT owner FROM leases WHERE prompt_id = ? AND fire_time = ? AND expires > ?",
+            (prompt_id, fire_time, now or time.time())).fetchone()
+        return row[0] if row else None
+
+    def prune(self, before):
+        """
+        Deletes leases and worker records that expired before `before`.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM leases WHERE expires < ?", (before,))
+            self.connection.execute("DELETE FROM workers WHERE expires < ?", (before,))
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def owner_of(prompt_id, workers):
+    """
+    Returns the worker that owns a prompt, by rendezvous hashing of the
+    prompt id: when a worker joins or leaves, only the prompts it gains or
+    loses change hands.
+    """
+    if not workers:
+        return None
+    return max(workers, key=lambda worker_id: zlib.crc32(f"{worker_id}/{prompt_id}".encode()))
+
+
+class ShardCoordinator:
+    """
+    Splits the fires of a shared schedule between scheduler processes.
+
+    Every process schedules every prompt, but only dispatches the prompts
+    it owns (see owner_of) among the workers with a live heartbeat, and
+    only after taking the lease of that fire. The lease makes sure exactly
+    one process dispatches a fire even while processes disagree about who
+    is alive. If a fire's lease is still free `takeover_delay` seconds
+    after it was due, e.g. because its owner just died, the first other
+    process to notice takes it over.
+
+    `claim` is meant to be passed to AsyncScheduler; `submit` queues a prompt
+    that was taken over.
+    """
+
+    def __init__(self, leases, submit, worker_id=None, lease_ttl=300, heartbeat_interval=10,
+                 takeover_delay=30):
+        self.leases = leases
+        self.submit = submit
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.takeover_delay = takeover_delay
+        self.workers = []
+
+    def heartbeat(self):
+        """
+        Renews this worker's heartbeat and refreshes the list of live workers.
+        """
+        # Missing two beats in a row takes a worker out of the rotation.
+        self.leases.heartbeat(self.worker_id, self.heartbeat_interval * 2.5)
+        workers = self.leases.live_workers()
+        if workers != self.workers:
+            logger.info(f"Worker {self.worker_id}: live workers {workers}")
+        self.workers = workers
+
+    def claim(self, prompt_id, fire_time):
+        """
+        Returns True if this worker should dispatch a fire now. Fires owned
+        by other workers are checked again after takeover_delay.
+        """
+        if owner_of(prompt_id, self.workers or [self.worker_id]) == self.worker_id:
+            return self.leases.acquire(prompt_id, fire_time, self.worker_id, self.lease_ttl)
+        asyncio.get_running_loop().call_later(self.takeover_delay, self._take_over, prompt_id, fire_time)
+        return False
+
+    def _take_over(self, prompt_id, fire_time):
+        if self.leases.holder(prompt_id, fire_time) is not None:
+            return
+        if self.leases.acquire(prompt_id, fire_time, self.worker_id, self.lease_ttl):
+            logger.warning(f"Worker {self.worker_id} took over prompt {prompt_id} due at {fire_time}")
+            self.submit(prompt_id)
+
+    async def run(self):
+        """
+        Heartbeats forever and prunes expired leases. Leaves the worker
+        table when cancelled.
+        """
+        try:
+            while True:
+                self.heartbeat()
+                self.leases.prune(time.time() - self.lease_ttl)
+                await asyncio.sleep(self.heartbeat_interval)
+        finally:
+            self.leases.leave(self.worker_id)
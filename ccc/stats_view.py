@@ -0,0 +1,62 @@
+from textual.app import ComposeResult
+from textual.widgets import Static, DataTable, Label
+
+# How often the panel re-reads the metrics, in seconds.
+REFRESH_INTERVAL = 2
+# Rows in the slowest prompts table.
+SLOWEST_PROMPTS = 10
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    return f"{seconds:.1f}s"
+
+class StatsView(Static):
+    """
+    Dispatch statistics from a ccc.metrics.DispatchMetrics: counts by
+    status and error reason, latency and lag percentiles, pool usage and
+    the prompts with the highest mean dispatch time. `describe` maps a
+    prompt id to the text shown for it.
+    """
+
+    def __init__(self, metrics, describe=None, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+        self.describe = describe or (lambda prompt_id: prompt_id)
+
+    def compose(self) -> ComposeResult:
+        yield Label(id="stats_summary")
+        yield DataTable(id="stats_slowest")
+
+    def on_mount(self) -> None:
+        table = self.query_one(DataTable)
+        table.add_column("Slowest prompts", key="prompt")
+        table.add_column("Runs", key="runs")
+        table.add_column("Mean", key="mean")
+        self.refresh_stats()
+        self.set_interval(REFRESH_INTERVAL, self.refresh_stats)
+
+    def refresh_stats(self):
+        """Re-reads the metrics."""
+        stats = self.metrics.snapshot()
+        dispatches = ", ".join(f"{status} {count}" for status, count in sorted(stats["dispatches"].items()))
+        errors = ", ".join(f"{reason} {count}" for reason, count in sorted(stats["errors"].items()))
+        self.query_one("#stats_summary", Label).update(
+            f"Dispatches: {dispatches or 'none'}\n"
+            f"Errors: {errors or 'none'}; {stats['retries']} retries, {stats['dead_letters']} dead letters; "
+            f"circuit breaker {stats['breaker']}\n"
+            f"Duration p50 {format_seconds(stats['duration_p50'])}, p95 {format_seconds(stats['duration_p95'])}\n"
+            f"Schedule lag p95 {format_seconds(stats['lag_p95'])}, "
+            f"queue wait p95 {format_seconds(stats['queue_wait_p95'])}\n"
+            f"Workers: {stats['active']} of {stats['workers']} busy, {stats['queue_depth']} queued\n"
+            f"Result cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses")
+
+        table = self.query_one(DataTable)
+        rows = {prompt_id: (runs, mean) for prompt_id, runs, mean in self.metrics.slowest_prompts(SLOWEST_PROMPTS)}
+        # The ranking changes as runs finish, so the rows are rebuilt; there
+        # are only a handful of them.
+        table.clear()
+        for prompt_id, (runs, mean) in rows.items():
+            table.add_row(self.describe(prompt_id) or prompt_id, str(runs), format_seconds(mean), key=prompt_id)
@@ -0,0 +1,784 @@
+import bisect
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from array import array
+from pathlib import Path
+
+from ccc.mapped import MappedJsonl, id_hash
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows; threads of one process still exclude
+    # each other.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# JSONL snapshots larger than this are parsed on access rather than up front,
+# keeping at most LAZY_CACHE_SIZE parsed records.
+LAZY_BYTES = 64 * 1024 * 1024
+LAZY_CACHE_SIZE = 4096
+
+
+class JsonlPromptStore:
+    """
+    Stores prompts as one JSON object per line in a text file.
+
+    The file is a snapshot; mutations are appended to a write-ahead journal
+    next to it (`<file>.journal`) as add/update/delete records, so each one
+    is a single short write however many prompts there are. Once the
+    journal holds `compact_ops` records, the current prompts are written to
+    a new snapshot that atomically replaces the old one, together with a
+    fresh journal. A crash can lose at most a torn last record, never the
+    snapshot.
+
+    Journal writes are fsynced at most every `fsync_interval` seconds: a
+    write is synced right away unless one was synced less than that ago,
+    in which case a timer syncs it once the interval is up (or the next
+    write, `sync` or `close` does, if earlier). 0 syncs every write.
+
+    Writers in any thread or process take an exclusive lock on
+    `<file>.lock` first. The journal starts with the signature of the
+    snapshot it applies to, so a journal left behind by a compaction that
+    crashed halfway, or by a snapshot replaced by hand, is ignored.
+
+    The snapshot is read through a ccc.mapped.MappedJsonl, which keeps every
+    parsed record while it is at most `lazy_bytes` long. Larger snapshots
+    are parsed on access with an index saved to `<file>.idx`, and only
+    `LAZY_CACHE_SIZE` parsed records are kept. The journal's changes are
+    kept in memory on top of the snapshot; there are at most
+    `compact_ops` of them.
+
+    The snapshot is only reopened when its inode, size or mtime changes.
+    Records appended to the journal by other processes are applied
+    incrementally, and our own mutations update the cache in place.
+    Returned prompts are shared with the cache and must not be modified by
+    callers.
+    """
+
+    def __init__(self, path, fsync_interval=0, compact_ops=1000, lazy_bytes=LAZY_BYTES):
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.fsync_interval = fsync_interval
+        self.compact_ops = compact_ops
+        self.lazy_bytes = lazy_bytes
+        self._reset(MappedJsonl(None))
+        self._signature = None
+        self._journal_signature = None
+        # Bytes of the journal applied to the cache, and the records among them.
+        self._journal_offset = 0
+        self._journal_ops = 0
+        # Whether the journal on disk starts with our snapshot's signature.
+        self._journal_ready = False
+        self._synced = float("-inf")
+        self._unsynced = False
+        # Timer that syncs a batched write once fsync_interval is up.
+        self._sync_timer = None
+        self._thread_lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+
+    def close(self):
+        """
+        Syncs the journal and releases the snapshot and the lock file. The
+        store can still be used afterwards.
+        """
+        with self._thread_lock:
+            self.sync()
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._lock_file is not None and not self._lock_depth:
+                self._lock_file.close()
+                self._lock_file = None
+            self._snapshot.close()
+            self._signature = None
+
+    def sync(self):
+        """
+        Fsyncs journal writes that were batched.
+        """
+        with self._thread_lock:
+            if not self._unsynced:
+                return
+            try:
+                with open(self.journal_path, "rb") as f:
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                pass
+            self._synced = time.monotonic()
+            self._unsynced = False
+
+    def all(self):
+        """
+        Returns every prompt in file order.
+        """
+        self._refresh()
+        return self._slice(0, cache=False)
+
+    def count(self):
+        """
+        Returns the number of stored prompts.
+        """
+        self._refresh()
+        return len(self._snapshot) - len(self._deleted) + len(self._added)
+
+    def page(self, offset, limit):
+        """
+        Returns up to `limit` prompts starting at position `offset`.
+        """
+        self._refresh()
+        return self._slice(offset, limit)
+
+    def get(self, prompt_id):
+        """
+        Returns the prompt with the given id, or None.
+        """
+        self._refresh()
+        slot = self._find(prompt_id)
+        return self._prompt(slot) if slot else None
+
+    def by_conversation(self, conversation_id):
+        """
+        Returns the prompts of a conversation in file order.
+        """
+        if conversation_id is None:
+            return [prompt for prompt in self.all() if prompt.get("conversation_id") is None]
+        return list(self._conversations().get(conversation_id, []))
+
+    def conversations(self):
+        """
+        Returns {conversation id: prompts} for every conversation, in the
+        order the conversations first appear.
+        """
+        return {conversation_id: list(prompts) for conversation_id, prompts in self._conversations().items()}
+
+    def add(self, prompt):
+        """
+        Appends a prompt.
+        """
+        with self._locked():
+            self._write({"op": "add", "prompt": prompt})
+
+    def update(self, prompt_id, fields):
+        """
+        Updates the fields of one prompt. Returns False if it doesn't exist.
+        """
+        with self._locked():
+            self._refresh()
+            if self._find(prompt_id) is None:
+                return False
+            self._write({"op": "update", "id": prompt_id, "fields": fields})
+            return True
+
+    def delete(self, prompt_id):
+        """
+        Deletes one prompt. Returns False if it doesn't exist.
+        """
+        with self._locked():
+            self._refresh()
+            if self._find(prompt_id) is None:
+                return False
+            self._write({"op": "delete", "id": prompt_id})
+            return True
+
+    def update_at(self, index, fields):
+        """
+        Updates the prompt at a position and returns it, or None if there is
+        no such position.
+        """
+        with self._locked():
+            self._refresh()
+            slot = self._slot_at(index)
+            if slot is None:
+                return None
+            self._write({"op": "update", **self._target(slot, index), "fields": fields})
+            return self._prompt(slot)
+
+    def delete_at(self, index):
+        """
+        Deletes the prompt at a position and returns it, or None if there is
+        no such position.
+        """
+        with self._locked():
+            self._refresh()
+            slot = self._slot_at(index)
+            if slot is None:
+                return None
+            prompt = self._prompt(slot)
+            self._write({"op": "delete", **self._target(slot, index)})
+            return prompt
+
+    def version(self):
+        """
+        Returns a value that changes whenever the snapshot or the journal is
+        written, by this or any other process.
+        """
+        return self._stat(self.path), self._stat(self.journal_path)
+
+    def replace_all(self, prompts):
+        """
+        Replaces every stored prompt with the given ones, atomically.
+        """
+        with self._locked():
+            self._write_snapshot(list(prompts))
+
+    def compact(self):
+        """
+        Writes the current prompts to a new snapshot and starts an empty
+        journal for it.
+
+        Both are written to temporary files and fsynced before they replace
+        the old ones, the snapshot first. A crash in between leaves the new
+        snapshot with the old journal, whose signature no longer matches.
+        """
+        with self._locked():
+            self._refresh()
+            self._write_snapshot()
+
+    def _write_snapshot(self, prompts=None):
+        # Writes `prompts`, or the current prompts, as the new snapshot.
+        # Records that didn't change are copied over without parsing them,
+        # and the new index is built along the way.
+        suffix = f".{os.getpid()}.tmp"
+        snapshot = self.path.with_name(self.path.name + suffix)
+        offsets, hashes, parsed = array("q"), array("q"), {}
+        with open(snapshot, "wb") as f:
+            position = 0
+            for number, (prompt, line, key) in enumerate(self._lines(prompts)):
+                f.write(line + b"\n")
+                offsets.append(position)
+                hashes.append(key)
+                position += len(line) + 1
+                if prompt is not None:
+                    parsed[number] = prompt
+            f.flush()
+            os.fsync(f.fileno())
+        signature = self._stat(snapshot)
+        journal = self.journal_path.with_name(self.journal_path.name + suffix)
+        with open(journal, "wb") as f:
+            header = self._header(signature)
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(snapshot, self.path)
+        os.replace(journal, self.journal_path)
+        self._sync_directory()
+        self._reset(self._open_snapshot((offsets, hashes, position), parsed))
+        self._signature = self._snapshot.signature
+        self._journal_signature = self._stat(self.journal_path)
+        self._journal_offset = len(header)
+        self._journal_ready = True
+        self._synced = time.monotonic()
+        self._unsynced = False
+
+    def _lines(self, prompts):
+        # (parsed prompt or None, line, id hash) of every record.
+        if prompts is not None:
+            for prompt in prompts:
+                yield prompt, json.dumps(prompt).encode(), id_hash(prompt.get("id"))
+            return
+        for number in range(len(self._snapshot)):
+            if number in self._deleted_set:
+                continue
+            if number in self._replaced:
+                prompt = self._replaced[number]
+                yield prompt, json.dumps(prompt).encode(), id_hash(prompt.get("id"))
+            else:
+                yield self._snapshot.cached(number), self._snapshot.raw(number), self._snapshot.id_hash(number)
+        for prompt in self._added:
+            yield prompt, json.dumps(prompt).encode(), id_hash(prompt.get("id"))
+
+    def _open_snapshot(self, index=None, parsed=None):
+        # Snapshots over lazy_bytes keep a saved index and few parsed records.
+        try:
+            lazy = self.path.stat().st_size > self.lazy_bytes
+        except FileNotFoundError:
+            lazy = False
+        if lazy:
+            return MappedJsonl(self.path, self.index_path, LAZY_CACHE_SIZE, index, parsed)
+        return MappedJsonl(self.path, index=index, parsed=parsed)
+
+    def _target(self, slot, index):
+        # Records name prompts by id; old prompts without one by position.
+        prompt_id = self._prompt(slot).get("id")
+        if prompt_id is not None and self._find(prompt_id) == slot:
+            return {"id": prompt_id}
+        return {"index": index}
+
+    def _write(self, record):
+        # Called with the lock held: catch up with other writers, append the
+        # record and apply it to the cache.
+        self._refresh()
+        if not self._journal_ready:
+            self._start_journal()
+        line = (json.dumps(record) + "\n").encode()
+        with open(self.journal_path, "r+b") as f:
+            # Drop a record torn by a crash before appending after it.
+            f.truncate(self._journal_offset)
+            f.seek(self._journal_offset)
+            f.write(line)
+            f.flush()
+            now = time.monotonic()
+            if now - self._synced >= self.fsync_interval:
+                os.fsync(f.fileno())
+                self._synced = now
+                self._unsynced = False
+            else:
+                self._unsynced = True
+                self._schedule_sync(self._synced + self.fsync_interval - now)
+        self._journal_offset += len(line)
+        self._journal_signature = self._stat(self.journal_path)
+        self._apply(record)
+        if self.compact_ops and self._journal_ops >= self.compact_ops:
+            self._write_snapshot()
+
+    def _schedule_sync(self, delay):
+        # Called with _thread_lock held after a write was left unsynced.
+        if self._sync_timer is not None and self._sync_timer.is_alive():
+            return
+        self._sync_timer = threading.Timer(delay, self._deferred_sync)
+        self._sync_timer.daemon = True
+        self._sync_timer.start()
+
+    def _deferred_sync(self):
+        with self._thread_lock:
+            self._sync_timer = None
+            self.sync()
+
+    def _start_journal(self):
+        # Replaces a missing or stale journal with an empty one for the
+        # current snapshot.
+        temporary = self.journal_path.with_name(self.journal_path.name + f".{os.getpid()}.tmp")
+        header = self._header(self._signature)
+        with open(temporary, "wb") as f:
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.journal_path)
+        self._sync_directory()
+        self._journal_signature = self._stat(self.journal_path)
+        self._journal_offset = len(header)
+        self._journal_ops = 0
+        self._journal_ready = True
+
+    def _header(self, signature):
+        return (json.dumps({"snapshot": signature}) + "\n").encode()
+
+    def _sync_directory(self):
+        try:
+            fd = os.open(self.path.parent, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            if not self._lock_depth and fcntl is not None:
+                if self._lock_file is None:
+                    self._lock_file = open(self.lock_path, "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if not self._lock_depth and fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _stat(self, path):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+    def _refresh(self):
+        if (self._stat(self.path) == self._signature
+                and self._stat(self.journal_path) == self._journal_signature):
+            return
+        with self._locked():
+            signature = self._stat(self.path)
+            journal = self._stat(self.journal_path)
+            if signature != self._signature:
+                self._load(signature)
+            elif journal != self._journal_signature:
+                if (journal is None or self._journal_signature is None
+                        or journal[0] != self._journal_signature[0] or journal[1] < self._journal_offset):
+                    # The journal was replaced or truncated: start over.
+                    self._load(signature)
+                else:
+                    self._replay(journal)
+
+    def _load(self, signature):
+        # Reopens the snapshot, then replays the journal if it belongs to it.
+        self._reset(self._open_snapshot())
+        signature = self._signature = self._snapshot.signature
+        self._journal_signature = None
+        self._journal_offset = 0
+        self._journal_ops = 0
+        self._journal_ready = False
+        journal = self._stat(self.journal_path)
+        if journal is None:
+            return
+        with open(self.journal_path, "rb") as f:
+            header = f.readline()
+        try:
+            matches = header.endswith(b"\n") and json.loads(header).get("snapshot") == signature
+        except (ValueError, AttributeError):
+            matches = False
+        if not matches:
+            stale = self._count_records()
+            if stale:
+                logger.warning(f"Ignoring {stale} journaled changes in {self.journal_path}, "
+                               f"which belong to an earlier version of {self.path}")
+            return
+        self._journal_offset = len(header)
+        self._journal_ready = True
+        self._replay(journal)
+
+    def _replay(self, journal):
+        # Applies the complete records past the journal offset.
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping a damaged record in {self.journal_path}")
+                continue
+            self._apply(record)
+        self._journal_offset += len(complete)
+        self._journal_signature = journal
+
+    def _count_records(self):
+        with open(self.journal_path, "rb") as f:
+            return max(f.read().count(b"\n") - 1, 0)
+
+    def _apply(self, record):
+        self._journal_ops += 1
+        self._by_conversation = None
+        op = record.get("op")
+        if op == "add":
+            prompt = record["prompt"]
+            self._added.append(prompt)
+            if prompt.get("id") is not None:
+                self._added_ids[prompt["id"]] = len(self._added) - 1
+            return
+        slot = self._find(record["id"]) if "id" in record else self._slot_at(record.get("index", -1))
+        if slot is None:
+            logger.warning(f"Skipping a journaled {op} of a missing prompt in {self.journal_path}")
+            return
+        kind, number = slot
+        old = self._prompt(slot)
+        if kind == "snapshot" and self._replaced_ids.get(old.get("id")) == number:
+            del self._replaced_ids[old["id"]]
+        if op == "update":
+            # Replace rather than mutate the record, since callers may hold it.
+            prompt = {**old, **record["fields"]}
+            if kind == "snapshot":
+                self._replaced[number] = prompt
+                if prompt.get("id") is not None:
+                    self._replaced_ids[prompt["id"]] = number
+            else:
+                self._added[number] = prompt
+                if prompt.get("id") != old.get("id"):
+                    self._index_added()
+        elif op == "delete":
+            if kind == "snapshot":
+                self._replaced.pop(number, None)
+                bisect.insort(self._deleted, number)
+                self._deleted_set.add(number)
+            else:
+                del self._added[number]
+                self._index_added()
+
+    def _slice(self, position, limit=None, cache=True):
+        # The prompts from a position on: the snapshot's records that weren't
+        # deleted, as last updated, then the added prompts.
+        survivors = len(self._snapshot) - len(self._deleted)
+        stop = survivors + len(self._added) if limit is None else min(position + limit, survivors + len(self._added))
+        prompts = []
+        if position < survivors:
+            if not self._deleted and not self._replaced:
+                prompts = self._snapshot.records(position, min(stop, survivors), cache)
+            else:
+                number = self._survivor(position)
+                while len(prompts) < min(stop, survivors) - position:
+                    if number in self._replaced:
+                        prompts.append(self._replaced[number])
+                    elif number not in self._deleted_set:
+                        prompts.append(self._snapshot.record(number, cache))
+                    number += 1
+        prompts.extend(self._added[max(position - survivors, 0):max(stop - survivors, 0)])
+        return prompts
+
+    def _survivor(self, position):
+        # The number of the snapshot record at a position, skipping deleted
+        # records: the lowest number with position + 1 survivors up to it.
+        low, high = position, position + len(self._deleted)
+        while low < high:
+            middle = (low + high) // 2
+            if middle + 1 - bisect.bisect_right(self._deleted, middle) > position:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _slot_at(self, index):
+        # Where the prompt at a position lives: ("snapshot", record number)
+        # or ("added", index into the added prompts). None if out of range.
+        survivors = len(self._snapshot) - len(self._deleted)
+        if 0 <= index < survivors:
+            return "snapshot", self._survivor(index)
+        if survivors <= index < survivors + len(self._added):
+            return "added", index - survivors
+        return None
+
+    def _find(self, prompt_id):
+        # The slot of the last prompt with an id, or None.
+        if prompt_id is None:
+            return None
+        if prompt_id in self._added_ids:
+            return "added", self._added_ids[prompt_id]
+        numbers = [number for number in self._snapshot.find(prompt_id)
+                   if number not in self._deleted_set and number not in self._replaced]
+        if prompt_id in self._replaced_ids:
+            numbers.append(self._replaced_ids[prompt_id])
+        return ("snapshot", max(numbers)) if numbers else None
+
+    def _prompt(self, slot):
+        kind, number = slot
+        if kind == "added":
+            return self._added[number]
+        if number in self._replaced:
+            return self._replaced[number]
+        return self._snapshot.record(number)
+
+    def _conversations(self):
+        self._refresh()
+        if self._by_conversation is None:
+            self._by_conversation = {}
+            for prompt in self._slice(0, cache=False):
+                if prompt.get("conversation_id") is not None:
+                    self._by_conversation.setdefault(prompt["conversation_id"], []).append(prompt)
+        return self._by_conversation
+
+    def _reset(self, snapshot):
+        # Starts over from a snapshot without journaled changes.
+        self._snapshot = snapshot
+        self._deleted = []
+        self._deleted_set = set()
+        self._replaced = {}
+        self._replaced_ids = {}
+        self._added = []
+        self._added_ids = {}
+        self._by_conversation = None
+
+    def _index_added(self):
+        self._added_ids = {prompt["id"]: index for index, prompt in enumerate(self._added)
+                           if prompt.get("id") is not None}
+
+class SqlitePromptStore:
+    """
+    Stores prompts in an SQLite database.
+
+    Each prompt is kept as its JSON record, keyed by id, with the
+    conversation id pulled out into an indexed column. `seq` preserves
+    insertion order so positional edits keep working like the JSONL store.
+    Every mutation touches a single row inside its own transaction.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS prompts (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            conversation_id TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS prompts_conversation_id ON prompts (conversation_id);
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def all(self):
+        """
+        Returns every prompt in insertion order.
+        """
+        rows = self.connection.execute("SELECT data FROM prompts ORDER BY seq")
+        return [json.loads(data) for data, in rows]
+
+    def count(self):
+        """
+        Returns the number of stored prompts.
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+
+    def page(self, offset, limit):
+        """
+        Returns up to `limit` prompts starting at position `offset`.
+        """
+        rows = self.connection.execute(
+            "SELECT data FROM prompts ORDER BY seq LIMIT ? OFFSET ?", (limit, offset))
+        return [json.loads(data) for data, in rows]
+
+    def get(self, prompt_id):
+        """
+        Returns the prompt with the given id, or None.
+        """
+        row = self.connection.execute(
+            "SELECT data FROM prompts WHERE id = ?", (prompt_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def by_conversation(self, conversation_id):
+        """
+        Returns the prompts of a conversation in insertion order.
+        """
+        rows = self.connection.execute(
+            "SELECT data FROM prompts WHERE conversation_id = ? ORDER BY seq",
+            (conversation_id,))
+        return [json.loads(data) for data, in rows]
+
+    def conversations(self):
+        """
+        Returns {conversation id: prompts} for every conversation, in the
+        order the conversations first appear.
+        """
+        rows = self.connection.execute(
+            "SELECT conversation_id, data FROM prompts WHERE conversation_id IS NOT NULL ORDER BY seq")
+        conversations = {}
+        for conversation_id, data in rows:
+            conversations.setdefault(conversation_id, []).append(json.loads(data))
+        return conversations
+
+    def add(self, prompt):
+        """
+        Inserts a prompt. Prompts without an id are given one.
+        """
+        prompt.setdefault("id", str(uuid.uuid4()))
+        with self.connection:
+            self._insert(prompt)
+
+    def update(self, prompt_id, fields):
+        """
+        Updates the fields of one prompt. Returns False if it doesn't exist.
+        """
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT data FROM prompts WHERE id = ?", (prompt_id,)).fetchone()
+            if not row:
+                return False
+            prompt = json.loads(row[0])
+            prompt.update(fields)
+            self.connection.execute(
+                "UPDATE prompts SET conversation_id = ?, data = ? WHERE id = ?",
+                (prompt.get("conversation_id"), json.dumps(prompt), prompt_id))
+        return True
+
+    def delete(self, prompt_id):
+        """
+        Deletes one prompt. Returns False if it doesn't exist.
+        """
+        with self.connection:
+            cursor = self.connection.execute("DELETE FROM prompts WHERE id = ?", (prompt_id,))
+        return cursor.rowcount > 0
+
+    def id_at(self, index):
+        """
+        Returns the id of the prompt at a position, or None.
+        """
+        if index < 0:
+            return None
+        row = self.connection.execute(
+            "SELECT id FROM prompts ORDER BY seq LIMIT 1 OFFSET ?", (index,)).fetchone()
+        return row[0] if row else None
+
+    def update_at(self, index, fields):
+        """
+        Updates the prompt at a position and returns it, or None if there is
+        no such position.
+        """
+        prompt_id = self.id_at(index)
+        if prompt_id is None or not self.update(prompt_id, fields):
+            return None
+        return self.get(prompt_id)
+
+    def delete_at(self, index):
+        """
+        Deletes the prompt at a position and returns it, or None if there is
+        no such position.
+        """
+        prompt_id = self.id_at(index)
+        prompt = self.get(prompt_id) if prompt_id is not None else None
+        if prompt is None or not self.delete(prompt_id):
+            return None
+        return prompt
+
+    def version(self):
+        """
+        Returns a value that changes whenever the database is written, by
+        this or any other connection.
+        """
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        return data_version, self.connection.total_changes
+
+    def replace_all(self, prompts):
+        """
+        Replaces every stored prompt in one transaction.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM prompts")
+            for prompt in prompts:
+                prompt.setdefault("id", str(uuid.uuid4()))
+                self._insert(prompt)
+
+    def _insert(self, prompt):
+        self.connection.execute(
+            "INSERT INTO prompts (id, conversation_id, data) VALUES (?, ?, ?)",
+            (prompt["id"], prompt.get("conversation_id"), json.dumps(prompt)))
+
+
+def import_jsonl(jsonl_path, store):
+    """
+    Copies every prompt from a JSONL file into a store in one transaction.
+    Returns the number of imported prompts.
+    """
+    prompts = JsonlPromptStore(jsonl_path).all()
+    with store.connection:
+        for prompt in prompts:
+            prompt.setdefault("id", str(uuid.uuid4()))
+            store._insert(prompt)
+    return len(prompts)
+
+
+if __name__ == "__main__":
+    # One-shot migration: python -m ccc.store ccc/prompts.jsonl ccc/prompts.db
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m ccc.store PROMPTS_JSONL DATABASE")
+    store = SqlitePromptStore(sys.argv[2])
+    print(f"Imported {import_jsonl(sys.argv[1], store)} prompts into {sys.argv[2]}")
+    store.close()
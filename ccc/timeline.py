@@ -0,0 +1,169 @@
+import datetime
+import heapq
+import itertools
+from collections import deque
+
+from croniter import croniter
+
+# How many upcoming fire times are kept per prompt.
+LOOKAHEAD = 5
+
+
+class _Entry:
+    """The precomputed fire times of one prompt."""
+
+    def __init__(self, expression, base, lookahead):
+        self.expression = expression
+        self.iterator = croniter(expression, base)
+        self.times = deque()
+        self.lookahead = lookahead
+        self.seq = None
+        self.fill()
+
+    def fill(self):
+        while len(self.times) < self.lookahead:
+            self.times.append(self.iterator.get_next(datetime.datetime).timestamp())
+
+
+class CronTimeline:
+    """
+    The upcoming fire times of every scheduled prompt, merged in one queue.
+
+    Each prompt keeps its next `lookahead` fire times, computed by walking a
+    single croniter iterator forward from the previous fire time, so there is
+    no drift and no duplicate slots. Only the earliest fire time of every
+    prompt sits in the priority queue; popping it pushes that prompt's
+    following one, like a k-way merge.
+    """
+
+    def __init__(self, lookahead=LOOKAHEAD):
+        self.lookahead = max(1, lookahead)
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+
+    def __contains__(self, prompt_id):
+        return prompt_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def add(self, prompt_id, expression, base=None):
+        """
+        Precomputes the fire times of a prompt after `base` (default: now),
+        replacing any it already had.
+        """
+        entry = _Entry(expression, base or datetime.datetime.now(), self.lookahead)
+        self._entries[prompt_id] = entry
+        self._push(prompt_id, entry)
+        self._compact()
+
+    def remove(self, prompt_id):
+        """
+        Drops a prompt from the timeline. Returns False if it wasn't there.
+        """
+        if self._entries.pop(prompt_id, None) is None:
+            return False
+        self._compact()
+        return True
+
+    def clear(self):
+        """
+        Drops every prompt.
+        """
+        self._heap.clear()
+        self._entries.clear()
+
+    def expression(self, prompt_id):
+        """
+        Returns the cron expression of a scheduled prompt, or None.
+        """
+        entry = self._entries.get(prompt_id)
+        return entry.expression if entry else None
+
+    def next_fire(self, prompt_id):
+        """
+        Returns the next fire time of a prompt as a timestamp, or None.
+        """
+        entry = self._entries.get(prompt_id)
+        return entry.times[0] if entry else None
+
+    def next_deadline(self):
+        """
+        Returns the earliest fire time as a timestamp, or None if empty.
+        """
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """
+        Returns (timestamp, prompt_id) for every prompt that is due at `now`
+        and advances those prompts to their next fire time. A prompt that
+        missed several slots is only returned once, for its latest slot.
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, seq, prompt_id = heapq.heappop(self._heap)
+            entry = self._entries.get(prompt_id)
+            if entry is None or entry.seq != seq:
+                continue
+            while True:
+                entry.times.popleft()
+                entry.fill()
+                if entry.times[0] > now:
+                    break
+                when = entry.times[0]
+            due.append((when, prompt_id))
+            self._push(prompt_id, entry)
+        return due
+
+    def heads(self):
+        """
+        Returns (datetime, prompt_id, expression) for the next fire time of
+        every prompt, ordered by time.
+        """
+        self._discard_stale()
+        return [(datetime.datetime.fromtimestamp(when), prompt_id, self._entries[prompt_id].expression)
+                for when, seq, prompt_id in sorted(self._heap)
+                if self._entries[prompt_id].seq == seq]
+
+    def peek(self, horizon, now=None):
+        """
+        Returns (datetime, prompt_id) for every precomputed fire time within
+        `horizon` (a timedelta or seconds) of `now`, ordered by time. Each
+        prompt contributes at most `lookahead` fire times.
+        """
+        if isinstance(horizon, datetime.timedelta):
+            horizon = horizon.total_seconds()
+        end = (now or datetime.datetime.now().timestamp()) + horizon
+        streams = [[(when, prompt_id) for when in entry.times]
+                   for prompt_id, entry in self._entries.items()]
+        upcoming = []
+        for when, prompt_id in heapq.merge(*streams):
+            if when > end:
+                break
+            upcoming.append((datetime.datetime.fromtimestamp(when), prompt_id))
+        return upcoming
+
+    def _push(self, prompt_id, entry):
+        entry.seq = next(self._counter)
+        heapq.heappush(self._heap, (entry.times[0], entry.seq, prompt_id))
+
+    def _discard_stale(self):
+        while self._heap:
+            when, seq, prompt_id = self._heap[0]
+            entry = self._entries.get(prompt_id)
+            if entry is not None and entry.seq == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        # Drop replaced entries once they make up most of the heap, so heavy
+        # editing can't grow it without bound.
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [item for item in self._heap
+                          if item[2] in self._entries and self._entries[item[2]].seq == item[1]]
+            heapq.heapify(self._heap)
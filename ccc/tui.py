@@ -0,0 +1,351 @@
+import datetime
+import uuid
+from functools import partial
+from pathlib import Path
+
+from textual.app import App, ComposeResult
+from textual.widgets import Header, Footer, DataTable, Button, Input, Label, TabbedContent, TabPane, LoadingIndicator
+from textual.containers import Container, VerticalScroll
+from textual.screen import ModalScreen
+from textual.command import Hit, Hits, Provider
+from ccc.dead_letters_view import DeadLettersTable
+from ccc.kanban import KanbanBoard
+from ccc.queue_view import QueueView
+from ccc.output_view import OutputView
+from ccc.prompts_view import PromptsTable
+from ccc.search import parse_tags, snippet
+from ccc.stats_view import StatsView
+from ccc.main import (
+    QUEUE_HORIZON,
+    add_prompt,
+    delete_prompt_by_id,
+    dismiss_dead_letter,
+    dispatch_pool,
+    edit_prompt_by_id,
+    get_dead_letters,
+    get_store,
+    job_events,
+    main,
+    metrics,
+    move_prompt,
+    prompt_text,
+    retry_dead_letter,
+    scheduler,
+    search_prompts,
+    search_responses,
+    setup_logging,
+)
+
+# Search results offered by the command palette, per kind.
+PALETTE_RESULTS = 8
+
+class ConversationScreen(ModalScreen):
+    """A modal screen for managing conversations."""
+
+    def __init__(self, conversation_id=None):
+        super().__init__()
+        self.conversation_id = conversation_id if conversation_id else str(uuid.uuid4())
+        self.prompts = []
+
+    def compose(self) -> ComposeResult:
+        yield Container(
+            DataTable(id="conversation_table"),
+            Input(placeholder="Enter new prompt..."),
+            Button("Add Prompt to Conversation", id="add_prompt_to_conversation"),
+            Button("Save Conversation", id="save_conversation"),
+            Button("Cancel", id="cancel_conversation"),
+            id="conversation_dialog",
+        )
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "add_prompt_to_conversation":
+            prompt_input = self.query_one(Input)
+            prompt_text = prompt_input.value
+            if prompt_text:
+                self.prompts.append({"prompt": prompt_text, "schedule": ""})
+                self.update_conversation_table()
+                prompt_input.value = ""
+        elif event.button.id == "save_conversation":
+            self.save_conversation()
+            self.dismiss()
+        elif event.button.id == "cancel_conversation":
+            self.dismiss()
+
+    def update_conversation_table(self):
+        table = self.query_one("#conversation_table")
+        table.clear()
+        for prompt in self.prompts:
+            table.add_row(prompt["prompt"])
+
+    def save_conversation(self):
+        # This is a simplified save function. A more robust implementation
+        # would handle editing existing conversations.
+        prompt_ids = [str(uuid.uuid4()) for _ in self.prompts]
+        for i, prompt_data in enumerate(self.prompts):
+            next_prompt_id = prompt_ids[i + 1] if i + 1 < len(self.prompts) else None
+            add_prompt(
+                prompt_data["prompt"],
+                "", # No schedule for prompts in a conversation for now
+                conversation_id=self.conversation_id,
+                next_prompt_id=next_prompt_id,
+                prompt_id=prompt_ids[i],
+            )
+            self.app.prompt_changed(get_store().get(prompt_ids[i]))
+
+class EditScreen(ModalScreen):
+    """A modal screen for editing a prompt."""
+
+    def __init__(self, prompt_id, prompt_text, schedule_text, tags_text="") -> None:
+        super().__init__()
+        self.prompt_id = prompt_id
+        self.prompt_text = prompt_text
+        self.schedule_text = schedule_text
+        self.tags_text = tags_text
+
+    def compose(self) -> ComposeResult:
+        yield Container(
+            Input(self.prompt_text, id="prompt_text"),
+            Input(self.schedule_text, id="schedule_text"),
+            Input(self.tags_text, placeholder="Tags, separated by commas", id="tags_text"),
+            Button("Save", id="save"),
+            Button("Cancel", id="cancel"),
+            id="dialog",
+        )
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "save":
+            prompt_text = self.query_one("#prompt_text").value
+            schedule_text = self.query_one("#schedule_text").value
+            tags = parse_tags(self.query_one("#tags_text").value)
+            self.dismiss((self.prompt_id, prompt_text, schedule_text, tags))
+        else:
+            self.dismiss()
+
+class CommandProvider(Provider):
+    async def search(self, query: str) -> Hits:
+        if query == "new_conversation":
+            yield Hit(1, "New Conversation", self.app.action_new_conversation)
+        elif query == "quit":
+            yield Hit(1, "Quit", self.app.action_quit)
+        if len(query.strip()) < 2:
+            return
+        # Prompts and past responses from the search index, in its (unranked) order.
+        for rank, prompt in enumerate(search_prompts(query, PALETTE_RESULTS)):
+            yield Hit(0.9 - rank / 100, f"Edit prompt: {prompt['prompt'][:80]}",
+                      partial(self.app.edit_prompt, prompt["id"]))
+        for rank, run in enumerate(search_responses(query, PALETTE_RESULTS)):
+            started = datetime.datetime.fromtimestamp(run["started"]).strftime("%Y-%m-%d %H:%M")
+            yield Hit(0.8 - rank / 100, f"Response {started}: {snippet(run['output'], query)}",
+                      partial(self.app.show_response, run))
+
+class CCC_TUI(App):
+    """A Textual app to manage Claude Code Companion prompts."""
+
+    BINDINGS = [("d", "toggle_dark", "Toggle dark mode"), ("ctrl+c", "quit", "Quit")]
+    COMMANDS = App.COMMANDS | {CommandProvider}
+
+    def compose(self) -> ComposeResult:
+        """Create child widgets for the app."""
+        yield Header()
+        with TabbedContent():
+            with TabPane("Prompts", id="prompts_tab"):
+                yield Input(placeholder='Filter prompts: words, "phrases", tag:name', id="prompt_filter")
+                yield PromptsTable(get_store, id="prompts_table")
+            with TabPane("Queue", id="queue_tab"):
+                yield QueueView(
+                    job_events,
+                    describe=prompt_text,
+                    backlog=lambda: (dispatch_pool.backlog(), dispatch_pool.active),
+                    horizon=QUEUE_HORIZON.total_seconds(),
+                )
+            with TabPane("Kanban", id="kanban_tab"):
+                yield KanbanBoard()
+            with TabPane("Output", id="output_tab"):
+                yield OutputView(id="output_view")
+            with TabPane("Stats", id="stats_tab"):
+                yield StatsView(metrics, describe=prompt_text)
+            with TabPane("Dead letters", id="dead_letters_tab"):
+                yield DeadLettersTable(get_dead_letters, id="dead_letters_table")
+        yield VerticalScroll(
+            Input(placeholder="Enter new prompt...", id="new_prompt"),
+            Input(placeholder="Enter schedule (e.g., 'every_minute')", id="new_schedule"),
+            Input(placeholder="Tags, separated by commas (optional)", id="new_tags"),
+            Button("Add Prompt", id="add_prompt"),
+            Button("Manage Conversations", id="manage_conversations"),
+        )
+        yield Footer()
+        yield LoadingIndicator(id="loading_indicator")
+        yield Label("Status: Ready", id="status")
+
+    def on_mount(self) -> None:
+        """Called when the app is mounted."""
+        self.query_one("#loading_indicator").styles.display = "none"
+        # The prompts table loads its own rows as it is scrolled, and the
+        # queue is kept current by job events. Prompts only enter the queue's
+        # horizon as time passes, so look for those now and then.
+        self.update_queue_table()
+        self.set_interval(60, self.update_queue_table)
+        self.update_kanban_board()
+        # The scheduler shares Textual's event loop, so dispatches may touch
+        # widgets directly.
+        self.run_worker(main(self), name="scheduler", group="scheduler")
+
+    def update_tables(self):
+        """Rebuild every view from the prompt store."""
+        self.filter_prompts(self.query_one("#prompt_filter", Input).value)
+        self.update_queue_table()
+        self.update_kanban_board()
+
+    def prompt_changed(self, prompt, deleted=False):
+        """Update the views after a single prompt was added, edited or deleted."""
+        table = self.query_one(PromptsTable)
+        kanban_board = self.query_one(KanbanBoard)
+        if deleted:
+            table.remove_prompt(prompt["id"])
+            kanban_board.remove_card(prompt["id"])
+        else:
+            table.upsert_prompt(prompt)
+            kanban_board.upsert_card(prompt)
+
+    def filter_prompts(self, query):
+        """Shows the prompts matching a search, or all of them."""
+        table = self.query_one(PromptsTable)
+        if query.strip():
+            table.show_only(search_prompts(query))
+        else:
+            table.reload()
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "prompt_filter":
+            self.filter_prompts(event.value)
+
+    def edit_prompt(self, prompt_id):
+        """Opens the edit dialog of a prompt."""
+        prompt_to_edit = get_store().get(prompt_id)
+        if prompt_to_edit:
+            self.push_screen(
+                EditScreen(prompt_id, prompt_to_edit["prompt"], prompt_to_edit["schedule"],
+                           ", ".join(prompt_to_edit.get("tags") or [])),
+                self.on_edit_screen_dismiss,
+            )
+
+    def show_response(self, run):
+        """Shows a past response in the Output tab."""
+        self.query_one(TabbedContent).active = "output_tab"
+        started = datetime.datetime.fromtimestamp(run["started"]).strftime("%Y-%m-%d %H:%M:%S")
+        self.query_one(OutputView).show_response(f"{run['prompt_id']} at {started}", run["output"])
+
+    def update_queue_table(self):
+        """Add prompts that are due within the queue horizon to the queue."""
+        queue_view = self.query_one(QueueView)
+        queue_view.update_queue(scheduler.peek(QUEUE_HORIZON))
+
+    def update_kanban_board(self):
+        """Update the Kanban board with conversations."""
+        self.query_one(KanbanBoard).set_conversations(get_store().conversations())
+
+    def on_kanban_board_card_moved(self, event: KanbanBoard.CardMoved) -> None:
+        """Persist a card dropped on another conversation."""
+        prompt = move_prompt(event.prompt_id, event.conversation_id)
+        if prompt:
+            self.prompt_changed(prompt)
+            self.notify("Prompt moved successfully.")
+
+    def on_data_table_cell_selected(self, event: DataTable.CellSelected) -> None:
+        """Event handler for cell selection."""
+        if event.data_table.id == "dead_letters_table":
+            self.on_dead_letter_selected(event.cell_key.row_key.value, event.cell_key.column_key.value)
+            return
+        if event.data_table.id != "prompts_table":
+            return
+        # Rows are keyed by prompt id and the action columns by name.
+        prompt_id = event.cell_key.row_key.value
+        action = event.cell_key.column_key.value
+        if action == "delete":
+            prompt = delete_prompt_by_id(prompt_id)
+            if prompt:
+                self.prompt_changed(prompt, deleted=True)
+                self.notify("Prompt deleted successfully.")
+        elif action == "edit":
+            self.edit_prompt(prompt_id)
+
+    def on_dead_letter_selected(self, letter_id, action):
+        """Retries or dismisses a dead letter."""
+        if action == "retry":
+            letter = retry_dead_letter(letter_id)
+            if letter:
+                self.notify("Prompt queued for another attempt.")
+        elif action == "dismiss":
+            letter = dismiss_dead_letter(letter_id)
+        else:
+            return
+        if letter:
+            self.query_one(DeadLettersTable).reload()
+
+    def on_edit_screen_dismiss(self, result) -> None:
+        """Called when the EditScreen is dismissed."""
+        if result:
+            prompt_id, prompt_text, schedule_text, tags = result
+            prompt = edit_prompt_by_id(prompt_id, prompt_text, schedule_text, tags)
+            if prompt:
+                self.prompt_changed(prompt)
+            self.notify("Prompt updated successfully.")
+
+    def notify(self, message: str):
+        """Display a notification in the footer."""
+        self.query_one(Footer).query_one(Label).update(message)
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        """Event handler called when a button is pressed."""
+        if event.button.id == "add_prompt":
+            prompt_input = self.query_one("#new_prompt", Input)
+            schedule_input = self.query_one("#new_schedule", Input)
+            tags_input = self.query_one("#new_tags", Input)
+            prompt_text = prompt_input.value
+            schedule_text = schedule_input.value
+            if prompt_text and schedule_text:
+                prompt_id = add_prompt(prompt_text, schedule_text, tags=parse_tags(tags_input.value))
+                self.prompt_changed(get_store().get(prompt_id))
+                prompt_input.value = ""
+                schedule_input.value = ""
+                tags_input.value = ""
+                self.notify("Prompt added successfully.")
+        elif event.button.id == "manage_conversations":
+            self.push_screen(ConversationScreen())
+
+    def action_toggle_dark(self) -> None:
+        """An action to toggle dark mode."""
+        self.dark = not self.dark
+
+    def action_new_conversation(self) -> None:
+        """An action to create a new conversation."""
+        self.push_screen(ConversationScreen())
+
+    def action_quit(self) -> None:
+        """An action to quit the application."""
+        self.exit()
+
+def show_welcome_message():
+    """
+    Shows a welcome message to new users.
+    """
+    if not Path(".onboarding_complete").exists():
+        # This is a simplified welcome message. A more robust implementation
+        # could use a dedicated screen.
+        print("Welcome to the Claude Code Companion!")
+        print("This application allows you to schedule prompts to be sent to Claude Code.")
+        print("You can add, edit, and delete prompts using the TUI.")
+        print("You can also create conversational workflows by chaining prompts together.")
+        print("Enjoy!")
+        Path(".onboarding_complete").touch()
+
+def run():
+    """
+    Runs the TUI; the scheduler is started from CCC_TUI.on_mount.
+    """
+    setup_logging()
+    show_welcome_message()
+    CCC_TUI().run()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+
+def serve(cluster=True, metrics_port=None):
+    """
+    Runs one headless scheduler process until it is interrupted or
+    terminated. With cluster=None, [Cluster] enabled decides whether it
+    shares the schedule with other processes.
+
+    Metrics are served on `metrics_port` ([Metrics] port by default; 0
+    disables them).
+    """
+    from ccc import main as ccc_main
+    from ccc.metrics import serve_metrics
+
+    ccc_main.setup_logging()
+    if metrics_port is None:
+        metrics_port = ccc_main.METRICS_PORT
+
+    async def run():
+        task = asyncio.current_task()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        server = None
+        if metrics_port:
+            try:
+                server = await serve_metrics(ccc_main.metrics, ccc_main.METRICS_HOST, metrics_port)
+            except OSError as e:
+                ccc_main.logger.warning(f"Not serving metrics on port {metrics_port}: {e}")
+        try:
+            await ccc_main.main(cluster=cluster)
+        finally:
+            if server is not None:
+                server.close()
+
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+def run_workers(processes, metrics_port=None):
+    """
+    Starts `processes` local scheduler processes in cluster mode and waits
+    for them. Run it on several hosts that share the prompt store and
+    [Cluster] leases to spread the schedule further. Worker i serves its
+    metrics on metrics_port + i.
+    """
+    if processes <= 1:
+        serve(metrics_port=metrics_port)
+        return
+    if metrics_port is None:
+        from ccc.main import METRICS_PORT as metrics_port
+    workers = [multiprocessing.Process(target=serve, name=f"ccc-worker-{i}",
+                                       args=(True, metrics_port + i if metrics_port else 0))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # The workers leave the cluster on SIGTERM; don't interrupt that.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run headless scheduler workers that split the schedule between them.")
+    parser.add_argument("-n", "--processes", type=int, default=1,
+                        help="number of local worker processes (default: 1)")
+    args = parser.parse_args(argv)
+    run_workers(args.processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import tempfile
+import threading
+import unittest
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.backends import ApiBackend
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_body(texts):
+    body = sse("message_start", {"type": "message_start", "message": {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": "stub",
+        "content": [], "stop_reason": None, "stop_sequence": None,
+        "usage": {"input_tokens": 1, "output_tokens": 0}}})
+    body += sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                        "content_block": {"type": "text", "text": ""}})
+    for text in texts:
+        body += sse("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                            "delta": {"type": "text_delta", "text": text}})
+    body += sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+    body += sse("message_delta", {"type": "message_delta",
+                                  "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                  "usage": {"output_tokens": len(texts)}})
+    body += sse("message_stop", {"type": "message_stop"})
+    return body.encode()
+
+def batch(status, base_url):
+    return {"id": "batch_1", "type": "message_batch", "processing_status": status,
+            "request_counts": {"processing": 0, "succeeded": 1, "errored": 1,
+                               "canceled": 0, "expired": 0},
+            "created_at": "2025-01-01T00:00:00Z", "expires_at": "2025-01-02T00:00:00Z",
+            "ended_at": None, "cancel_initiated_at": None, "archived_at": None,
+            "results_url": f"{base_url}/v1/messages/batches/batch_1/results" if status == "ended" else None}
+
+def message(text):
+    return {"id": "msg_1", "type": "message", "role": "assistant", "model": "stub",
+            "content": [{"type": "text", "text": text}], "stop_reason": "end_turn",
+            "stop_sequence": None, "usage": {"input_tokens": 1, "output_tokens": 1}}
+
+class StubMessagesAPI(BaseHTTPRequestHandler):
+    """A local stand-in for the Messages API that echoes the prompt."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        base_url = f"http://127.0.0.1:{self.server.server_port}"
+        if self.path.startswith("/v1/messages/batches/batch_1/results"):
+            lines = []
+            for i, params in enumerate(self.server.batch_requests):
+                prompt = params["params"]["messages"][0]["content"]
+                if prompt == "fail":
+                    result = {"type": "errored", "error": {"type": "error", "error": {
+                        "type": "invalid_request_error", "message": "bad prompt"}}}
+                else:
+                    result = {"type": "succeeded", "message": message(f"Echo: {prompt}")}
+                lines.append(json.dumps({"custom_id": params["custom_id"], "result": result}))
+            # Results are not guaranteed to come back in request order.
+            self.reply(200, "\n".join(reversed(lines)).encode(), "application/binary")
+        else:
+            self.server.polls += 1
+            status = "ended" if self.server.polls > 1 else "in_progress"
+            self.reply(200, json.dumps(batch(status, base_url)).encode())
+
+    def reply(self, code, body, content_type="application/json"):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.connections.add(self.client_address)
+        if self.path.startswith("/v1/messages/batches"):
+            self.server.batch_requests = request["requests"]
+            base_url = f"http://127.0.0.1:{self.server.server_port}"
+            self.reply(200, json.dumps(batch("in_progress", base_url)).encode())
+            return
+        prompt = request["messages"][0]["content"]
+        if prompt == "fail":
+            body = json.dumps({"type": "error", "error": {
+                "type": "invalid_request_error", "message": "bad prompt"}}).encode()
+            self.send_response(400)
+            self.send_header("Content-Type", "application/json")
+        else:
+            body = stream_body(["Echo: ", prompt])
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestApiBackend(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        """Start a stub API server on a free local port."""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubMessagesAPI)
+        self.server.connections = set()
+        self.server.polls = 0
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = ApiBackend(api_key="test", model="stub", max_retries=0,
+                                  base_url=f"http://127.0.0.1:{self.server.server_port}",
+                                  batch_poll_interval=0.01)
+
+    async def asyncTearDown(self):
+        await self.backend.close()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    async def test_streams_response_to_file(self):
+        """Test that the streamed reply is written to the output file."""
+        texts = []
+        output = Path(self.tmp.name) / "1" / "run.out"
+
+        result = await self.backend.run("hello", output, texts.append)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(output.read_text(), "Echo: hello")
+        self.assertEqual("".join(texts), "Echo: hello")
+
+    async def test_reuses_connections(self):
+        """Test that consecutive dispatches share one pooled connection."""
+        for i in range(3):
+            await self.backend.run(f"prompt {i}", Path(self.tmp.name) / f"{i}.out")
+
+        self.assertEqual(len(self.server.connections), 1)
+
+    async def test_api_errors_become_failed_results(self):
+        """Test that an API error is reported rather than raised."""
+        result = await self.backend.run("fail", Path(self.tmp.name) / "fail.out")
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("bad prompt", result.error)
+
+    async def test_batch_results_fan_out_to_output_files(self):
+        """Test that one batch submission yields a result per prompt."""
+        outputs = [Path(self.tmp.name) / f"{i}.out" for i in range(3)]
+
+        results = await self.backend.run_batch(
+            [("one", outputs[0]), ("fail", outputs[1]), ("three", outputs[2])])
+
+        self.assertEqual([r.exit_code for r in results], [0, 1, 0])
+        self.assertIn("errored", results[1].error)
+        self.assertEqual(outputs[0].read_text(), "Echo: one")
+        self.assertEqual(outputs[2].read_text(), "Echo: three")
+        self.assertEqual(len(self.server.batch_requests), 3)
+
+if __name__ == '__main__':
+    unittest.main()
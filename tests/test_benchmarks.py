@@ -0,0 +1,51 @@
+import json
+import tempfile
+import unittest
+import os
+from pathlib import Path
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.run import BENCHMARKS, baseline, make_corpus, run
+from ccc import main as ccc_main
+
+class TestBenchmarks(unittest.TestCase):
+    def test_corpus(self):
+        """Test that the corpus has the requested size and valid chains."""
+        prompts = make_corpus(500)
+        self.assertEqual(len(prompts), 500)
+        ids = {prompt["id"] for prompt in prompts}
+        self.assertEqual(len(ids), 500)
+        self.assertTrue(all(prompt["next_prompt_id"] in ids for prompt in prompts if prompt["next_prompt_id"]))
+        self.assertEqual(make_corpus(500), prompts)
+
+    def test_run_records_results_and_regressions(self):
+        """Test a tiny run of every benchmark against a slower-looking baseline."""
+        prompts_file = ccc_main.PROMPTS_FILE
+        with tempfile.TemporaryDirectory() as directory:
+            results_file = Path(directory) / "results.jsonl"
+            previous = [{"benchmark": name, "size": 20, "store": "jsonl", "seconds": 1e-9, "commit": "0000000"}
+                        for name in BENCHMARKS]
+            results_file.write_text("".join(json.dumps(result) + "\n" for result in previous))
+
+            results, regressions = run(list(BENCHMARKS), [20], "jsonl", 1, results_file, log=lambda line: None)
+
+            self.assertEqual([result["benchmark"] for result in results], list(BENCHMARKS))
+            self.assertTrue(all(result["seconds"] > 0 for result in results))
+            self.assertEqual(len(regressions), len(BENCHMARKS))
+            stored = [json.loads(line) for line in results_file.read_text().splitlines()]
+            self.assertEqual(stored[len(previous):], results)
+        self.assertEqual(ccc_main.PROMPTS_FILE, prompts_file)
+
+    def test_baseline_skips_same_commit(self):
+        """Test that results are compared with an earlier commit only."""
+        older = {"benchmark": "load_prompts", "size": 10, "store": "jsonl", "commit": "a"}
+        same = dict(older, commit="b")
+        other_size = dict(older, commit="c", size=20)
+        self.assertIs(baseline([older, same, other_size], dict(older, commit="b")), older)
+        self.assertIsNone(baseline([same], dict(older, commit="b")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.cache import ResultCache, cache_key, workdir_fingerprint
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+        self.cache = ResultCache(self.directory / "cache", max_bytes=100, max_entries=3)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def result(self, text):
+        path = self.directory / "result.out"
+        path.write_text(text)
+        return path
+
+    def test_put_get_and_expiry(self):
+        """Test that a result is served until its TTL runs out."""
+        self.cache.put("k", self.result("hello"), ttl=60, now=1000)
+        self.assertEqual(self.cache.get("k", now=1059).read_text(), "hello")
+        self.assertFalse(self.cache.contains("k", now=1060))
+        self.assertIsNone(self.cache.get("k", now=1060))
+        self.assertEqual(self.cache.stats(), (0, 0))
+        self.assertFalse(self.cache.path("k").exists())
+
+    def test_evicts_least_recently_used(self):
+        """Test LRU eviction by entry count and by size."""
+        for i, key in enumerate("abc"):
+            self.cache.put(key, self.result("x" * 10), ttl=60, now=1000 + i)
+        self.cache.get("a", now=1010)
+        self.cache.put("d", self.result("x" * 10), ttl=60, now=1011)
+        self.assertEqual([key for key in "abcd" if self.cache.contains(key, now=1012)], ["a", "c", "d"])
+
+        self.cache.put("e", self.result("x" * 90), ttl=60, now=1013)
+        self.assertEqual([key for key in "acde" if self.cache.contains(key, now=1014)], ["d", "e"])
+        self.assertEqual(self.cache.stats(), (2, 100))
+
+    def test_key_covers_text_workdir_and_backend(self):
+        """Test that any change of input changes the key."""
+        key = cache_key("prompt", "tree", "cli:")
+        self.assertEqual(key, cache_key("prompt", "tree", "cli:"))
+        self.assertNotEqual(key, cache_key("prompt!", "tree", "cli:"))
+        self.assertNotEqual(key, cache_key("prompt", "tree2", "cli:"))
+        self.assertNotEqual(key, cache_key("prompt", "tree", "api:model"))
+
+    def test_workdir_fingerprint_follows_changes(self):
+        """Test the fingerprint of a plain directory and of a git checkout."""
+        plain = self.directory / "plain"
+        plain.mkdir()
+        (plain / "a.txt").write_text("one")
+        before = asyncio.run(workdir_fingerprint(plain, max_age=0))
+        self.assertEqual(before, asyncio.run(workdir_fingerprint(plain, max_age=0)))
+        (plain / "a.txt").write_text("three")
+        self.assertNotEqual(before, asyncio.run(workdir_fingerprint(plain, max_age=0)))
+
+        checkout = self.directory / "checkout"
+        checkout.mkdir()
+        git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        subprocess.run(git + ["init", "-q"], cwd=checkout, check=True)
+        (checkout / "a.txt").write_text("one")
+        subprocess.run(git + ["add", "a.txt"], cwd=checkout, check=True)
+        subprocess.run(git + ["commit", "-qm", "one"], cwd=checkout, check=True)
+        committed = asyncio.run(workdir_fingerprint(checkout, max_age=0))
+        (checkout / "a.txt").write_text("two")
+        edited = asyncio.run(workdir_fingerprint(checkout, max_age=0))
+        self.assertNotEqual(committed, edited)
+        # Within max_age the previous fingerprint is reused.
+        (checkout / "a.txt").write_text("one")
+        self.assertEqual(asyncio.run(workdir_fingerprint(checkout)), edited)
+        self.assertEqual(asyncio.run(workdir_fingerprint(checkout, max_age=0)), committed)
+
+    def test_workdir_fingerprint_does_not_block_the_loop(self):
+        """Test that git runs off the event loop and concurrent callers share it."""
+        calls = []
+
+        def slow_git(args, **kwargs):
+            calls.append(args)
+            time.sleep(0.05)
+            return subprocess.CompletedProcess(args, 0, stdout=b"state")
+
+        async def run():
+            ticks = []
+
+            async def tick():
+                while True:
+                    ticks.append(None)
+                    await asyncio.sleep(0.005)
+
+            ticker = asyncio.ensure_future(tick())
+            fingerprints = await asyncio.gather(*(workdir_fingerprint(self.directory, max_age=0) for _ in range(3)))
+            ticker.cancel()
+            return fingerprints, len(ticks)
+
+        with patch('ccc.cache.subprocess.run', side_effect=slow_git):
+            fingerprints, ticks = asyncio.run(run())
+        self.assertEqual(len(set(fingerprints)), 1)
+        self.assertEqual(len(calls), 3)
+        self.assertGreater(ticks, 5)
+
+if __name__ == '__main__':
+    unittest.main()
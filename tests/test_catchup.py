@@ -0,0 +1,67 @@
+import datetime
+import tempfile
+import unittest
+import os
+from pathlib import Path
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.catchup import CatchUp, WatermarkStore, missed_fires, plan_catch_up
+
+def ts(*args):
+    return datetime.datetime(*args).timestamp()
+
+class TestWatermarkStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = WatermarkStore(Path(self.tmp.name) / "watermarks.db")
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_watermarks_only_move_forward(self):
+        """Test that an older fire time never replaces a newer one."""
+        self.store.advance([("1", 200.0), ("2", 100.0)])
+        self.store.advance([("1", 150.0), ("2", 300.0)])
+        self.assertEqual(self.store.all(), {"1": 200.0, "2": 300.0})
+        self.store.remove("1")
+        self.assertIsNone(self.store.get("1"))
+        self.assertEqual(self.store.get("2"), 300.0)
+
+class TestPlan(unittest.TestCase):
+    def test_missed_fires(self):
+        """Test that only fires between the watermark and the next fire count."""
+        fires, missed = missed_fires("0 * * * *", ts(2025, 1, 1, 9, 0), ts(2025, 1, 1, 13, 0), 2)
+        self.assertEqual(missed, 3)
+        self.assertEqual(fires, [ts(2025, 1, 1, 11, 0), ts(2025, 1, 1, 12, 0)])
+        self.assertEqual(missed_fires("0 * * * *", ts(2025, 1, 1, 12, 0), ts(2025, 1, 1, 13, 0), 5), ([], 0))
+
+    def test_policies(self):
+        """Test skip, coalesce and replay, and that new prompts missed nothing."""
+        now = ts(2025, 1, 1, 12, 30)
+        next_fire = ts(2025, 1, 1, 13, 0)
+        jobs = [(prompt_id, "0 * * * *", next_fire) for prompt_id in ("skip", "replay", "coalesce", "new")]
+        since = ts(2025, 1, 1, 8, 0)
+        watermarks = {"skip": since, "replay": since, "coalesce": since}
+        policies = {"skip": "skip", "replay": "replay", "coalesce": "coalesce"}
+
+        plan = plan_catch_up(jobs, watermarks, policies.get, now=now, max_replays=3)
+
+        self.assertEqual(plan, [
+            CatchUp("coalesce", "coalesce", [ts(2025, 1, 1, 12)], 4),
+            CatchUp("replay", "replay", [ts(2025, 1, 1, 10), ts(2025, 1, 1, 11), ts(2025, 1, 1, 12)], 4),
+            CatchUp("skip", "skip", [], 4),
+        ])
+
+    def test_max_age(self):
+        """Test that fires older than max_age are not caught up."""
+        now = ts(2025, 1, 10, 12, 30)
+        plan = plan_catch_up([("1", "0 12 * * *", ts(2025, 1, 11, 12))], {"1": ts(2025, 1, 1, 12)},
+                             lambda prompt_id: "replay", now=now, max_age=2 * 24 * 60 * 60)
+        self.assertEqual(plan, [CatchUp("1", "replay", [ts(2025, 1, 9, 12), ts(2025, 1, 10, 12)], 2)])
+
+if __name__ == '__main__':
+    unittest.main()
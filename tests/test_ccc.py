@@ -1,6 +1,10 @@
+import asyncio
 import unittest
 import os
 import json
+import subprocess
+import tempfile
+import time
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -14,9 +18,38 @@ from ccc.main import (
     add_prompt,
     delete_prompt,
     edit_prompt,
+    delete_prompt_by_id,
+    edit_prompt_by_id,
+    move_prompt,
     schedule_prompts,
     dispatch_prompt,
+    scheduler,
+    get_history,
+    _histories,
+    dispatch_batch,
+    dispatch_class,
+    submit_batch,
+    _batches,
+    metrics,
+    get_dead_letters,
+    retry_dead_letter,
+    _dead_letters,
+    _caches,
+    _search_indexes,
+    _search_synced,
+    _watermarks,
+    catch_up,
+    get_watermarks,
+    search_prompts,
+    search_responses,
+    reindex,
+    dispatch_pool,
+    main,
+    ui_app,
 )
+from ccc.backends import RunResult
+from ccc.retry import CircuitBreaker, RetryPolicy
+from ccc.store import JsonlPromptStore
 
 class TestCCC(unittest.TestCase):
     def setUp(self):
@@ -27,15 +60,52 @@ class TestCCC(unittest.TestCase):
         self.mock_prompts_file = self.prompts_file_patcher.start()
 
         self.test_prompts = [
-            {"prompt": "Test prompt 1", "schedule": "* * * * *"},
-            {"prompt": "Test prompt 2", "schedule": "0 0 * * *"},
+            {"id": "1", "prompt": "Test prompt 1", "schedule": "* * * * *"},
+            {"id": "2", "prompt": "Test prompt 2", "schedule": "0 0 * * *"},
         ]
         save_prompts(self.test_prompts)
 
+        self.runs_dir = tempfile.TemporaryDirectory()
+        self.runs_dir_patcher = patch('ccc.main.RUNS_DIR', Path(self.runs_dir.name))
+        self.runs_dir_patcher.start()
+        self.history_dir_patcher = patch('ccc.main.HISTORY_DIR', Path(self.runs_dir.name) / "history")
+        self.history_dir_patcher.start()
+        # One attempt per dispatch unless a test says otherwise, a breaker
+        # that never opens, and dead letters kept out of the real file.
+        self.retry_patchers = [
+            patch('ccc.main.retry_policy', RetryPolicy(max_attempts=1)),
+            patch('ccc.main.breaker', CircuitBreaker(failure_rate=1, min_calls=1000)),
+            patch('ccc.main.DEAD_LETTERS_FILE', Path(self.runs_dir.name) / "dead_letters.jsonl"),
+            patch('ccc.main.CACHE_DIR', Path(self.runs_dir.name) / "cache"),
+            patch('ccc.main.SEARCH_DB', Path(self.runs_dir.name) / "search.db"),
+            patch('ccc.main.WATERMARKS_DB', Path(self.runs_dir.name) / "watermarks.db"),
+        ]
+        for patcher in self.retry_patchers:
+            patcher.start()
+
     def tearDown(self):
         """Remove the temporary prompts file and stop patching."""
-        if self.test_prompts_file.exists():
-            self.test_prompts_file.unlink()
+        get_history().close()
+        _histories.clear()
+        _dead_letters.clear()
+        for cache in _caches.values():
+            cache.close()
+        _caches.clear()
+        for index in _search_indexes.values():
+            index.close()
+        _search_indexes.clear()
+        _search_synced.clear()
+        for watermarks in _watermarks.values():
+            watermarks.close()
+        _watermarks.clear()
+        for patcher in self.retry_patchers:
+            patcher.stop()
+        self.runs_dir_patcher.stop()
+        self.history_dir_patcher.stop()
+        self.runs_dir.cleanup()
+        for path in (self.test_prompts_file, Path("test_prompts.jsonl.journal"), Path("test_prompts.jsonl.lock")):
+            if path.exists():
+                path.unlink()
         # Stop patching
         self.prompts_file_patcher.stop()
 
@@ -70,25 +140,520 @@ class TestCCC(unittest.TestCase):
         self.assertEqual(prompts[0]["prompt"], "Updated prompt")
         self.assertEqual(prompts[0]["schedule"], "15 * * * *")
 
-    @patch('ccc.main.schedule')
     @patch('ccc.main.PROMPTS_FILE', new_callable=lambda: Path("test_prompts.jsonl"))
-    def test_schedule_prompts(self, mock_prompts_file, mock_schedule):
+    def test_edit_and_delete_by_id(self, mock_prompts_file):
+        """Test the id-based mutations used by the TUI."""
+        schedule_prompts()
+        prompt = edit_prompt_by_id("2", "Updated prompt", "not a schedule")
+        self.assertEqual(prompt["prompt"], "Updated prompt")
+        self.assertNotIn("2", scheduler)
+
+        self.assertEqual(delete_prompt_by_id("1")["prompt"], "Test prompt 1")
+        self.assertNotIn("1", scheduler)
+        self.assertIsNone(delete_prompt_by_id("1"))
+        self.assertIsNone(edit_prompt_by_id("missing", "", ""))
+        self.assertEqual([p["id"] for p in load_prompts()], ["2"])
+
+    def test_search_follows_mutations(self):
+        """Test that tags and edits are searchable as soon as they are made."""
+        prompt_id = add_prompt("Summarise the open issues", "0 9 * * *", tags=["Triage", "daily"])
+        self.assertEqual([p["id"] for p in search_prompts("tag:triage")], [prompt_id])
+        self.assertEqual([p["id"] for p in search_prompts("prompt")], ["1", "2"])
+
+        edit_prompt_by_id("1", "Review the changes", "* * * * *", tags=["review"])
+        self.assertEqual([p["id"] for p in search_prompts("tag:review chang")], ["1"])
+        self.assertEqual(edit_prompt_by_id(prompt_id, "Summarise", "")["tags"], ["triage", "daily"])
+
+        delete_prompt_by_id(prompt_id)
+        self.assertEqual(search_prompts("tag:triage"), [])
+
+    def test_search_catches_up_with_external_edits(self):
+        """Test that prompts written behind ccc's back are indexed on search."""
+        self.assertEqual(len(search_prompts("prompt")), 2)
+        with open(self.test_prompts_file, "a") as f:
+            f.write(json.dumps({"id": "3", "prompt": "Hand-written prompt", "schedule": ""}) + "\n")
+        self.assertEqual([p["id"] for p in search_prompts("hand")], ["3"])
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_responses_are_searchable(self, mock_exec):
+        """Test that a successful response is indexed and reindex restores it."""
+        mock_exec.side_effect = fake_claude([b"The deploy needs a rollback\n"])
+        self.assertTrue(asyncio.run(dispatch_prompt("1", timeout=30)))
+        run, = search_responses("rollback")
+        self.assertEqual(run["prompt_id"], "1")
+        self.assertEqual(run["run_id"], get_history().last_runs("1")[0]["run_id"])
+
+        self.assertEqual(reindex(), (2, 1))
+        self.assertEqual([r["run_id"] for r in search_responses("rollback")], [run["run_id"]])
+
+    def test_catch_up_after_downtime(self):
+        """Test that missed fires are coalesced or replayed a few at a time."""
+        save_prompts([
+            {"id": "1", "prompt": "Coalesced", "schedule": "* * * * *"},
+            {"id": "2", "prompt": "Replayed", "schedule": "* * * * *", "catch_up": "replay"},
+            {"id": "3", "prompt": "Replayed too", "schedule": "* * * * *", "catch_up": "replay"},
+            {"id": "4", "prompt": "Never fired", "schedule": "* * * * *"},
+        ])
+        schedule_prompts()
+        since = time.time() - 10 * 60
+        get_watermarks().advance([("1", since), ("2", since), ("3", since)])
+        running, dispatched = [], []
+        replayed = metrics.missed_fires.value("replay", "dispatched")
+
+        async def dispatch(prompt_id, app=None, timeout=None):
+            running.append(prompt_id)
+            dispatched.append((prompt_id, len(running)))
+            await asyncio.sleep(0.01)
+            running.remove(prompt_id)
+            return True
+
+        with patch('ccc.main.dispatch_prompt', dispatch), patch('ccc.main.CATCHUP_MAX_REPLAYS', 3), \
+                patch('ccc.main.CATCHUP_CONCURRENCY', 2):
+            asyncio.run(catch_up())
+
+        self.assertEqual(sorted(prompt_id for prompt_id, _ in dispatched), ["1", "2", "2", "2", "3", "3", "3"])
+        self.assertLessEqual(max(concurrent for _, concurrent in dispatched), 2)
+        next_fire = scheduler.timeline.next_fire("1")
+        for prompt_id in ("1", "2", "3"):
+            self.assertLess(next_fire - get_watermarks().get(prompt_id), 61)
+        self.assertIsNotNone(get_watermarks().get("4"))
+        self.assertEqual(metrics.missed_fires.value("replay", "dispatched") - replayed, 6)
+
+        # Everything missed has been caught up now.
+        dispatched.clear()
+        with patch('ccc.main.dispatch_prompt', dispatch):
+            asyncio.run(catch_up())
+        self.assertEqual(dispatched, [])
+
+    @patch('ccc.main.PROMPTS_FILE', new_callable=lambda: Path("test_prompts.jsonl"))
+    def test_move_prompt(self, mock_prompts_file):
+        """Test that moving a prompt into a conversation unschedules it."""
+        schedule_prompts()
+        prompt = move_prompt("2", "c1")
+        self.assertEqual(prompt["conversation_id"], "c1")
+        self.assertNotIn("2", scheduler)
+        self.assertIsNone(move_prompt("missing", "c1"))
+
+    @patch('ccc.main.PROMPTS_FILE', new_callable=lambda: Path("test_prompts.jsonl"))
+    def test_schedule_prompts(self, mock_prompts_file):
         """Test scheduling prompts."""
         schedule_prompts()
-        self.assertEqual(mock_schedule.every().day.at.call_count, 2)
+        jobs = scheduler.jobs
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual({job.prompt_id for job in jobs}, {"1", "2"})
+        self.assertLessEqual(jobs[0].next_run, jobs[1].next_run)
+
+    def test_prompt_added_by_another_process_is_scheduled(self):
+        """Test that a running scheduler picks up prompts written behind its back."""
+        async def idle(claim=None):
+            await asyncio.Event().wait()
+
+        async def run():
+            daemon = asyncio.ensure_future(main(cluster=False))
+            await asyncio.sleep(0.05)
+            self.assertNotIn("3", scheduler)
+            with open(self.test_prompts_file, "a") as f:
+                f.write(json.dumps({"id": "3", "prompt": "Added later", "schedule": "* * * * *"}) + "\n")
+            for _ in range(100):
+                if "3" in scheduler:
+                    break
+                await asyncio.sleep(0.01)
+            daemon.cancel()
+            self.assertIn("3", scheduler)
+
+        with patch.object(scheduler, 'run', idle), patch('ccc.main.catch_up', idle), \
+                patch('ccc.main.RESYNC_INTERVAL', 0.01), self.assertLogs('ccc.main', level='INFO'):
+            asyncio.run(run())
+        scheduler.clear()
+
+    def test_resync_skips_own_writes_and_unchanged_prompts(self):
+        """Test that resyncing only reschedules what another process changed."""
+        async def idle(claim=None):
+            await asyncio.Event().wait()
+
+        async def run():
+            daemon = asyncio.ensure_future(main(cluster=False))
+            await asyncio.sleep(0.05)
+            with patch.object(scheduler, 'add', wraps=scheduler.add) as add, \
+                    patch.object(scheduler, 'clear') as clear:
+                edit_prompt_by_id("2", "Test prompt 2", "0 1 * * *")
+                await asyncio.sleep(0.05)
+                self.assertEqual([call.args for call in add.call_args_list], [("2", "0 1 * * *")])
+                other = JsonlPromptStore(self.test_prompts_file)
+                other.add({"id": "3", "prompt": "Added later", "schedule": "* * * * *"})
+                other.close()
+                for _ in range(100):
+                    if "3" in scheduler:
+                        break
+                    await asyncio.sleep(0.01)
+                self.assertEqual([call.args[0] for call in add.call_args_list], ["2", "3"])
+                clear.assert_not_called()
+            daemon.cancel()
+
+        with patch.object(scheduler, 'run', idle), patch('ccc.main.catch_up', idle), \
+                patch('ccc.main.RESYNC_INTERVAL', 0.01), self.assertLogs('ccc.main', level='INFO'):
+            asyncio.run(run())
+        scheduler.clear()
+
+    @patch('ccc.main.PROMPTS_FILE', new_callable=lambda: Path("test_prompts.jsonl"))
+    def test_mutations_reschedule_only_touched_prompt(self, mock_prompts_file):
+        """Test that add/edit/delete update single jobs instead of rebuilding."""
+        schedule_prompts()
+        with patch.object(scheduler, 'clear') as mock_clear:
+            prompt_id = add_prompt("Test prompt 3", "0 12 * * *")
+            self.assertIn(prompt_id, scheduler)
+            edit_prompt(2, "Test prompt 3", "not a schedule")
+            self.assertNotIn(prompt_id, scheduler)
+            delete_prompt(0)
+            self.assertNotIn("1", scheduler)
+            self.assertIn("2", scheduler)
+        mock_clear.assert_not_called()
 
-    @patch('ccc.main.subprocess.run')
-    def test_dispatch_prompt(self, mock_run):
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_dispatch_prompt(self, mock_exec):
         """Test dispatching a prompt."""
-        mock_result = MagicMock()
-        mock_result.stdout = "Test response"
-        mock_run.return_value = mock_result
-
-        dispatch_prompt("Test prompt")
-        mock_run.assert_called_once_with(
-            ['claude', 'code', '-p', 'Test prompt'],
-            capture_output=True, text=True, check=True
+        mock_exec.side_effect = fake_claude([b"Test ", b"response\n"])
+
+        with self.assertLogs('ccc.main', level='INFO') as logs:
+            self.assertTrue(asyncio.run(dispatch_prompt("1", timeout=30)))
+        mock_exec.assert_called_once_with(
+            'claude', 'code', '-p', 'Test prompt 1',
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
         )
+        self.assertIn("Received response: 14 bytes", logs.output[-1])
+        outputs = list(Path(self.runs_dir.name).glob("1/*.out"))
+        self.assertEqual(len(outputs), 1)
+        self.assertEqual(outputs[0].read_text(), "Test response\n")
+        run, = get_history().last_runs("1")
+        self.assertEqual((run["status"], run["exit_code"], run["output_bytes"]), ("done", 0, 14))
+        self.assertEqual(run["output"], str(outputs[0]))
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_scheduled_dispatch_streams_into_tui(self, mock_exec):
+        """Test that a fire of the scheduler reaches the TUI's Output tab."""
+        mock_exec.side_effect = fake_claude([b"Test response\n"])
+        app = MagicMock()
+
+        async def fire():
+            dispatch_pool.submit("1")
+            await dispatch_pool.join()
+
+        async def nothing_missed(claim=None):
+            pass
+
+        with patch.object(scheduler, 'run', fire), patch('ccc.main.catch_up', nothing_missed):
+            asyncio.run(main(app, cluster=False))
+        output_view = app.query_one("#output_view")
+        output_view.start_run.assert_called_once()
+        prompt_id, path = output_view.start_run.call_args.args
+        self.assertEqual(prompt_id, "1")
+        output_view.write.assert_any_call(path, "Test response\n")
+        output_view.end_run.assert_called_once_with(path, "done")
+        self.assertIsNone(ui_app())
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_dispatch_chain_resumes_session(self, mock_exec):
+        """Test that a follow-up prompt continues the first prompt's session."""
+        save_prompts([
+            {"id": "1", "prompt": "First", "conversation_id": "c", "next_prompt_id": "2"},
+            {"id": "2", "prompt": "Second", "conversation_id": "c", "next_prompt_id": None},
+        ])
+        mock_exec.side_effect = fake_claude([b"ok\n"])
+
+        asyncio.run(dispatch_prompt("1", timeout=30))
+
+        first, second = [call.args for call in mock_exec.call_args_list]
+        self.assertEqual(first[:5], ('claude', 'code', '-p', 'First', '--session-id'))
+        self.assertEqual(second, ('claude', 'code', '-p', 'Second', '--resume', first[5]))
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_parallel_follow_ups_fork_the_session(self, mock_exec):
+        """Test that each branch of a conversation continues its own copy of the session."""
+        save_prompts([
+            {"id": "1", "prompt": "First", "conversation_id": "c", "next_prompt_id": ["2", "3"]},
+            {"id": "2", "prompt": "Second", "conversation_id": "c", "next_prompt_id": None},
+            {"id": "3", "prompt": "Third", "conversation_id": "c", "next_prompt_id": None},
+        ])
+        mock_exec.side_effect = fake_claude([b"ok\n"])
+
+        with self.assertLogs('ccc.main', level='INFO'):
+            self.assertTrue(asyncio.run(dispatch_prompt("1", timeout=30)))
+
+        first, *branches = [call.args for call in mock_exec.call_args_list]
+        session = first[5]
+        self.assertEqual(sorted(branch[3] for branch in branches), ["Second", "Third"])
+        for branch in branches:
+            self.assertEqual(branch[4:8], ('--resume', session, '--fork-session', '--session-id'))
+        self.assertEqual(len({session} | {branch[8] for branch in branches}), 3)
+
+    def test_dispatch_chain_with_cycle_is_refused(self):
+        """Test that a cyclic conversation is reported instead of looping forever."""
+        save_prompts([
+            {"id": "1", "prompt": "First", "next_prompt_id": "2"},
+            {"id": "2", "prompt": "Second", "next_prompt_id": "1"},
+        ])
+        with self.assertLogs('ccc.main', level='ERROR') as logs:
+            asyncio.run(dispatch_prompt("1", timeout=30))
+        self.assertIn("cycle", logs.output[0])
+
+    def test_dispatch_class(self):
+        """Test the priority and flow dispatches are queued under."""
+        save_prompts([
+            {"id": "1", "prompt": "Urgent", "priority": "critical", "tags": ["Ops"]},
+            {"id": "2", "prompt": "Turn", "conversation_id": "c1", "priority": 1},
+            {"id": "3", "prompt": "Plain"},
+        ])
+        self.assertEqual(dispatch_class("1"), (2, "ops"))
+        self.assertEqual(dispatch_class("2"), (1, "c1"))
+        self.assertEqual(dispatch_class("3"), (0, "default"))
+        self.assertEqual(dispatch_class(["3", "2"]), (1, "default"))
+        self.assertEqual(dispatch_class("missing"), (0, "default"))
+
+    def test_dispatch_batch(self):
+        """Test that a batch is submitted once and fanned out per prompt."""
+        backend = FakeBatchBackend()
+        with patch('ccc.main.get_backend', return_value=backend):
+            asyncio.run(run_batch(["1", "2", "missing"]))
+
+        self.assertEqual(backend.batches, [["Test prompt 1", "Test prompt 2"]])
+        for prompt_id in ("1", "2"):
+            run, = get_history().last_runs(prompt_id)
+            self.assertEqual(run["status"], "done")
+            self.assertEqual(Path(run["output"]).read_text(), f"Echo: Test prompt {prompt_id}")
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_cached_result_is_reused(self, mock_exec):
+        """Test that an identical prompt within its TTL is served from the cache."""
+        mock_exec.side_effect = fake_claude([b"Test response\n"])
+        save_prompts([
+            {"id": "1", "prompt": "Same", "schedule": "", "cache_ttl": 60},
+            {"id": "2", "prompt": "Same", "schedule": "", "cache_ttl": 60},
+            {"id": "3", "prompt": "Same", "schedule": ""},
+        ])
+
+        with self.assertLogs('ccc.main', level='INFO') as logs:
+            self.assertTrue(asyncio.run(dispatch_prompt("1", timeout=30)))
+            self.assertTrue(asyncio.run(dispatch_prompt("2", timeout=30)))
+            self.assertTrue(asyncio.run(dispatch_prompt("3", timeout=30)))
+        self.assertEqual(mock_exec.call_count, 2)
+        self.assertTrue(any("Cache hit for prompt 2" in line for line in logs.output))
+        for prompt_id, cache in (("1", "miss"), ("2", "hit"), ("3", None)):
+            run, = get_history().last_runs(prompt_id)
+            self.assertEqual((run["status"], run["cache"]), ("done", cache))
+            self.assertEqual(Path(run["output"]).read_text(), "Test response\n")
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_identical_runs_in_flight_are_deduplicated(self, mock_exec):
+        """Test that identical prompts firing together call Claude once."""
+        mock_exec.side_effect = fake_claude([b"Test response\n"])
+        save_prompts([{"id": str(i), "prompt": "Same", "schedule": "", "cache_ttl": 60} for i in range(3)])
+
+        async def run():
+            return await asyncio.gather(*(dispatch_prompt(str(i), timeout=30) for i in range(3)))
+
+        with self.assertLogs('ccc.main', level='INFO'):
+            self.assertEqual(asyncio.run(run()), [True, True, True])
+        self.assertEqual(mock_exec.call_count, 1)
+        self.assertEqual(sorted(get_history().last_runs(str(i))[0]["cache"] for i in range(3)),
+                         ["hit", "hit", "miss"])
+
+    def test_batch_is_awaited_outside_the_pool(self):
+        """Test that a pending batch frees its worker and queues follow-ups on the pool."""
+        save_prompts([
+            {"id": "1", "prompt": "First", "next_prompt_id": "3"},
+            {"id": "2", "prompt": "Second"},
+            {"id": "3", "prompt": "Third"},
+        ])
+        backend = FakeBatchBackend()
+        ended = asyncio.Event()
+        run_batch_items = backend.run_batch
+
+        async def slow_run_batch(items):
+            await ended.wait()
+            return await run_batch_items(items)
+
+        backend.run_batch = slow_run_batch
+
+        async def run():
+            dispatch_pool.submit_call(dispatch_batch, ["1", "2"])
+            await dispatch_pool.join()
+            self.assertEqual(dispatch_pool.active, 0)
+            with patch('ccc.main.dispatch_pool.submit', wraps=dispatch_pool.submit) as submit:
+                ended.set()
+                await asyncio.gather(*_batches)
+            submit.assert_called_once_with("3", None)
+            await dispatch_pool.join()
+
+        with patch('ccc.main.get_backend', return_value=backend), self.assertLogs('ccc.main', level='INFO'):
+            asyncio.run(run())
+        self.assertEqual(backend.runs, ["Third"])
+        self.assertEqual(get_history().last_runs("3")[0]["status"], "done")
+
+    def test_batch_dispatch_is_opt_in(self):
+        """Test that simultaneous prompts are dispatched one by one unless batching is on."""
+        backend = FakeBatchBackend()
+        with patch('ccc.main.get_backend', return_value=backend), \
+                patch('ccc.main.dispatch_pool') as pool:
+            submit_batch(["1", "2"])
+            self.assertEqual(pool.submit.call_count, 2)
+            with patch('ccc.main.BATCH_DISPATCH', True):
+                submit_batch(["1"])
+                self.assertEqual(pool.submit.call_count, 3)
+                submit_batch(["1", "2"])
+            pool.submit_call.assert_called_once_with(dispatch_batch, ["1", "2"])
+
+    def test_failed_batch_prompts_are_retried_one_by_one(self):
+        """Test that a prompt that failed in a batch gets its next attempt on its own."""
+        backend = FakeBatchBackend(failing={"Test prompt 2"})
+        policy = RetryPolicy(max_attempts=2, base_delay=0.01, max_delay=0.01)
+        with patch('ccc.main.get_backend', return_value=backend), patch('ccc.main.retry_policy', policy), \
+                self.assertLogs('ccc.main', level='WARNING'):
+            asyncio.run(run_batch(["1", "2"]))
+
+        self.assertEqual(backend.runs, ["Test prompt 2"])
+        self.assertEqual([(run["attempt"], run["status"]) for run in get_history().last_runs("2")],
+                         [(2, "done"), (1, "failed")])
+        self.assertEqual(get_dead_letters().all(), [])
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_dispatch_prompt_failure(self, mock_exec):
+        """Test that a failing CLI call logs its exit status and stderr."""
+        mock_exec.side_effect = fake_claude([], stderr=b"rate limited", returncode=1)
+
+        failures = metrics.errors.value("1", "exit_status")
+        with self.assertLogs('ccc.main', level='ERROR') as logs:
+            self.assertFalse(asyncio.run(dispatch_prompt("1", timeout=30)))
+        self.assertIn("exit status 1", logs.output[0])
+        self.assertIn("rate limited", logs.output[1])
+        self.assertEqual(metrics.errors.value("1", "exit_status"), failures + 1)
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_dispatch_prompt_timeout(self, mock_exec):
+        """Test that a hung dispatch is killed instead of blocking forever."""
+        mock_exec.side_effect = fake_claude([b"partial"], hang=True)
+
+        with self.assertLogs('ccc.main', level='ERROR') as logs:
+            asyncio.run(dispatch_prompt("1", timeout=0.05))
+        self.assertTrue(mock_exec.process.killed)
+        self.assertIn("timed out", logs.output[0])
+        self.assertEqual(get_history().last_runs("1")[0]["status"], "timed out")
+        self.assertGreaterEqual(metrics.prompt_dispatches.value("1", "timed out"), 1)
+        self.assertGreaterEqual(metrics.errors.value("1", "timeout"), 1)
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_dispatch_retries_with_backoff(self, mock_exec):
+        """Test that a failed dispatch is retried until it succeeds."""
+        failed = fake_claude([], stderr=b"rate limited", returncode=1)
+        succeeded = fake_claude([b"ok\n"])
+        calls = []
+
+        async def create_subprocess_exec(*args, **kwargs):
+            calls.append(args)
+            return await (failed if len(calls) < 3 else succeeded)(*args, **kwargs)
+
+        mock_exec.side_effect = create_subprocess_exec
+        policy = RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.01)
+        with patch('ccc.main.retry_policy', policy), self.assertLogs('ccc.main', level='WARNING') as logs:
+            self.assertTrue(asyncio.run(dispatch_prompt("1", timeout=30)))
+        self.assertEqual(len(calls), 3)
+        self.assertIn("attempt 3 of 3", [line for line in logs.output if "Retrying" in line][-1])
+        runs = get_history().last_runs("1")
+        self.assertEqual(sorted((run["attempt"], run["status"]) for run in runs),
+                         [(1, "failed"), (2, "failed"), (3, "done")])
+        self.assertEqual(get_dead_letters().all(), [])
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_exhausted_retries_become_dead_letters(self, mock_exec):
+        """Test that a prompt out of attempts is kept as a dead letter and can be retried."""
+        mock_exec.side_effect = fake_claude([], stderr=b"rate limited", returncode=1)
+        save_prompts([{"id": "1", "prompt": "Test prompt 1", "schedule": "", "max_attempts": 2}])
+        policy = RetryPolicy(max_attempts=5, base_delay=0.01, max_delay=0.01)
+        with patch('ccc.main.retry_policy', policy), self.assertLogs('ccc.main', level='ERROR'):
+            self.assertFalse(asyncio.run(dispatch_prompt("1", timeout=30)))
+        self.assertEqual(mock_exec.call_count, 2)
+        letter, = get_dead_letters().all()
+        self.assertEqual((letter["prompt_id"], letter["attempts"], letter["reason"]), ("1", 2, "exit_status"))
+        self.assertIn("rate limited", letter["error"])
+
+        async def retry():
+            with patch('ccc.main.dispatch_pool.submit') as submit:
+                self.assertEqual(retry_dead_letter(letter["id"]), letter)
+            submit.assert_called_once_with("1")
+
+        asyncio.run(retry())
+        self.assertEqual(get_dead_letters().all(), [])
+        self.assertIsNone(retry_dead_letter(letter["id"]))
+
+    @patch('ccc.backends.asyncio.create_subprocess_exec')
+    def test_missing_cli_is_not_retried(self, mock_exec):
+        """Test that only transient failures are retried."""
+        mock_exec.side_effect = FileNotFoundError
+        with patch('ccc.main.retry_policy', RetryPolicy(max_attempts=3, base_delay=0.01)), \
+                self.assertLogs('ccc.main', level='ERROR'):
+            asyncio.run(dispatch_prompt("1", timeout=30))
+        self.assertEqual(mock_exec.call_count, 1)
+        self.assertEqual(get_dead_letters().all()[0]["reason"], "cli_missing")
+
+async def run_batch(prompt_ids):
+    """Dispatches a batch and waits for it and the retries and follow-ups it queues."""
+    task = await dispatch_batch(prompt_ids)
+    if task:
+        await task
+    await dispatch_pool.join()
+
+class FakeBatchBackend:
+    name = "fake batch"
+    supports_batch = True
+
+    def __init__(self, failing=()):
+        self.batches = []
+        self.runs = []
+        self.failing = set(failing)
+
+    async def run_batch(self, items):
+        self.batches.append([text for text, _ in items])
+        for text, path in items:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"Echo: {text}")
+        return [RunResult(1, "overloaded") if text in self.failing else RunResult(0, "") for text, _ in items]
+
+    async def run(self, prompt_text, output_path, on_text=None, context=None, keep_context=False, fork=False):
+        self.runs.append(prompt_text)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(f"Echo: {prompt_text}")
+        return RunResult(0, "")
+
+def fake_claude(chunks, stderr=b"", returncode=0, hang=False):
+    """Returns a create_subprocess_exec replacement that emits `chunks`."""
+    async def create_subprocess_exec(*args, **kwargs):
+        process = FakeProcess(returncode)
+        for chunk in chunks:
+            process.stdout.feed_data(chunk)
+        process.stderr.feed_data(stderr)
+        if not hang:
+            process.stdout.feed_eof()
+            process.stderr.feed_eof()
+            process.done.set()
+        create_subprocess_exec.process = process
+        return process
+    return create_subprocess_exec
+
+class FakeProcess:
+    def __init__(self, returncode):
+        self.stdout = asyncio.StreamReader()
+        self.stderr = asyncio.StreamReader()
+        self.returncode = returncode
+        self.killed = False
+        self.done = asyncio.Event()
+
+    async def wait(self):
+        await self.done.wait()
+        return self.returncode
+
+    def kill(self):
+        self.killed = True
+        self.returncode = -9
+        self.done.set()
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.chain import ChainCycleError, execute_plan, plan_chain
+from ccc.pool import DispatchPool
+
+def prompts(*links):
+    """Builds prompt records from (id, next_prompt_id) pairs."""
+    return {prompt_id: {"id": prompt_id, "prompt": prompt_id, "next_prompt_id": next_id}
+            for prompt_id, next_id in links}
+
+class TestPlanChain(unittest.TestCase):
+    def test_orders_branching_chain(self):
+        """Test that every prompt comes after its predecessors."""
+        records = prompts(("a", ["b", "c"]), ("b", "d"), ("c", "d"), ("d", None))
+        plan = plan_chain("a", records.get)
+
+        self.assertEqual(plan.order[0], "a")
+        self.assertEqual(plan.order[-1], "d")
+        self.assertEqual(sorted(plan.predecessors["d"]), ["b", "c"])
+
+    def test_detects_cycles(self):
+        """Test that a loop in next_prompt_id links is rejected."""
+        records = prompts(("a", "b"), ("b", "c"), ("c", "b"))
+        with self.assertRaises(ChainCycleError):
+            plan_chain("a", records.get)
+
+    def test_long_chain_does_not_recurse(self):
+        """Test that chains longer than the recursion limit still plan."""
+        length = sys.getrecursionlimit() * 2
+        records = prompts(*((str(i), str(i + 1) if i + 1 < length else None) for i in range(length)))
+        plan = plan_chain("0", records.get)
+        self.assertEqual(len(plan.order), length)
+
+    def test_missing_successor_is_skipped(self):
+        """Test that a dangling link doesn't break the plan."""
+        records = prompts(("a", "gone"))
+        with self.assertLogs('ccc.chain', level='ERROR'):
+            plan = plan_chain("a", records.get)
+        self.assertEqual(plan.order, ["a"])
+
+class TestExecutePlan(unittest.IsolatedAsyncioTestCase):
+    async def test_passes_context_and_runs_branches_in_parallel(self):
+        """Test that branches overlap and each turn sees its predecessor's context."""
+        records = prompts(("a", ["b", "c"]), ("b", None), ("c", None))
+        seen = {}
+        both_running = asyncio.Event()
+        running = set()
+
+        async def run_step(prompt, context, fork):
+            seen[prompt["id"]] = context, fork
+            running.add(prompt["id"])
+            if {"b", "c"} <= running:
+                both_running.set()
+            if prompt["id"] != "a":
+                await asyncio.wait_for(both_running.wait(), 1)
+            return True, f"{context}>{prompt['id']}"
+
+        results = await execute_plan(plan_chain("a", records.get), run_step, context="start")
+
+        self.assertEqual(results, {"a": True, "b": True, "c": True})
+        self.assertEqual(seen, {"a": ("start", False), "b": ("start>a", True), "c": ("start>a", True)})
+
+    async def test_failed_step_skips_successors(self):
+        """Test that prompts after a failure are not run."""
+        records = prompts(("a", ["b", "c"]), ("b", "d"), ("c", None), ("d", None))
+
+        async def run_step(prompt, context, fork):
+            return prompt["id"] != "b", None
+
+        results = await execute_plan(plan_chain("a", records.get), run_step)
+        self.assertEqual(results, {"a": True, "b": False, "c": True})
+
+    async def test_branches_are_queued_on_the_pool(self):
+        """Test that parallel branches go through the pool and stay within its workers."""
+        records = prompts(("a", ["b", "c", "d"]), ("b", None), ("c", None), ("d", None))
+        running = set()
+        most = []
+        results = {}
+
+        async def run_step(prompt, context, fork):
+            running.add(prompt["id"])
+            most.append(len(running))
+            await asyncio.sleep(0.01)
+            running.discard(prompt["id"])
+            return True, prompt["id"]
+
+        async def dispatch(start_id):
+            results.update(await execute_plan(plan_chain(start_id, records.get), run_step, pool=pool))
+
+        pool = DispatchPool(dispatch, max_workers=2)
+        pool.submit("a")
+        queued = []
+        submit_call = pool.submit_call
+        pool.submit_call = lambda func, *args: queued.append(args[0]) or submit_call(func, *args)
+        await asyncio.wait_for(pool.join(), 1)
+
+        self.assertEqual(results, {"a": True, "b": True, "c": True, "d": True})
+        # One branch runs in a's task, the others are queued.
+        self.assertEqual(len(queued), 2)
+        self.assertEqual(max(most), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import contextlib
+import io
+import re
+import signal
+import subprocess
+import tempfile
+import time
+import unittest
+import os
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.cli import STARTUP_TARGET, main
+from ccc.main import _histories, _search_indexes, _watermarks
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        directory = Path(self.directory.name)
+        self.patchers = [
+            patch('ccc.main.PROMPTS_FILE', directory / "prompts.jsonl"),
+            patch('ccc.main.HISTORY_DIR', directory / "history"),
+            patch('ccc.main.RUNS_DIR', directory / "runs"),
+            patch('ccc.main.SEARCH_DB', directory / "search.db"),
+            patch('ccc.main.WATERMARKS_DB', directory / "watermarks.db"),
+            patch('ccc.main.setup_logging'),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        _histories.clear()
+        for index in _search_indexes.values():
+            index.close()
+        _search_indexes.clear()
+        for watermarks in _watermarks.values():
+            watermarks.close()
+        _watermarks.clear()
+        self.directory.cleanup()
+
+    def run_cli(self, *argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = main(list(argv))
+        return code, output.getvalue()
+
+    def test_add_and_list(self):
+        """Test that add prints the new id and list shows the prompt."""
+        code, prompt_id = self.run_cli("add", "Hello", "0 9 * * *", "--conversation", "c")
+        self.assertEqual(code, 0)
+        code, listing = self.run_cli("list")
+        self.assertEqual(code, 0)
+        self.assertEqual(listing, f"{prompt_id.strip()}\t0 9 * * *\tHello\n")
+
+    def test_search_and_reindex(self):
+        """Test that tagged prompts are found by search after a reindex."""
+        _, prompt_id = self.run_cli("add", "Summarise the open issues", "", "--tag", "triage")
+        code, output = self.run_cli("search", "tag:triage")
+        self.assertEqual(code, 0)
+        self.assertEqual(output, f"prompt\t{prompt_id.strip()}\tSummarise the open issues\n")
+        code, output = self.run_cli("reindex")
+        self.assertEqual((code, output), (0, "Indexed 1 prompts and 0 responses\n"))
+
+    def test_run_now_exit_code(self):
+        """Test that run-now exits with 1 when the dispatch fails."""
+        _, prompt_id = self.run_cli("add", "Hello", "")
+        for succeeded, expected in ((True, 0), (False, 1)):
+            with patch('ccc.main.dispatch_prompt', AsyncMock(return_value=succeeded)) as dispatch:
+                code, _ = self.run_cli("run-now", prompt_id.strip(), "--timeout", "5")
+            dispatch.assert_awaited_once_with(prompt_id.strip(), timeout=5.0)
+            self.assertEqual(code, expected)
+
+    def test_daemon_starts_without_textual(self):
+        """Test that the daemon never imports Textual and starts within the target."""
+        process = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "-m", "ccc", "--timing", "daemon", "--metrics-port", "0"],
+            cwd=ROOT, stderr=subprocess.PIPE, text=True)
+        lines = []
+        try:
+            for line in process.stderr:
+                lines.append(line)
+                if line.startswith("startup:"):
+                    break
+            # Give the scheduler time to install its SIGTERM handler.
+            time.sleep(0.5)
+            process.send_signal(signal.SIGTERM)
+            lines.extend(process.stderr)
+            self.assertEqual(process.wait(timeout=10), 0)
+        finally:
+            process.kill()
+            process.stderr.close()
+
+        imported = [line.rsplit("|", 1)[-1].strip() for line in lines if line.startswith("import time:")]
+        self.assertIn("ccc.main", imported)
+        self.assertFalse([module for module in imported if module.split(".")[0] == "textual"])
+        startup, = [line for line in lines if line.startswith("startup:")]
+        self.assertLess(int(re.match(r"startup: (\d+) ms", startup).group(1)), STARTUP_TARGET * 1000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.dispatch_queue import FairQueue, TokenBucket, parse_priority
+
+class TestFairQueue(unittest.IsolatedAsyncioTestCase):
+    def drain(self, queue):
+        return [queue.take() for _ in range(queue.qsize())]
+
+    async def test_higher_priority_goes_first(self):
+        """Test that a later, more urgent item overtakes the backlog."""
+        queue = FairQueue()
+        for item in ("a", "b", "c"):
+            queue.put_nowait(item)
+        queue.put_nowait("urgent", priority=2)
+        queue.put_nowait("low", priority=-1)
+
+        self.assertEqual(self.drain(queue), ["urgent", "a", "b", "c", "low"])
+
+    async def test_flows_share_by_weight(self):
+        """Test that flows alternate in proportion to their weights."""
+        queue = FairQueue({"big": 2})
+        for i in range(6):
+            queue.put_nowait(f"big{i}", flow="big")
+        for i in range(3):
+            queue.put_nowait(f"small{i}", flow="small")
+
+        order = self.drain(queue)
+        self.assertEqual(order[:6], ["big0", "small0", "big1", "big2", "small1", "big3"])
+
+    async def test_idle_flow_does_not_bank_credit(self):
+        """Test that a flow arriving late doesn't get a run of items."""
+        queue = FairQueue()
+        for i in range(4):
+            queue.put_nowait(f"a{i}", flow="a")
+        self.assertEqual([queue.take() for _ in range(2)], ["a0", "a1"])
+        for i in range(3):
+            queue.put_nowait(f"b{i}", flow="b")
+
+        self.assertEqual(self.drain(queue), ["b0", "a2", "b1", "a3", "b2"])
+
+    async def test_get_and_join(self):
+        """Test that get waits for an item and join for task_done."""
+        queue = FairQueue()
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+        queue.put_nowait("x")
+        self.assertEqual(await asyncio.wait_for(getter, 1), "x")
+
+        joiner = asyncio.create_task(queue.join())
+        await asyncio.sleep(0)
+        self.assertFalse(joiner.done())
+        queue.task_done()
+        await asyncio.wait_for(joiner, 1)
+
+class TestTokenBucket(unittest.TestCase):
+    def test_limits_rate_after_burst(self):
+        """Test that tokens refill at the configured rate."""
+        now = [0.0]
+        bucket = TokenBucket(60, burst=2, clock=lambda: now[0])
+
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertAlmostEqual(bucket.try_acquire(), 1)
+        now[0] = 0.5
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+        now[0] = 1
+        self.assertEqual(bucket.try_acquire(), 0)
+
+    def test_zero_rate_is_unlimited(self):
+        """Test that a rate of 0 never waits."""
+        bucket = TokenBucket(0)
+        self.assertTrue(all(bucket.try_acquire() == 0 for _ in range(100)))
+
+class TestParsePriority(unittest.TestCase):
+    def test_names_and_numbers(self):
+        """Test that level names and integers are accepted."""
+        self.assertEqual(parse_priority("critical"), 2)
+        self.assertEqual(parse_priority("Low"), -1)
+        self.assertEqual(parse_priority("5"), 5)
+        self.assertEqual(parse_priority(None), 0)
+        self.assertEqual(parse_priority("urgent"), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.events import EventChannel
+
+class TestEventChannel(unittest.TestCase):
+    def test_coalesces_events_per_prompt(self):
+        """Test that only the latest schedule and run event per prompt is delivered."""
+        channel = EventChannel()
+        channel.publish("1", "queued", next_run=100)
+        channel.publish("2", "scheduled", next_run=200)
+        channel.publish("1", "running", started=50)
+        channel.publish("1", "scheduled", next_run=300)
+        channel.publish("1", "done")
+        channel.publish("1", "removed")
+
+        events = channel.drain()
+        self.assertEqual([(e.prompt_id, e.state) for e in events],
+                         [("1", "done"), ("2", "scheduled"), ("1", "removed")])
+        self.assertEqual((events[0].next_run, events[0].started), (100, 50))
+        self.assertEqual(channel.drain(), [])
+
+    def test_wakes_consumer_once_per_batch(self):
+        """Test that the consumer is woken once until it drains."""
+        channel = EventChannel()
+        wakeups = []
+        channel.publish("1", "queued")
+        channel.subscribe(lambda: wakeups.append(1))
+        self.assertEqual(len(wakeups), 1)
+
+        channel.publish("2", "queued")
+        self.assertEqual(len(wakeups), 1)
+        channel.drain()
+        channel.publish("2", "running")
+        self.assertEqual(len(wakeups), 2)
+
+        channel.subscribe(None)
+        channel.publish("3", "queued")
+        self.assertEqual(len(wakeups), 2)
+
+    def test_publish_from_threads(self):
+        """Test that concurrent publishers don't lose prompts."""
+        channel = EventChannel()
+
+        def publish(start):
+            for i in range(start, start + 500):
+                channel.publish(str(i), "queued")
+                channel.publish(str(i), "running")
+
+        threads = [threading.Thread(target=publish, args=(n * 500,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        events = channel.drain()
+        self.assertEqual(len(events), 2000)
+        self.assertTrue(all(event.state == "running" for event in events))
+
+if __name__ == '__main__':
+    unittest.main()
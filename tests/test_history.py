@@ -0,0 +1,117 @@
+import gzip
+import sqlite3
+import tempfile
+import threading
+import unittest
+import os
+from pathlib import Path
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.history import RunHistory
+
+def run(run_id, prompt_id, started, status="done"):
+    return {"run_id": run_id, "prompt_id": prompt_id, "started": started,
+            "ended": started + 1, "duration": 1, "exit_code": 0, "status": status,
+            "output": f"runs/{prompt_id}/{run_id}.out", "output_bytes": 10}
+
+class TestRunHistory(unittest.TestCase):
+    def setUp(self):
+        """Set up a history in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.history = RunHistory(self.tmp.name, max_bytes=1024, backup_count=50)
+
+    def tearDown(self):
+        self.history.close()
+        self.tmp.cleanup()
+
+    def test_last_runs_of_prompt(self):
+        """Test fetching the newest runs of one prompt."""
+        for i in range(30):
+            self.history.record(run(f"r{i}", "a" if i % 2 else "b", 1000 + i))
+
+        runs = self.history.last_runs("a", limit=3)
+        self.assertEqual([r["run_id"] for r in runs], ["r29", "r27", "r25"])
+        self.assertEqual(runs[0]["output_bytes"], 10)
+
+    def test_runs_between(self):
+        """Test querying runs by start time, optionally per prompt."""
+        for i in range(10):
+            self.history.record(run(f"r{i}", "a" if i % 2 else "b", 1000 + i))
+
+        self.assertEqual([r["run_id"] for r in self.history.runs_between(1002, 1005)],
+                         ["r2", "r3", "r4"])
+        self.assertEqual([r["run_id"] for r in self.history.runs_between(1002, 1005, "a")],
+                         ["r3"])
+
+    def test_rotation_compresses_segments_and_index_rebuilds(self):
+        """Test that old segments are gzipped and can rebuild the index."""
+        for i in range(40):
+            self.history.record(run(f"r{i}", "a", 1000 + i))
+
+        segments = self.history.segments()
+        self.assertGreater(len(segments), 2)
+        self.assertTrue(all(path.suffix == ".gz" for path in segments[:-1]))
+        with gzip.open(segments[0], "rt") as f:
+            self.assertIn('"r0"', f.readline())
+
+        self.history.connection.execute("DELETE FROM runs")
+        self.assertEqual(self.history.rebuild_index(), 40)
+        self.assertEqual(self.history.last_runs("a", limit=1)[0]["run_id"], "r39")
+
+    def test_expired_segments_take_their_runs_and_outputs_along(self):
+        """Test that runs rotated out of the last segment leave no trace."""
+        self.history.close()
+        expired = []
+        self.history = RunHistory(self.tmp.name, max_bytes=1024, backup_count=2, on_expire=expired.extend)
+        outputs = []
+        for i in range(40):
+            output = Path(self.tmp.name) / "runs" / "a" / f"r{i}.out"
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_text("response")
+            outputs.append(output)
+            self.history.record(dict(run(f"r{i}", "a", 1000 + i), output=str(output)))
+
+        self.assertEqual(len(self.history.segments()), 3)
+        kept = [r["run_id"] for r in self.history.runs_between(0, 2000)]
+        self.assertTrue(expired)
+        self.assertEqual([r["run_id"] for r in expired] + kept, [f"r{i}" for i in range(40)])
+        for i, output in enumerate(outputs):
+            self.assertEqual(output.exists(), f"r{i}" in kept)
+
+    def test_writers_sharing_a_history_lose_no_runs(self):
+        """Test that histories of several workers on one directory rotate in turn."""
+        def write(worker):
+            history = RunHistory(self.tmp.name, max_bytes=512, backup_count=1000)
+            for i in range(100):
+                history.record(run(f"w{worker}-{i}", "a", 1000 + i))
+            history.close()
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.history.rebuild_index(), 300)
+        self.assertEqual(len(self.history.runs_between(0, 2000)), 300)
+
+    def test_old_index_gains_new_columns(self):
+        """Test that an index created before the attempt column is upgraded."""
+        self.history.close()
+        directory = Path(self.tmp.name) / "old"
+        directory.mkdir()
+        connection = sqlite3.connect(directory / "index.db")
+        connection.execute("CREATE TABLE runs (run_id TEXT PRIMARY KEY, prompt_id TEXT NOT NULL, "
+                           "started REAL NOT NULL, ended REAL, duration REAL, exit_code INTEGER, "
+                           "status TEXT, output TEXT, output_bytes INTEGER)")
+        connection.close()
+
+        self.history = RunHistory(directory)
+        self.history.record(dict(run("r1", "a", 1000), attempt=2))
+        self.assertEqual(self.history.last_runs("a")[0]["attempt"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
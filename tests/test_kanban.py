@@ -0,0 +1,87 @@
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from textual.app import App
+
+from ccc.kanban import COLUMNS_PER_PAGE, KanbanBoard, KanbanCard, KanbanColumn
+
+def conversations(count, cards=2):
+    return {
+        f"conversation-{c}": [
+            {"id": f"{c}-{p}", "prompt": f"Prompt {c}-{p}", "conversation_id": f"conversation-{c}"}
+            for p in range(cards)
+        ]
+        for c in range(count)
+    }
+
+class KanbanApp(App):
+    def __init__(self):
+        super().__init__()
+        self.moves = []
+
+    def compose(self):
+        yield KanbanBoard()
+
+    def on_kanban_board_card_moved(self, event):
+        self.moves.append((event.prompt_id, event.conversation_id))
+
+class TestKanbanBoard(unittest.IsolatedAsyncioTestCase):
+    async def test_only_the_current_page_is_mounted(self):
+        """Test that conversations beyond the page are not mounted until paged to."""
+        app = KanbanApp()
+        async with app.run_test() as pilot:
+            board = app.query_one(KanbanBoard)
+            board.set_conversations(conversations(COLUMNS_PER_PAGE + 2))
+            await pilot.pause()
+            self.assertEqual(len(board.query(KanbanColumn)), COLUMNS_PER_PAGE)
+
+            board.action_next_page()
+            await pilot.pause()
+            self.assertEqual(list(board.columns), ["conversation-8", "conversation-9"])
+            self.assertEqual(len(board.query(KanbanColumn)), 2)
+
+    async def test_changes_reuse_widgets(self):
+        """Test that single-prompt changes only touch the affected cards."""
+        app = KanbanApp()
+        async with app.run_test() as pilot:
+            board = app.query_one(KanbanBoard)
+            board.set_conversations(conversations(2))
+            await pilot.pause()
+            column = board.columns["conversation-0"]
+            card = column.cards["0-0"]
+
+            board.upsert_card({"id": "0-0", "prompt": "Changed", "conversation_id": "conversation-0"})
+            board.set_conversations(conversations(2) | {"conversation-2": []})
+            await pilot.pause()
+            self.assertIs(board.columns["conversation-0"], column)
+            self.assertIs(column.cards["0-0"], card)
+
+            board.upsert_card({"id": "0-1", "prompt": "Moved", "conversation_id": "conversation-1"})
+            board.remove_card("0-0")
+            await pilot.pause()
+            self.assertNotIn("conversation-0", board.columns)
+            self.assertEqual(list(board.columns["conversation-1"].cards), ["1-0", "1-1", "0-1"])
+            self.assertEqual(len(board.query(KanbanCard)), 3)
+
+    async def test_dropping_a_card_posts_a_move(self):
+        """Test that dragging a card onto another column asks for a move."""
+        app = KanbanApp()
+        async with app.run_test(size=(120, 30)) as pilot:
+            board = app.query_one(KanbanBoard)
+            board.set_conversations(conversations(2, cards=1))
+            await pilot.pause()
+            card = board.columns["conversation-0"].cards["0-0"]
+            target = board.columns["conversation-1"]
+
+            await pilot.mouse_down(card)
+            await pilot.hover(target)
+            await pilot.mouse_up(target)
+            await pilot.pause()
+            self.assertEqual(app.moves, [("0-0", "conversation-1")])
+
+if __name__ == '__main__':
+    unittest.main()
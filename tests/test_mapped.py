@@ -0,0 +1,99 @@
+import unittest
+import os
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.mapped import MappedJsonl
+
+class TestMappedJsonl(unittest.TestCase):
+    def setUp(self):
+        """Set up a JSONL file and an index path in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "prompts.jsonl"
+        self.index_path = Path(self.tmp.name) / "prompts.jsonl.idx"
+        self._append([{"id": str(i), "prompt": f"Test prompt {i}"} for i in range(10)])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _append(self, prompts, text=""):
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(prompt) + "\n" for prompt in prompts) + text)
+
+    def _open(self, cache_size=4):
+        return MappedJsonl(self.path, self.index_path, cache_size)
+
+    def test_records_are_parsed_on_access(self):
+        """Test that only the records read are parsed and kept."""
+        mapped = self._open(cache_size=2)
+        self.assertEqual(len(mapped), 10)
+        with patch('ccc.mapped.json.loads', wraps=json.loads) as mock_loads:
+            self.assertEqual(mapped.record(3)["prompt"], "Test prompt 3")
+            self.assertEqual([r["id"] for r in mapped.records(7, 10)], ["7", "8", "9"])
+            self.assertEqual(mapped.find("5"), [5])
+            self.assertEqual(mapped.find("missing"), [])
+        self.assertEqual(mock_loads.call_count, 5)
+        self.assertEqual(len(mapped._cache), 2)
+        self.assertEqual(mapped.raw(0), json.dumps({"id": "0", "prompt": "Test prompt 0"}).encode())
+
+    def test_saved_index_is_reused(self):
+        """Test that an unchanged file is not parsed again."""
+        self._open().close()
+        with patch('ccc.mapped.json.loads', wraps=json.loads) as mock_loads:
+            mapped = self._open()
+            self.assertEqual(len(mapped), 10)
+        mock_loads.assert_called_once()  # the index header
+
+    def test_grown_file_is_indexed_incrementally(self):
+        """Test that only the records appended since the index was saved are parsed."""
+        self._open().close()
+        self._append([{"id": "10", "prompt": "Test prompt 10"}, {"id": "3", "prompt": "Again"}],
+                     text='{"id": "12", "pro')
+        with patch('ccc.mapped.json.loads', wraps=json.loads) as mock_loads:
+            mapped = self._open()
+            self.assertEqual(len(mapped), 12)
+        # The header, two new records and the one cut short.
+        self.assertEqual(mock_loads.call_count, 4)
+        self.assertEqual(mapped.find("3"), [3, 11])
+        self.assertEqual(mapped.record(10)["prompt"], "Test prompt 10")
+
+        self._append([], text='mpt": "Test prompt 12"}\n')
+        mapped = self._open()
+        self.assertEqual(len(mapped), 13)
+        self.assertEqual(mapped.find("12"), [12])
+
+    def test_rewritten_file_is_reindexed(self):
+        """Test that a saved index is dropped when the file was replaced."""
+        self._open().close()
+        other = Path(self.tmp.name) / "other.jsonl"
+        other.write_text(json.dumps({"id": "9", "prompt": "Other prompt"}) + "\n")
+        os.replace(other, self.path)
+
+        mapped = self._open()
+        self.assertEqual(len(mapped), 1)
+        self.assertEqual(mapped.find("9"), [0])
+        self.assertEqual(mapped.record(0)["prompt"], "Other prompt")
+
+    def test_eager(self):
+        """Test that without a cache size every record is parsed and kept."""
+        mapped = MappedJsonl(self.path)
+        with patch('ccc.mapped.json.loads') as mock_loads:
+            self.assertEqual(mapped.find("4"), [4])
+            self.assertEqual(len(mapped.records(0, 10)), 10)
+        mock_loads.assert_not_called()
+        self.assertFalse(self.index_path.exists())
+
+    def test_missing_file(self):
+        """Test that a missing file reads as empty."""
+        mapped = MappedJsonl(Path(self.tmp.name) / "missing.jsonl", self.index_path, 4)
+        self.assertEqual(len(mapped), 0)
+        self.assertEqual(mapped.find("1"), [])
+
+if __name__ == '__main__':
+    unittest.main()
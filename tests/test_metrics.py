@@ -0,0 +1,112 @@
+import asyncio
+import datetime
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.metrics import Counter, DispatchMetrics, Histogram, serve_metrics
+from ccc.pool import DispatchPool
+from ccc.scheduler import AsyncScheduler
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_render_and_quantile(self):
+        """Test the cumulative buckets and the interpolated quantiles."""
+        histogram = Histogram("latency_seconds", "Latency.", ["status"], buckets=(1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3):
+            histogram.observe(value, "done")
+        histogram.observe(10, "failed")
+
+        lines = histogram.render()
+        self.assertIn('latency_seconds_bucket{status="done",le="2"} 3', lines)
+        self.assertIn('latency_seconds_bucket{status="done",le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum{status="done"} 6.5', lines)
+        self.assertIn('latency_seconds_count{status="failed"} 1', lines)
+        self.assertEqual(histogram.quantile(0.5, "done"), 1.5)
+        self.assertEqual(histogram.count(), 5)
+        # Values past the last finite bound are reported at that bound.
+        self.assertEqual(histogram.quantile(1.0), 4)
+        self.assertIsNone(Histogram("empty", "Empty.").quantile(0.5))
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes in label values don't break the format."""
+        counter = Counter("errors_total", "Errors.", ["prompt_id"])
+        counter.inc('say "hi"')
+        self.assertIn('errors_total{prompt_id="say \\"hi\\""} 1', counter.render())
+
+    def test_dispatch_metrics(self):
+        """Test per-prompt runs, errors and the slowest prompts."""
+        metrics = DispatchMetrics()
+        metrics.observe_run("a", "done", 2)
+        metrics.observe_run("a", "done", 4)
+        metrics.observe_run("b", "failed", 30, "exit_status")
+        metrics.observe_error("c", "prompt_missing")
+
+        self.assertEqual(metrics.slowest_prompts(), [("b", 1, 30), ("a", 2, 3)])
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["dispatches"], {"done": 2, "failed": 1})
+        self.assertEqual(snapshot["errors"], {"exit_status": 1, "prompt_missing": 1})
+        text = metrics.render()
+        self.assertIn('ccc_prompt_dispatch_seconds_total{prompt_id="a"} 6', text)
+        self.assertIn('ccc_dispatch_errors_total{prompt_id="b",reason="exit_status"} 1', text)
+
+    def test_scheduler_and_pool_report(self):
+        """Test that lag, queue waits, pool gauges and crashes are recorded."""
+        metrics = DispatchMetrics()
+
+        async def dispatch(prompt_id):
+            await asyncio.sleep(0.01)
+            if prompt_id == "boom":
+                raise RuntimeError(prompt_id)
+
+        async def run():
+            pool = DispatchPool(dispatch, max_workers=1, metrics=metrics)
+            metrics.track_pool(pool)
+            scheduler = AsyncScheduler(pool.submit, metrics=metrics)
+            base = datetime.datetime(2026, 1, 1, 12, 0)
+            scheduler.add("a", "* * * * *", base=base)
+            scheduler.add("boom", "* * * * *", base=base)
+            # Both fired at 12:01 and are noticed 30 seconds late.
+            scheduler.run_pending(now=base.timestamp() + 90)
+            self.assertEqual(metrics.snapshot()["queue_depth"], 2)
+            await pool.join()
+
+        with self.assertLogs('ccc.pool', level='ERROR'):
+            asyncio.run(run())
+        self.assertEqual(metrics.schedule_lag.count(), 2)
+        # Both land in the (15, 60] bucket.
+        self.assertEqual(metrics.schedule_lag.quantile(0.5), 37.5)
+        self.assertEqual(metrics.queue_wait.count(), 2)
+        self.assertEqual(metrics.errors.value("boom", "exception"), 1)
+        self.assertEqual(metrics.snapshot()["workers"], 1)
+
+    def test_serve_metrics(self):
+        """Test the /metrics endpoint over HTTP."""
+        metrics = DispatchMetrics()
+        metrics.observe_run("a", "done", 1)
+
+        async def get(port, path):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+
+        async def run():
+            server = await serve_metrics(metrics, port=0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await get(port, "/metrics"), await get(port, "/")
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        found, missing = asyncio.run(run())
+        self.assertTrue(found.startswith("HTTP/1.1 200 OK"))
+        self.assertIn('ccc_prompt_dispatches_total{prompt_id="a",status="done"} 1', found)
+        self.assertTrue(missing.startswith("HTTP/1.1 404"))
+
+if __name__ == '__main__':
+    unittest.main()
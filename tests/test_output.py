@@ -0,0 +1,81 @@
+import asyncio
+import tempfile
+import unittest
+import os
+from pathlib import Path
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from textual.app import App
+from textual.widgets import Log
+
+from ccc.output import copy_output, stream_output, read_tail
+from ccc.output_view import MAX_LINE_LENGTH, OutputView
+
+def reader(*chunks):
+    stream = asyncio.StreamReader()
+    for chunk in chunks:
+        stream.feed_data(chunk)
+    stream.feed_eof()
+    return stream
+
+class TestOutput(unittest.IsolatedAsyncioTestCase):
+    async def test_stream_output_writes_file_and_tails_text(self):
+        """Test that output is written as it arrives and decoded safely."""
+        snowman = "☃".encode()
+        texts = []
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "prompt" / "run.out"
+            written = await stream_output(
+                reader(b"line 1\n" + snowman[:1], snowman[1:] + b"\n"), path,
+                texts.append, chunk_size=4)
+
+            self.assertEqual(path.read_text(), "line 1\n☃\n")
+        self.assertEqual(written, 11)
+        self.assertEqual("".join(texts), "line 1\n☃\n")
+        self.assertNotIn("�", "".join(texts))
+
+    async def test_read_tail_keeps_last_bytes(self):
+        """Test that only the end of a long stream is kept."""
+        tail = await read_tail(reader(b"a" * 100, b"b" * 100, b"end"), limit=10, chunk_size=16)
+        self.assertEqual(tail, "bbbbbbbend")
+
+    async def test_copy_output_tails_text(self):
+        """Test that a cached result is copied and tailed chunk by chunk."""
+        texts = []
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "cached"
+            source.write_text("one\n☃\n")
+            path = Path(tmp) / "prompt" / "run.out"
+            self.assertEqual(copy_output(source, path, texts.append, chunk_size=3), 8)
+            self.assertEqual(path.read_text(), "one\n☃\n")
+        self.assertEqual("".join(texts), "one\n☃\n")
+
+class OutputApp(App):
+    def compose(self):
+        yield OutputView()
+
+class TestOutputView(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_of_one_prompt_keep_their_own_lines(self):
+        """Test that concurrent runs don't share a partial line, and long lines are split."""
+        app = OutputApp()
+        async with app.run_test():
+            view = app.query_one(OutputView)
+            view.start_run("p", "runs/p/1.out")
+            view.start_run("p", "runs/p/2.out")
+            view.write("runs/p/1.out", "first ")
+            view.write("runs/p/2.out", "second\n")
+            view.write("runs/p/1.out", "run\n")
+            view.write("runs/p/2.out", "x" * (MAX_LINE_LENGTH * 2 + 5))
+            self.assertEqual(len(view.runs["runs/p/2.out"][1]), 5)
+            view.end_run("runs/p/1.out", "done")
+            view.end_run("runs/p/2.out", "done")
+            lines = app.query_one(Log).lines
+        self.assertEqual(lines[2:4], ["[p] second", "[p] first run"])
+        self.assertEqual(lines[4:7], ["[p] " + "x" * MAX_LINE_LENGTH] * 2 + ["--- p done"])
+        self.assertEqual(view.runs, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.pool import DispatchPool
+
+class TestDispatchPool(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_dispatches_in_parallel(self):
+        """Test that due prompts do not wait for each other."""
+        started = []
+        all_started = asyncio.Event()
+
+        async def dispatch(prompt_id):
+            started.append(prompt_id)
+            if len(started) == 3:
+                all_started.set()
+            await asyncio.wait_for(all_started.wait(), 5)
+
+        pool = DispatchPool(dispatch, max_workers=3)
+        for prompt_id in ("1", "2", "3"):
+            pool.submit(prompt_id)
+        await pool.join()
+
+        self.assertEqual(sorted(started), ["1", "2", "3"])
+
+    async def test_reports_backlog_depth(self):
+        """Test that jobs beyond max_workers wait in the queue."""
+        release = asyncio.Event()
+
+        async def dispatch(prompt_id):
+            await release.wait()
+
+        pool = DispatchPool(dispatch, max_workers=1)
+        pool.submit("1")
+        await asyncio.sleep(0)
+        pool.submit("2")
+        pool.submit("3")
+
+        self.assertEqual(pool.active, 1)
+        self.assertEqual(pool.backlog(), 2)
+        release.set()
+        await pool.join()
+        self.assertEqual(pool.backlog(), 0)
+
+    async def test_failed_dispatch_does_not_stop_worker(self):
+        """Test that an exception in one dispatch does not kill the pool."""
+        done = []
+
+        async def dispatch(prompt_id):
+            if prompt_id == "bad":
+                raise RuntimeError("boom")
+            done.append(prompt_id)
+
+        pool = DispatchPool(dispatch, max_workers=1)
+        pool.submit("bad")
+        pool.submit("good")
+        await pool.join()
+
+        self.assertEqual(done, ["good"])
+
+    async def test_critical_dispatch_overtakes_backlog(self):
+        """Test that a critical prompt starts before a queued backlog."""
+        release = asyncio.Event()
+        started = []
+
+        async def dispatch(prompt_id):
+            started.append(prompt_id)
+            await release.wait()
+
+        priorities = {"critical": 2}
+        pool = DispatchPool(dispatch, max_workers=1,
+                            classify=lambda prompt_id: (priorities.get(prompt_id, 0), None))
+        pool.submit("1")
+        await asyncio.sleep(0)
+        for prompt_id in ("2", "3", "critical"):
+            pool.submit(prompt_id)
+        await asyncio.sleep(0)
+        release.set()
+        await pool.join()
+
+        self.assertEqual(started, ["1", "critical", "2", "3"])
+
+    async def test_rate_limiter_is_awaited_before_each_start(self):
+        """Test that each dispatch waits for a token."""
+        tokens = []
+
+        class Limiter:
+            async def acquire(self):
+                tokens.append(len(tokens))
+
+        async def dispatch(prompt_id):
+            pass
+
+        pool = DispatchPool(dispatch, max_workers=2, rate_limiter=Limiter())
+        for prompt_id in ("1", "2", "3"):
+            pool.submit(prompt_id)
+        await pool.join()
+
+        self.assertEqual(len(tokens), 3)
+
+    async def test_waiting_job_lends_its_worker(self):
+        """Test that a job waiting on jobs it queued doesn't deadlock a full pool."""
+        order = []
+
+        async def dispatch(prompt_id):
+            order.append(prompt_id)
+            if prompt_id == "parent":
+                done = asyncio.get_running_loop().create_future()
+
+                async def child():
+                    self.assertEqual(pool.active, 1)
+                    order.append("child")
+                    done.set_result(None)
+
+                pool.submit_call(child)
+                await pool.wait(done)
+                self.assertEqual(pool.active, 1)
+                order.append("parent done")
+
+        pool = DispatchPool(dispatch, max_workers=1)
+        pool.submit("parent")
+        await asyncio.wait_for(pool.join(), 1)
+
+        self.assertEqual(order, ["parent", "child", "parent done"])
+
+if __name__ == '__main__':
+    unittest.main()
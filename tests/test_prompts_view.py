@@ -0,0 +1,97 @@
+import tempfile
+import unittest
+import os
+from pathlib import Path
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from textual.app import App
+
+from ccc.prompts_view import PAGE_SIZE, PromptsTable
+from ccc.store import JsonlPromptStore
+
+class PromptsApp(App):
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def compose(self):
+        yield PromptsTable(lambda: self.store)
+
+class TestPromptsTable(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        """Set up a store with a few pages of prompts."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JsonlPromptStore(Path(self.tmp.name) / "prompts.jsonl")
+        self.store.replace_all([
+            {"id": str(i), "prompt": f"Prompt {i}", "schedule": "* * * * *"}
+            for i in range(PAGE_SIZE * 2 + 10)
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def test_loads_pages_while_scrolling(self):
+        """Test that only the first page is loaded until the user scrolls."""
+        app = PromptsApp(self.store)
+        async with app.run_test() as pilot:
+            table = app.query_one(PromptsTable)
+            self.assertEqual(table.row_count, PAGE_SIZE)
+
+            table.scroll_end(animate=False)
+            await pilot.pause()
+            self.assertEqual(table.row_count, PAGE_SIZE * 2)
+
+            table.move_cursor(row=table.row_count - 1)
+            await pilot.pause()
+            self.assertEqual(table.row_count, PAGE_SIZE * 2 + 10)
+            self.assertTrue(table.exhausted)
+
+    async def test_single_row_updates(self):
+        """Test updating, removing and appending rows by prompt id."""
+        app = PromptsApp(self.store)
+        async with app.run_test() as pilot:
+            table = app.query_one(PromptsTable)
+            self.store.update("1", {"prompt": "Changed", "schedule": "0 0 * * *"})
+            table.upsert_prompt(self.store.get("1"))
+            self.store.delete("2")
+            table.remove_prompt("2")
+            self.assertEqual(table.get_row("1")[:2], ["Changed", "0 0 * * *"])
+            self.assertNotIn("2", table.rows)
+            self.assertEqual(table.loaded, PAGE_SIZE - 1)
+
+            # A new prompt is left for later pages while earlier ones are unloaded.
+            self.store.add({"id": "new", "prompt": "New", "schedule": ""})
+            table.upsert_prompt(self.store.get("new"))
+            self.assertNotIn("new", table.rows)
+
+            while table.load_more():
+                pass
+            self.assertEqual(table.row_count, self.store.count())
+            self.store.add({"id": "newer", "prompt": "Newer", "schedule": ""})
+            table.upsert_prompt(self.store.get("newer"))
+            self.assertIn("newer", table.rows)
+
+    async def test_show_only(self):
+        """Test that a filter shows just the given prompts until reload."""
+        app = PromptsApp(self.store)
+        async with app.run_test() as pilot:
+            table = app.query_one(PromptsTable)
+            self.store.update("3", {"tags": ["ops", "nightly"]})
+            table.show_only([self.store.get("3"), self.store.get("5")])
+            self.assertEqual(list(table.rows), ["3", "5"])
+            self.assertEqual(table.get_row("3")[:3], ["Prompt 3", "* * * * *", "ops nightly"])
+
+            # New prompts don't belong in the results of a search.
+            self.store.add({"id": "new", "prompt": "New", "schedule": ""})
+            table.upsert_prompt(self.store.get("new"))
+            self.assertNotIn("new", table.rows)
+
+            table.reload()
+            self.assertEqual(table.row_count, PAGE_SIZE)
+            self.assertFalse(table.filtered)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from textual.app import App
+from textual.widgets import DataTable, Label
+
+from ccc.events import EventChannel
+from ccc.queue_view import FLUSH_INTERVAL, QueueView
+
+class QueueApp(App):
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+
+    def compose(self):
+        yield QueueView(self.events, describe=lambda prompt_id: f"Prompt {prompt_id}",
+                        backlog=lambda: (3, 1), horizon=60)
+
+class TestQueueView(unittest.IsolatedAsyncioTestCase):
+    async def test_events_patch_rows(self):
+        """Test that job events add, update and remove single rows."""
+        events = EventChannel()
+        app = QueueApp(events)
+        async with app.run_test() as pilot:
+            table = app.query_one(DataTable)
+            now = time.time()
+            events.publish("1", "scheduled", next_run=now + 30)
+            events.publish("2", "scheduled", next_run=now + 3600)
+            await pilot.pause(FLUSH_INTERVAL * 2)
+            self.assertEqual(list(table.rows), ["1"])
+            self.assertEqual(table.get_row("1")[:2], ["Prompt 1", "scheduled"])
+
+            # Published from another thread, like a sharded worker would.
+            thread = threading.Thread(target=events.publish, args=("1", "running"),
+                                      kwargs={"started": now - 65})
+            thread.start()
+            thread.join()
+            events.publish("1", "scheduled", next_run=now + 90)
+            await pilot.pause(FLUSH_INTERVAL * 2)
+            self.assertEqual(table.get_row("1")[1:3], ["running", "0:01:05"])
+            self.assertEqual(str(app.query_one("#queue_backlog", Label).content),
+                             "Backlog: 3 queued, 1 running")
+
+            events.publish("1", "done")
+            events.publish("1", "removed")
+            await pilot.pause(FLUSH_INTERVAL * 2)
+            self.assertNotIn("1", table.rows)
+
+    async def test_update_queue_adds_missing_rows(self):
+        """Test that upcoming jobs are merged into the existing rows."""
+        import datetime
+        events = EventChannel()
+        app = QueueApp(events)
+        async with app.run_test():
+            view = app.query_one(QueueView)
+            soon = datetime.datetime.now() + datetime.timedelta(seconds=30)
+            view.update_queue([(soon, "1"), (soon + datetime.timedelta(seconds=10), "1"), (soon, "2")])
+            self.assertEqual(list(view.states), ["1", "2"])
+            self.assertEqual(view.states["1"].next_run, soon.timestamp())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import random
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.retry import CircuitBreaker, RetryPolicy
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_delay_is_jittered_exponential_backoff(self):
+        """Test that delays stay under the exponential ceiling and max_delay."""
+        policy = RetryPolicy(base_delay=2, max_delay=10, rng=random.Random(1))
+        for attempt, ceiling in ((1, 2), (2, 4), (3, 8), (4, 10), (10, 10)):
+            delays = [policy.delay(attempt) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= ceiling for delay in delays))
+            self.assertGreater(max(delays), ceiling * 0.8)
+
+    def test_prompt_overrides_attempts(self):
+        """Test that a prompt's max_attempts wins over the policy's."""
+        policy = RetryPolicy(max_attempts=3)
+        self.assertEqual(policy.attempts({}), 3)
+        self.assertEqual(policy.attempts({"max_attempts": 1}), 1)
+        self.assertEqual(policy.attempts({"max_attempts": "5"}), 5)
+        self.assertEqual(policy.attempts({"max_attempts": "lots"}), 3)
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, cooldown=60, clock=self.clock)
+
+    def trip(self):
+        for succeeded in (True, False, True, False):
+            self.breaker.record(succeeded)
+
+    def test_opens_on_failure_rate(self):
+        """Test that the breaker only opens once enough attempts failed."""
+        for succeeded in (False, True, True):
+            self.breaker.record(succeeded)
+        self.assertEqual(self.breaker.state, "closed")
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_after(), 60)
+
+    def test_half_open_probe(self):
+        """Test that one probe is let through after the cooldown."""
+        self.trip()
+        self.clock.now = 60
+        self.assertEqual(self.breaker.state, "half-open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, "open")
+
+        self.clock.now = 120
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True)
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertTrue(self.breaker.allow())
+
+    def test_lost_probe_is_replaced(self):
+        """Test that a probe that never reports doesn't block dispatch forever."""
+        self.trip()
+        self.clock.now = 60
+        self.assertTrue(self.breaker.allow())
+        self.clock.now = 119
+        self.assertFalse(self.breaker.allow())
+        self.clock.now = 120
+        self.assertTrue(self.breaker.allow())
+
+    def test_acquire_waits_while_open(self):
+        """Test that acquire pauses callers until the breaker half-opens."""
+        breaker = CircuitBreaker(failure_rate=1, window=1, min_calls=1, cooldown=0.05)
+        breaker.record(False)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await breaker.acquire()
+            return loop.time() - started
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.04)
+
+if __name__ == '__main__':
+    unittest.main()
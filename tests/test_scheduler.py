@@ -0,0 +1,134 @@
+import asyncio
+import datetime
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.events import EventChannel
+from ccc.scheduler import AsyncScheduler, cron_expression
+
+class TestAsyncScheduler(unittest.TestCase):
+    def test_run_pending_fires_due_jobs_once(self):
+        """Test that a due job is submitted once and moved to its next slot."""
+        fired = []
+        scheduler = AsyncScheduler(fired.append)
+        base = datetime.datetime(2025, 1, 1, 12, 0, 30)
+        scheduler.add("1", "* * * * *", base)
+        scheduler.add("2", "0 0 * * *", base)
+
+        deadline = datetime.datetime(2025, 1, 1, 12, 1).timestamp()
+        self.assertEqual(scheduler.run_pending(deadline - 1), 0)
+        self.assertEqual(scheduler.run_pending(deadline), 1)
+        self.assertEqual(scheduler.run_pending(deadline), 0)
+
+        self.assertEqual(fired, ["1"])
+        self.assertEqual(len(scheduler.jobs), 2)
+        self.assertEqual(scheduler.jobs[0].next_run, datetime.datetime(2025, 1, 1, 12, 2))
+
+    def test_idle_seconds_sleeps_until_next_deadline(self):
+        """Test that the scheduler sleeps exactly until the next job is due."""
+        scheduler = AsyncScheduler(lambda prompt_id: None)
+        base = datetime.datetime(2025, 1, 1, 12, 0, 30)
+        scheduler.add("1", "* * * * *", base)
+
+        self.assertEqual(scheduler.idle_seconds(base.timestamp()), 30)
+
+    def test_run_wakes_up_for_new_jobs(self):
+        """Test that adding a job interrupts the current sleep."""
+        fired = []
+
+        async def scenario():
+            scheduler = AsyncScheduler(fired.append)
+            task = asyncio.create_task(scheduler.run())
+            await asyncio.sleep(0)
+            past = datetime.datetime.now() - datetime.timedelta(minutes=2)
+            scheduler.add("1", "* * * * *", past)
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(scenario())
+        self.assertEqual(fired, ["1"])
+
+    def test_replace_and_remove_single_job(self):
+        """Test that rescheduling one prompt leaves the others alone."""
+        fired = []
+        scheduler = AsyncScheduler(fired.append)
+        base = datetime.datetime(2025, 1, 1, 12, 0, 30)
+        scheduler.add("1", "* * * * *", base)
+        scheduler.add("2", "* * * * *", base)
+        scheduler.add("1", "0 0 * * *", base)
+        self.assertTrue(scheduler.remove("2"))
+        self.assertFalse(scheduler.remove("2"))
+
+        deadline = datetime.datetime(2025, 1, 1, 12, 1).timestamp()
+        self.assertEqual(scheduler.run_pending(deadline), 0)
+        self.assertEqual(fired, [])
+        self.assertEqual([(job.prompt_id, job.expression) for job in scheduler.jobs],
+                         [("1", "0 0 * * *")])
+
+    def test_replaced_entries_are_compacted(self):
+        """Test that repeated edits don't grow the heap without bound."""
+        scheduler = AsyncScheduler(lambda prompt_id: None)
+        for _ in range(1000):
+            scheduler.add("1", "* * * * *")
+
+        self.assertEqual(len(scheduler), 1)
+        self.assertLess(len(scheduler.timeline._heap), 50)
+
+    def test_simultaneous_jobs_are_batched(self):
+        """Test that prompts sharing a fire time are submitted together."""
+        fired, batches = [], []
+        scheduler = AsyncScheduler(fired.append, submit_batch=batches.append)
+        base = datetime.datetime(2025, 1, 1, 23, 59, 30)
+        scheduler.add("a", "0 0 * * *", base)
+        scheduler.add("b", "0 0 * * *", base)
+        scheduler.add("c", "30 0 * * *", base)
+
+        scheduler.run_pending(datetime.datetime(2025, 1, 2, 0, 45).timestamp())
+
+        self.assertEqual([sorted(batch) for batch in batches], [["a", "b"]])
+        self.assertEqual(fired, ["c"])
+
+    def test_reports_fired_prompts(self):
+        """Test that the fired hook gets every submitted prompt and fire time."""
+        reported = []
+        scheduler = AsyncScheduler(lambda prompt_id: None, fired=reported.append)
+        base = datetime.datetime(2025, 1, 1, 12, 0, 30)
+        scheduler.add("1", "* * * * *", base)
+        scheduler.add("2", "0 0 * * *", base)
+
+        scheduler.run_pending(datetime.datetime(2025, 1, 1, 12, 0, 45).timestamp())
+        scheduler.run_pending(datetime.datetime(2025, 1, 1, 12, 1).timestamp())
+
+        self.assertEqual(reported, [[("1", datetime.datetime(2025, 1, 1, 12, 1).timestamp())]])
+
+    def test_publishes_job_events(self):
+        """Test that scheduling, firing and removal are published with next fire times."""
+        events = EventChannel()
+        scheduler = AsyncScheduler(lambda prompt_id: None, events=events)
+        base = datetime.datetime(2025, 1, 1, 12, 0, 30)
+        scheduler.add("1", "* * * * *", base)
+        scheduler.add("2", "0 0 * * *", base)
+        self.assertEqual([(e.prompt_id, e.state, datetime.datetime.fromtimestamp(e.next_run))
+                          for e in events.drain()],
+                         [("1", "scheduled", datetime.datetime(2025, 1, 1, 12, 1)),
+                          ("2", "scheduled", datetime.datetime(2025, 1, 2))])
+
+        scheduler.run_pending(datetime.datetime(2025, 1, 1, 12, 1).timestamp())
+        scheduler.remove("2")
+        self.assertEqual([(e.prompt_id, e.state, e.next_run) for e in events.drain()],
+                         [("1", "queued", datetime.datetime(2025, 1, 1, 12, 2).timestamp()),
+                          ("2", "removed", None)])
+
+    def test_cron_expression(self):
+        """Test normalising schedules into cron expressions."""
+        self.assertEqual(cron_expression("0 0 * * *"), "0 0 * * *")
+        self.assertEqual(cron_expression("every minute"), "* * * * *")
+        self.assertIsNone(cron_expression("whenever"))
+        self.assertIsNone(cron_expression(""))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import tempfile
+import time
+import unittest
+import os
+from pathlib import Path
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.search import SearchIndex, fts_query, parse_tags, snippet
+
+class TestQueries(unittest.TestCase):
+    def test_fts_query(self):
+        """Test that words become prefixes and tags target the tags column."""
+        self.assertEqual(fts_query("open iss"), '"open"* AND "iss"*')
+        self.assertEqual(fts_query('"open issues" tag:Ops', "tags"), '"open issues" AND tags : "ops"')
+        self.assertEqual(fts_query('say "hi"" tag:ops'), '"say"* AND "hi"')
+        self.assertIsNone(fts_query("tag:ops"))
+        self.assertIsNone(fts_query('  "" '))
+
+    def test_parse_tags(self):
+        """Test that tags are split, lower-cased and deduplicated."""
+        self.assertEqual(parse_tags("Ops, #nightly ops  review"), ["ops", "nightly", "review"])
+        self.assertEqual(parse_tags(None), [])
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+        self.index = SearchIndex(self.directory / "search.db")
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_prompt_updates(self):
+        """Test that prompts are found by text and tag after each change."""
+        self.index.index_prompt({"id": "1", "prompt": "Summarise the open issues", "tags": ["triage"]})
+        self.index.index_prompt({"id": "2", "prompt": "Review open pull requests"})
+        self.assertEqual(sorted(self.index.search_prompts("open")), ["1", "2"])
+        self.assertEqual(self.index.search_prompts("tag:triage"), ["1"])
+        self.assertEqual(self.index.search_prompts("summ"), ["1"])
+
+        self.index.index_prompt({"id": "1", "prompt": "Summarise the closed issues", "tags": []})
+        self.assertEqual(self.index.search_prompts("open"), ["2"])
+        self.assertEqual(self.index.search_prompts("tag:triage"), [])
+
+        self.index.remove_prompt("2")
+        self.assertEqual(self.index.search_prompts("open"), [])
+
+    def test_sync_prompts(self):
+        """Test that a sync only touches prompts that changed."""
+        self.index.index_prompt({"id": "1", "prompt": "Keep me"})
+        self.index.index_prompt({"id": "2", "prompt": "Drop me"})
+        changed = self.index.sync_prompts([
+            {"id": "1", "prompt": "Keep me"},
+            {"id": "3", "prompt": "New one", "tags": ["x"]},
+        ])
+        self.assertEqual(changed, 2)
+        self.assertEqual(self.index.search_prompts("me"), ["1"])
+        self.assertEqual(self.index.search_prompts("tag:x"), ["3"])
+
+    def test_responses(self):
+        """Test that responses are indexed once and found by content."""
+        output = self.directory / "run.out"
+        output.write_text("The build is failing because of a flaky test.\n")
+        self.assertTrue(self.index.index_response("r1", "1", 100.0, output))
+        self.assertFalse(self.index.index_response("r1", "1", 100.0, output))
+        self.assertFalse(self.index.index_response("r2", "1", 100.0, self.directory / "missing.out"))
+
+        results = self.index.search_responses("flaky")
+        self.assertEqual(results, [{"run_id": "r1", "prompt_id": "1", "started": 100.0, "output": str(output)}])
+        self.assertEqual(self.index.search_responses("tag:flaky"), [])
+        self.assertIn("flaky test", snippet(output, "flaky"))
+
+        self.index.clear_responses()
+        self.assertEqual(self.index.search_responses("flaky"), [])
+
+    def test_remove_responses(self):
+        """Test that expired runs are dropped from the response index."""
+        for run_id in ("r1", "r2"):
+            output = self.directory / f"{run_id}.out"
+            output.write_text(f"Deploy {run_id} went fine.\n")
+            self.index.index_response(run_id, "1", 100.0, output)
+
+        self.index.remove_responses(["r1", "missing"])
+        self.assertEqual([r["run_id"] for r in self.index.search_responses("deploy")], ["r2"])
+        self.assertEqual(self.index.search_responses("r1"), [])
+        self.assertEqual(self.index.connection.execute(
+            "SELECT count(*) FROM responses_fts WHERE responses_fts MATCH 'r1'").fetchone()[0], 0)
+
+    def test_large_index_is_fast(self):
+        """Test that a query over 100k prompts takes tens of milliseconds."""
+        words = ["summarise", "review", "explain", "list", "open", "issues", "changes", "deploy"]
+        self.index.sync_prompts([
+            {"id": str(i), "prompt": f"{words[i % 8]} {words[(i // 8) % 8]} item {i}", "tags": [words[i % 5]]}
+            for i in range(100000)
+        ])
+        started = time.perf_counter()
+        results = self.index.search_prompts('review tag:open item')
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertTrue(results)
+
+if __name__ == '__main__':
+    unittest.main()
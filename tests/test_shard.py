@@ -0,0 +1,119 @@
+import asyncio
+import datetime
+import json
+import subprocess
+import tempfile
+import unittest
+import os
+from pathlib import Path
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.shard import LeaseStore, ShardCoordinator, owner_of
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# One scheduler process: joins the cluster, waits for its peers, then fires
+# every prompt's 12:00 slot and prints the prompt ids it dispatched.
+WORKER = """
+import asyncio, datetime, json, sys, time
+sys.path.insert(0, {root!r})
+from ccc.scheduler import AsyncScheduler
+from ccc.shard import LeaseStore, ShardCoordinator
+
+async def run():
+    fired = []
+    coordinator = ShardCoordinator(LeaseStore({db!r}), fired.append, worker_id=sys.argv[1],
+                                   takeover_delay=0.5)
+    scheduler = AsyncScheduler(fired.append, claim=coordinator.claim)
+    base = datetime.datetime(2025, 1, 1, 11, 59)
+    for i in range({prompts}):
+        scheduler.add(str(i), "0 12 * * *", base)
+    while len(coordinator.workers) < {workers}:
+        coordinator.heartbeat()
+        await asyncio.sleep(0.05)
+    scheduler.run_pending(datetime.datetime(2025, 1, 1, 12, 0).timestamp())
+    await asyncio.sleep(1)
+    print(json.dumps(fired))
+
+asyncio.run(run())
+"""
+
+class TestLeaseStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.leases = LeaseStore(Path(self.tmp.name) / "leases.db")
+
+    def tearDown(self):
+        self.leases.close()
+        self.tmp.cleanup()
+
+    def test_lease_is_exclusive_until_it_expires(self):
+        """Test that only one owner holds a fire's lease at a time."""
+        self.assertTrue(self.leases.acquire("1", 100.0, "a", ttl=10, now=1000))
+        self.assertTrue(self.leases.acquire("1", 100.0, "a", ttl=10, now=1001))
+        self.assertFalse(self.leases.acquire("1", 100.0, "b", ttl=10, now=1005))
+        self.assertTrue(self.leases.acquire("1", 160.0, "b", ttl=10, now=1005))
+        self.assertEqual(self.leases.holder("1", 100.0, now=1005), "a")
+
+        self.assertTrue(self.leases.acquire("1", 100.0, "b", ttl=10, now=1012))
+        self.assertEqual(self.leases.holder("1", 100.0, now=1012), "b")
+
+    def test_live_workers(self):
+        """Test that workers drop out when their heartbeat expires or they leave."""
+        self.leases.heartbeat("a", ttl=10, now=1000)
+        self.leases.heartbeat("b", ttl=10, now=1005)
+        self.leases.heartbeat("c", ttl=10, now=1005)
+        self.leases.leave("c")
+        self.assertEqual(self.leases.live_workers(now=1008), ["a", "b"])
+        self.assertEqual(self.leases.live_workers(now=1012), ["b"])
+
+class TestShardCoordinator(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Path(self.tmp.name) / "leases.db"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rendezvous_ownership_moves_only_the_leaving_workers_prompts(self):
+        """Test that a worker leaving only reassigns its own prompts."""
+        prompts = [str(i) for i in range(1000)]
+        before = {p: owner_of(p, ["a", "b", "c"]) for p in prompts}
+        after = {p: owner_of(p, ["a", "b"]) for p in prompts}
+        self.assertEqual(set(before.values()), {"a", "b", "c"})
+        self.assertTrue(all(after[p] == before[p] for p in prompts if before[p] != "c"))
+
+    async def test_orphaned_fire_is_taken_over(self):
+        """Test that a fire whose owner never took it is dispatched by another worker."""
+        submitted = []
+        a = ShardCoordinator(LeaseStore(self.db), submitted.append, worker_id="a", takeover_delay=0.05)
+        b = ShardCoordinator(LeaseStore(self.db), submitted.append, worker_id="b", takeover_delay=0.05)
+        b.heartbeat()
+        a.heartbeat()
+        prompt_id = next(str(i) for i in range(100) if owner_of(str(i), ["a", "b"]) == "b")
+
+        # Worker b died before the fire, but a still counts it as alive.
+        self.assertFalse(a.claim(prompt_id, 100.0))
+        await asyncio.sleep(0.1)
+        self.assertEqual(submitted, [prompt_id])
+        self.assertFalse(b.claim(prompt_id, 100.0))
+        a.leases.close()
+        b.leases.close()
+
+    def test_each_fire_is_dispatched_once_across_processes(self):
+        """Test that local worker processes split the fires without duplicates."""
+        workers, prompts = 3, 60
+        script = WORKER.format(root=ROOT, db=str(self.db), prompts=prompts, workers=workers)
+        processes = [subprocess.Popen([sys.executable, "-c", script, f"worker-{n}"],
+                                      stdout=subprocess.PIPE, text=True)
+                     for n in range(workers)]
+        fired = [json.loads(process.communicate(timeout=60)[0]) for process in processes]
+
+        self.assertEqual(sorted(sum(fired, []), key=int), [str(i) for i in range(prompts)])
+        self.assertTrue(all(fired))
+
+if __name__ == '__main__':
+    unittest.main()
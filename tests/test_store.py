@@ -0,0 +1,291 @@
+import unittest
+import os
+import json
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.store import LAZY_BYTES, JsonlPromptStore, SqlitePromptStore, import_jsonl
+
+class TestJsonlPromptStore(unittest.TestCase):
+    lazy_bytes = LAZY_BYTES
+
+    def setUp(self):
+        """Set up a JSONL file in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "prompts.jsonl"
+        self.store = JsonlPromptStore(self.path, lazy_bytes=self.lazy_bytes)
+        self.store.replace_all([
+            {"id": "1", "prompt": "Test prompt 1", "schedule": "* * * * *"},
+            {"id": "2", "prompt": "Test prompt 2", "schedule": "0 0 * * *"},
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reads_are_served_from_cache(self):
+        """Test that unchanged files are not parsed again."""
+        with patch('ccc.store.json.loads') as mock_loads:
+            self.assertEqual(self.store.get("2")["prompt"], "Test prompt 2")
+            self.assertEqual(len(self.store.all()), 2)
+        mock_loads.assert_not_called()
+
+    def test_mutations_update_cache_in_place(self):
+        """Test that our own writes keep the cache valid without reparsing."""
+        with patch('ccc.store.json.loads') as mock_loads:
+            self.store.add({"id": "3", "prompt": "Test prompt 3", "conversation_id": "c1"})
+            self.store.update("1", {"prompt": "Updated prompt"})
+            self.store.delete("2")
+            self.assertEqual([p["id"] for p in self.store.all()], ["1", "3"])
+            self.assertEqual(self.store.get("1")["prompt"], "Updated prompt")
+            self.assertEqual(self.store.by_conversation("c1")[0]["id"], "3")
+            self.assertEqual(list(self.store.conversations()), ["c1"])
+        mock_loads.assert_not_called()
+        self.assertEqual([p["id"] for p in JsonlPromptStore(self.path).all()], ["1", "3"])
+
+    def test_external_changes_invalidate_cache(self):
+        """Test that a file rewritten by someone else is reloaded."""
+        self.store.all()
+        os.replace(self._write_other(), self.path)
+
+        self.assertEqual([p["id"] for p in self.store.all()], ["9"])
+        self.assertIsNone(self.store.get("1"))
+
+    def test_page(self):
+        """Test reading prompts a slice at a time."""
+        self.assertEqual([p["id"] for p in self.store.page(1, 10)], ["2"])
+        self.assertEqual(self.store.page(2, 10), [])
+        self.assertEqual(self.store.count(), 2)
+
+    def test_mutations_are_journaled(self):
+        """Test that mutations append to the journal and leave the snapshot alone."""
+        snapshot = self.path.read_text()
+        self.store.add({"id": "3", "prompt": "Test prompt 3"})
+        self.store.update("1", {"prompt": "Updated prompt"})
+        self.store.delete("2")
+
+        self.assertEqual(self.path.read_text(), snapshot)
+        records = [json.loads(line) for line in self.store.journal_path.read_text().splitlines()[1:]]
+        self.assertEqual([record["op"] for record in records], ["add", "update", "delete"])
+        reopened = JsonlPromptStore(self.path)
+        self.assertEqual([p["id"] for p in reopened.all()], ["1", "3"])
+        self.assertEqual(reopened.get("1")["prompt"], "Updated prompt")
+
+    def test_batched_write_is_synced_after_the_interval(self):
+        """Test that a write left unsynced is fsynced once fsync_interval is up."""
+        store = JsonlPromptStore(self.path, fsync_interval=0.05, lazy_bytes=self.lazy_bytes)
+        synced = threading.Event()
+        fsync = os.fsync
+        calls = []
+
+        def counting_fsync(fd):
+            calls.append(fd)
+            fsync(fd)
+            if len(calls) == 2:
+                synced.set()
+
+        with patch('ccc.store.os.fsync', side_effect=counting_fsync):
+            store.add({"id": "3", "prompt": "Test prompt 3"})
+            store.add({"id": "4", "prompt": "Test prompt 4"})
+            self.assertEqual(len(calls), 1)
+            self.assertTrue(synced.wait(1))
+        self.assertFalse(store._unsynced)
+        store.close()
+
+    def test_compaction(self):
+        """Test that the journal is folded into the snapshot after compact_ops records."""
+        store = JsonlPromptStore(self.path, compact_ops=3)
+        store.add({"id": "3", "prompt": "Test prompt 3"})
+        store.delete("1")
+        store.update("2", {"prompt": "Updated prompt"})
+
+        self.assertEqual([json.loads(line)["id"] for line in self.path.read_text().splitlines()], ["2", "3"])
+        self.assertEqual(len(store.journal_path.read_text().splitlines()), 1)
+        self.assertEqual([p["id"] for p in JsonlPromptStore(self.path).all()], ["2", "3"])
+
+    def test_torn_record_is_ignored(self):
+        """Test that a record cut short by a crash is dropped and overwritten."""
+        self.store.add({"id": "3", "prompt": "Test prompt 3"})
+        with open(self.store.journal_path, "a") as f:
+            f.write('{"op": "add", "prompt": {"id": "4"')
+
+        store = JsonlPromptStore(self.path)
+        self.assertEqual([p["id"] for p in store.all()], ["1", "2", "3"])
+        store.add({"id": "5", "prompt": "Test prompt 5"})
+        self.assertEqual([p["id"] for p in JsonlPromptStore(self.path).all()], ["1", "2", "3", "5"])
+
+    def test_stale_journal_is_ignored(self):
+        """Test that a journal belonging to a replaced snapshot is not replayed."""
+        self.store.add({"id": "3", "prompt": "Test prompt 3"})
+        # A compaction that crashed after renaming the new snapshot.
+        journal = self.store.journal_path.read_text()
+        self.store.compact()
+        self.store.journal_path.write_text(journal)
+
+        store = JsonlPromptStore(self.path)
+        with self.assertLogs("ccc.store", "WARNING"):
+            self.assertEqual([p["id"] for p in store.all()], ["1", "2", "3"])
+        store.add({"id": "4", "prompt": "Test prompt 4"})
+        self.assertEqual([p["id"] for p in JsonlPromptStore(self.path).all()], ["1", "2", "3", "4"])
+
+    def test_other_writers_are_applied_incrementally(self):
+        """Test that records appended by another store are replayed without reparsing the snapshot."""
+        other = JsonlPromptStore(self.path)
+        self.store.all()
+        other.add({"id": "3", "prompt": "Test prompt 3"})
+        other.delete("1")
+
+        with patch.object(self.store, '_load') as mock_load:
+            self.assertEqual([p["id"] for p in self.store.all()], ["2", "3"])
+        mock_load.assert_not_called()
+        self.store.update("3", {"prompt": "Updated prompt"})
+        self.assertEqual(other.get("3")["prompt"], "Updated prompt")
+
+    def test_concurrent_adds(self):
+        """Test that adds from several threads and stores are all kept."""
+        other = JsonlPromptStore(self.path)
+
+        def add(store, start):
+            for i in range(start, start + 50):
+                store.add({"id": str(i), "prompt": f"Test prompt {i}"})
+
+        threads = [threading.Thread(target=add, args=(store, start))
+                   for store, start in ((self.store, 100), (self.store, 200), (other, 300))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(JsonlPromptStore(self.path).count(), 152)
+
+    def _write_other(self):
+        other = Path(self.tmp.name) / "other.jsonl"
+        other.write_text(json.dumps({"id": "9", "prompt": "Other prompt"}) + "\n")
+        return other
+
+class TestLazyJsonlPromptStore(TestJsonlPromptStore):
+    """The same tests against a snapshot that is parsed on access."""
+    lazy_bytes = 0
+
+    def test_parsed_records_are_bounded(self):
+        """Test that reading a large snapshot keeps only a few parsed records."""
+        self.store.replace_all([{"id": str(i), "prompt": f"Test prompt {i}"} for i in range(100)])
+        with patch('ccc.store.LAZY_CACHE_SIZE', 5):
+            store = JsonlPromptStore(self.path, lazy_bytes=0)
+            self.assertEqual(len(store.all()), 100)
+            self.assertEqual(store.get("42")["prompt"], "Test prompt 42")
+            self.assertEqual([p["id"] for p in store.page(97, 10)], ["97", "98", "99"])
+        self.assertLessEqual(len(store._snapshot._cache), 5)
+        self.assertTrue(store.index_path.exists())
+
+    def test_compaction_to_an_eager_snapshot(self):
+        """Test that prompts nobody read are still found after compaction makes the snapshot small."""
+        self.store.replace_all([{"id": f"id{i}", "prompt": f"Test prompt {i}"} for i in range(200)])
+        size = self.path.stat().st_size
+        store = JsonlPromptStore(self.path, lazy_bytes=size * 3 // 4)
+        self.assertEqual(store.get("id199")["prompt"], "Test prompt 199")
+        for i in range(150, 200):
+            store.delete(f"id{i}")
+        store.compact()
+
+        self.assertIsNotNone(store._snapshot._ids)
+        self.assertEqual(store.count(), 150)
+        self.assertEqual(store.get("id7")["prompt"], "Test prompt 7")
+        self.assertTrue(store.update("id8", {"prompt": "Updated prompt"}))
+        self.assertTrue(store.delete("id9"))
+        self.assertEqual(JsonlPromptStore(self.path).get("id8")["prompt"], "Updated prompt")
+
+    def test_positions_skip_deleted_records(self):
+        """Test positional reads and edits across deleted and updated snapshot records."""
+        self.store.replace_all([{"id": str(i), "prompt": f"Test prompt {i}"} for i in range(10)])
+        store = JsonlPromptStore(self.path, lazy_bytes=0)
+        for prompt_id in ("0", "3", "4", "8"):
+            store.delete(prompt_id)
+        store.update("5", {"prompt": "Updated prompt"})
+        store.add({"id": "10", "prompt": "Test prompt 10"})
+
+        self.assertEqual([p["id"] for p in store.page(2, 3)], ["5", "6", "7"])
+        self.assertEqual(store.page(2, 1)[0]["prompt"], "Updated prompt")
+        self.assertEqual(store.delete_at(5)["id"], "9")
+        self.assertEqual(store.update_at(5, {"prompt": "Updated again"})["id"], "10")
+        self.assertEqual(store.count(), 6)
+
+        store.compact()
+        reopened = JsonlPromptStore(self.path, lazy_bytes=0)
+        self.assertEqual([p["id"] for p in reopened.all()], ["1", "2", "5", "6", "7", "10"])
+        self.assertEqual(reopened.get("10")["prompt"], "Updated again")
+        self.assertIsNone(reopened.get("3"))
+
+class TestSqlitePromptStore(unittest.TestCase):
+    def setUp(self):
+        """Set up a store in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SqlitePromptStore(Path(self.tmp.name) / "prompts.db")
+        self.store.add({"id": "1", "prompt": "Test prompt 1", "schedule": "* * * * *"})
+        self.store.add({"id": "2", "prompt": "Test prompt 2", "schedule": "0 0 * * *",
+                        "conversation_id": "c1"})
+        self.store.add({"id": "3", "prompt": "Test prompt 3", "schedule": "",
+                        "conversation_id": "c1"})
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_get_by_id(self):
+        """Test looking up a single prompt by id."""
+        self.assertEqual(self.store.get("2")["prompt"], "Test prompt 2")
+        self.assertIsNone(self.store.get("missing"))
+
+    def test_by_conversation(self):
+        """Test listing the prompts of one conversation in order."""
+        prompts = self.store.by_conversation("c1")
+        self.assertEqual([p["id"] for p in prompts], ["2", "3"])
+        conversations = self.store.conversations()
+        self.assertEqual(list(conversations), ["c1"])
+        self.assertEqual([p["id"] for p in conversations["c1"]], ["2", "3"])
+
+    def test_update_and_delete_single_rows(self):
+        """Test updating and deleting prompts by id and by position."""
+        self.assertTrue(self.store.update("1", {"prompt": "Updated prompt"}))
+        self.assertTrue(self.store.update_at(2, {"conversation_id": "c2"}))
+        self.assertTrue(self.store.delete_at(1))
+        self.assertFalse(self.store.delete("missing"))
+
+        prompts = self.store.all()
+        self.assertEqual([p["id"] for p in prompts], ["1", "3"])
+        self.assertEqual(prompts[0]["prompt"], "Updated prompt")
+        self.assertEqual(self.store.by_conversation("c2")[0]["id"], "3")
+        self.assertEqual(self.store.by_conversation("c1"), [])
+
+    def test_page(self):
+        """Test reading prompts a slice at a time in insertion order."""
+        self.assertEqual([p["id"] for p in self.store.page(0, 2)], ["1", "2"])
+        self.assertEqual([p["id"] for p in self.store.page(2, 2)], ["3"])
+
+    def test_version_tracks_other_connections(self):
+        """Test that writes by another connection change the version."""
+        version = self.store.version()
+        other = SqlitePromptStore(self.store.path)
+        other.delete("1")
+        other.close()
+        self.assertNotEqual(self.store.version(), version)
+
+    def test_import_jsonl(self):
+        """Test importing prompts from a JSONL file, assigning missing ids."""
+        jsonl = Path(self.tmp.name) / "prompts.jsonl"
+        jsonl.write_text(
+            json.dumps({"id": "4", "prompt": "Imported 1", "schedule": ""}) + "\n"
+            + json.dumps({"prompt": "Imported 2", "schedule": ""}) + "\n")
+
+        self.assertEqual(import_jsonl(jsonl, self.store), 2)
+        prompts = self.store.all()
+        self.assertEqual(self.store.count(), 5)
+        self.assertEqual(prompts[3]["id"], "4")
+        self.assertTrue(prompts[4]["id"])
+
+if __name__ == '__main__':
+    unittest.main()
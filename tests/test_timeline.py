@@ -0,0 +1,61 @@
+import datetime
+import unittest
+import os
+
+# Add the project root to the Python path
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ccc.timeline import CronTimeline
+
+BASE = datetime.datetime(2025, 1, 6, 12, 0, 30)  # a Monday
+
+def ts(*args):
+    return datetime.datetime(*args).timestamp()
+
+class TestCronTimeline(unittest.TestCase):
+    def test_keeps_day_of_week_and_seconds(self):
+        """Test that fire times honour cron fields beyond hour and minute."""
+        timeline = CronTimeline(lookahead=2)
+        timeline.add("weekly", "15 13 * * 3", BASE)
+        timeline.add("seconds", "* * * * * 45", BASE)
+
+        self.assertEqual(timeline.peek(datetime.timedelta(days=10), BASE.timestamp()), [
+            (datetime.datetime(2025, 1, 6, 12, 0, 45), "seconds"),
+            (datetime.datetime(2025, 1, 6, 12, 1, 45), "seconds"),
+            (datetime.datetime(2025, 1, 8, 13, 15), "weekly"),
+            (datetime.datetime(2025, 1, 15, 13, 15), "weekly"),
+        ])
+
+    def test_pop_due_advances_without_drift(self):
+        """Test that popping a slot moves the prompt to the following slot."""
+        timeline = CronTimeline()
+        timeline.add("1", "*/5 * * * *", BASE)
+
+        self.assertEqual(timeline.pop_due(ts(2025, 1, 6, 12, 4)), [])
+        self.assertEqual(timeline.pop_due(ts(2025, 1, 6, 12, 5, 2)), [(ts(2025, 1, 6, 12, 5), "1")])
+        self.assertEqual(timeline.next_deadline(), ts(2025, 1, 6, 12, 10))
+        self.assertEqual(len(timeline.heads()), 1)
+
+    def test_missed_slots_are_coalesced(self):
+        """Test that a prompt late by several slots fires once."""
+        timeline = CronTimeline(lookahead=2)
+        timeline.add("1", "* * * * *", BASE)
+
+        self.assertEqual(timeline.pop_due(ts(2025, 1, 6, 12, 10, 30)), [(ts(2025, 1, 6, 12, 10), "1")])
+        self.assertEqual(timeline.next_deadline(), ts(2025, 1, 6, 12, 11))
+
+    def test_merges_prompts_in_time_order(self):
+        """Test that several prompts come out of one queue in order."""
+        timeline = CronTimeline()
+        timeline.add("hourly", "0 * * * *", BASE)
+        timeline.add("half", "30 * * * *", BASE)
+        timeline.add("gone", "10 * * * *", BASE)
+        timeline.remove("gone")
+
+        due = timeline.pop_due(ts(2025, 1, 6, 13, 45))
+        self.assertEqual([prompt_id for _, prompt_id in due], ["half", "hourly"])
+        self.assertEqual([head[1] for head in timeline.heads()], ["hourly", "half"])
+
+if __name__ == '__main__':
+    unittest.main()